@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""
+Measures how a slow subscriber affects the emitter of scans, for a synchronous subscription, and for async subscriptions
+with each queue policy.
+
+Scans of 50 Crownstones are emitted in bursts. The slow subscriber needs 1 ms per scan, so it can't keep up with the bursts.
+Prints the time the emitter spent in emit, how many scans the subscriber handled and how many were dropped, the maximum
+queue depth, and the average age of a scan when it was handled.
+"""
+
+import asyncio
+import time
+
+from crownstone_ble import QueuePolicy
+from crownstone_ble.core.modules.AsyncEventBus import AsyncEventBus
+
+CROWNSTONE_COUNT = 50
+BURSTS = 40
+BURST_INTERVAL = 0.01
+HANDLE_TIME = 0.001
+QUEUE_SIZE = 100
+TOPIC = "benchmark"
+
+
+class FakeScan:
+    def __init__(self, address):
+        self.address = address
+        self.timestamp = time.perf_counter()
+
+
+class SlowSubscriber:
+    def __init__(self):
+        self.handled = 0
+        self.totalAge = 0.0
+
+    def _count(self, scan):
+        self.handled += 1
+        self.totalAge += time.perf_counter() - scan.timestamp
+
+    def handle(self, scan):
+        time.sleep(HANDLE_TIME)
+        self._count(scan)
+
+    async def handleAsync(self, scan):
+        await asyncio.sleep(HANDLE_TIME)
+        self._count(scan)
+
+
+async def run(policy):
+    bus = AsyncEventBus()
+    subscriber = SlowSubscriber()
+    if policy is None:
+        bus.subscribe(TOPIC, subscriber.handle)
+    elif policy == QueuePolicy.INLINE:
+        subscriptionId = bus.subscribeAsync(TOPIC, subscriber.handle, QUEUE_SIZE, policy)
+    else:
+        subscriptionId = bus.subscribeAsync(TOPIC, subscriber.handleAsync, QUEUE_SIZE, policy)
+
+    emitTime = 0.0
+    for burst in range(0, BURSTS):
+        start = time.perf_counter()
+        for i in range(0, CROWNSTONE_COUNT):
+            bus.emit(TOPIC, FakeScan(f"00:00:00:00:00:{i:02x}"))
+        emitTime += time.perf_counter() - start
+        await asyncio.sleep(BURST_INTERVAL)
+
+    if policy is None:
+        metrics = {"dropped": 0, "maxQueueDepth": 0}
+    else:
+        # Let the subscriber finish the queue.
+        while bus.getAsyncMetrics()[subscriptionId]["queueDepth"] > 0:
+            await asyncio.sleep(BURST_INTERVAL)
+        await asyncio.sleep(2 * HANDLE_TIME)
+        metrics = bus.getAsyncMetrics()[subscriptionId]
+        bus.unsubscribe(subscriptionId)
+
+    name = "synchronous" if policy is None else policy.value
+    averageAge = subscriber.totalAge / max(subscriber.handled, 1)
+    print(f"{name:>20}: emit {emitTime / (BURSTS * CROWNSTONE_COUNT) * 1e6:8.1f} us/scan, handled {subscriber.handled:5d}, "
+          f"dropped {metrics['dropped']:5d}, max queue depth {metrics['maxQueueDepth']:4d}, average age {averageAge * 1000:7.1f} ms")
+
+
+async def main():
+    print(f"{BURSTS} bursts of {CROWNSTONE_COUNT} scans, every {BURST_INTERVAL * 1000:.0f} ms, "
+          f"subscriber takes {HANDLE_TIME * 1000:.0f} ms per scan, queue size {QUEUE_SIZE}:")
+    for policy in [None, QueuePolicy.INLINE, QueuePolicy.DROP_OLDEST, QueuePolicy.LATEST_PER_ADDRESS]:
+        await run(policy)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+"""
+Measures the time a consumer that writes scans to a store spends per scan, when it gets each scan separately on
+BleTopics.newDataAvailable, and when it gets batches on BleTopics.newDataAvailableBatch.
+
+The store is simulated by a write function with a fixed cost per call and a small cost per row, like a database or
+time-series client. Synthetic advertisements of 50 Crownstones are replayed into the Validator.
+"""
+
+import asyncio
+import time
+
+from crownstone_core.core.modules.EncryptionSettings import EncryptionSettings
+from crownstone_core.packets.Advertisement import Advertisement
+
+from crownstone_ble.core.BleEventBus import BleEventBus
+from crownstone_ble.core.modules.ScanBatcher import ScanBatcher
+from crownstone_ble.core.modules.Validator import Validator
+from crownstone_ble.topics.BleTopics import BleTopics
+from crownstone_ble.core.modules.SimulatedCrownstone import DEFAULT_KEYS
+from util.advertisements import getAddress, getStateServiceData
+
+ADDRESS_COUNT = 50
+ROUNDS = 100
+WRITE_CALL_COST = 20e-6
+WRITE_ROW_COST = 1e-6
+BATCH_SIZES = [10, 100]
+
+
+class FakeStore:
+    def __init__(self):
+        self.rows = 0
+
+    def write(self, rows):
+        end = time.perf_counter() + WRITE_CALL_COST + WRITE_ROW_COST * len(rows)
+        while time.perf_counter() < end:
+            pass
+        self.rows += len(rows)
+
+
+def getAdvertisements(serviceDataKey):
+    advertisements = []
+    for scanRound in range(0, ROUNDS):
+        for i in range(0, ADDRESS_COUNT):
+            serviceData = list(getStateServiceData(serviceDataKey, i + 1, scanRound))
+            advertisement = Advertisement(getAddress(i), -60, "CS", serviceData, 0xC001)
+            advertisement.parse(serviceDataKey)
+            advertisements.append(advertisement)
+    return advertisements
+
+
+async def measure(advertisements, batchSize):
+    validator = Validator()
+    store = FakeStore()
+    if batchSize is None:
+        subscriptionId = BleEventBus.subscribe(BleTopics.newDataAvailable, lambda scanData: store.write([scanData]))
+    else:
+        validator.batcher = ScanBatcher(window=1.0, maxItems=batchSize)
+        subscriptionId = BleEventBus.subscribe(BleTopics.newDataAvailableBatch, store.write)
+
+    start = time.perf_counter()
+    for advertisement in advertisements:
+        validator.checkAdvertisement(advertisement)
+    if validator.batcher is not None:
+        validator.batcher.flush()
+    duration = time.perf_counter() - start
+
+    BleEventBus.unsubscribe(subscriptionId)
+    return duration / len(advertisements), store.rows
+
+
+async def main():
+    settings = EncryptionSettings()
+    settings.loadKeys(*DEFAULT_KEYS)
+    advertisements = getAdvertisements(settings.serviceDataKey)
+    perScan, rows = await measure(advertisements, None)
+    print(f"{len(advertisements)} advertisements, write costs {WRITE_CALL_COST * 1e6:.0f} us per call and {WRITE_ROW_COST * 1e6:.0f} us per row:")
+    print(f"       per scan: {perScan * 1e6:6.1f} us/advertisement, {rows} rows written")
+    for batchSize in BATCH_SIZES:
+        perScan, rows = await measure(advertisements, batchSize)
+        print(f"  batches of {batchSize:3d}: {perScan * 1e6:6.1f} us/advertisement, {rows} rows written")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+Measures the amount of BleTopics.advertisement events, and the time a dashboard consumer spends on them, with and without
+coalescing per address.
+
+50 Crownstones advertise 10 times per second for 3 seconds, with a state change every 5th advertisement.
+The consumer needs 50 us per event. BleTopics.newDataAvailable is counted as well, it should get every state change in both cases.
+"""
+
+import asyncio
+import time
+
+from crownstone_core.core.modules.EncryptionSettings import EncryptionSettings
+from crownstone_core.packets.Advertisement import Advertisement
+
+from crownstone_ble.core.BleEventBus import BleEventBus
+from crownstone_ble.core.modules.AdvertisementCoalescer import AdvertisementCoalescer
+from crownstone_ble.core.modules.Validator import Validator
+from crownstone_ble.topics.BleTopics import BleTopics
+from crownstone_ble.core.modules.SimulatedCrownstone import DEFAULT_KEYS
+from util.advertisements import getAddress, getStateServiceData
+
+ADDRESS_COUNT = 50
+ADVERTISEMENTS_PER_SECOND = 10
+DURATION = 3
+CHANGE_EVERY = 5
+TICK = 0.01
+HANDLE_TIME = 50e-6
+INTERVALS = [None, 0.5, 1.0]
+
+
+class Dashboard:
+    def __init__(self):
+        self.events = 0
+        self.newData = 0
+        self.busyTime = 0.0
+
+    def handleAdvertisement(self, scanData):
+        start = time.perf_counter()
+        while time.perf_counter() - start < HANDLE_TIME:
+            pass
+        self.busyTime += time.perf_counter() - start
+        self.events += 1
+
+    def handleNewData(self, scanData):
+        self.newData += 1
+
+
+def getAdvertisement(serviceDataKey, index, count):
+    # The unique identifier only changes every CHANGE_EVERY advertisements, the rest are duplicates.
+    serviceData = list(getStateServiceData(serviceDataKey, index + 1, count // CHANGE_EVERY))
+    advertisement = Advertisement(getAddress(index), -60, "CS", serviceData, 0xC001)
+    advertisement.parse(serviceDataKey)
+    return advertisement
+
+
+async def measure(advertisements, interval):
+    validator = Validator()
+    if interval is not None:
+        validator.coalescer = AdvertisementCoalescer(validator.emitAdvertisement, interval)
+    dashboard = Dashboard()
+    subscriptionIds = [
+        BleEventBus.subscribe(BleTopics.advertisement, dashboard.handleAdvertisement),
+        BleEventBus.subscribe(BleTopics.newDataAvailable, dashboard.handleNewData),
+    ]
+
+    perTick = int(ADDRESS_COUNT * ADVERTISEMENTS_PER_SECOND * TICK)
+    for i in range(0, len(advertisements), perTick):
+        for advertisement in advertisements[i:i + perTick]:
+            validator.checkAdvertisement(advertisement)
+        await asyncio.sleep(TICK)
+    if validator.coalescer is not None:
+        validator.coalescer.flush()
+
+    for subscriptionId in subscriptionIds:
+        BleEventBus.unsubscribe(subscriptionId)
+
+    name = "no coalescing" if interval is None else f"interval {interval:.1f} s"
+    print(f"{name:>15}: {dashboard.events:5d} advertisement events, {dashboard.busyTime * 1000:6.1f} ms in the consumer, "
+          f"{dashboard.newData:4d} newDataAvailable events")
+
+
+async def main():
+    settings = EncryptionSettings()
+    settings.loadKeys(*DEFAULT_KEYS)
+    advertisements = []
+    for count in range(0, ADVERTISEMENTS_PER_SECOND * DURATION):
+        for index in range(0, ADDRESS_COUNT):
+            advertisements.append(getAdvertisement(settings.serviceDataKey, index, count))
+    print(f"{len(advertisements)} advertisements of {ADDRESS_COUNT} Crownstones in {DURATION} s:")
+    for interval in INTERVALS:
+        await measure(advertisements, interval)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
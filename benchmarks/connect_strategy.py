@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+"""
+Measures the gateway time spent on connects to a Crownstone that is switched off, with a fixed timeout and amount of
+attempts, and with the connect strategy. Also shows the adapted timeout and the latency histogram of a healthy Crownstone.
+
+The Crownstones are simulated Crownstones. Timeouts are scaled down 10 times (0.5 s instead of 5 s) to keep the run short.
+- dead:             a command every 0.1 s to a Crownstone that is switched off, without scan information.
+- dead, scanning:   the same, while the scanner has been running for the presence window without hearing the Crownstone.
+- healthy:          connects to a Crownstone in range, after which the timeout adapts to the measured latency.
+"""
+
+import asyncio
+import time
+
+from crownstone_core.Exceptions import CrownstoneBleException
+
+from crownstone_ble import CrownstoneBle
+from crownstone_ble.core.modules.ConnectStrategy import ConnectStrategy
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedCrownstone, SimulatedBackend
+from util.advertisements import getAddress
+
+COMMANDS = 10
+COMMAND_INTERVAL = 0.1
+TIMEOUT = 0.5
+ATTEMPTS = 3
+PRESENCE_WINDOW = 1.0
+
+
+def getCore(crownstone, useStrategy):
+    core = CrownstoneBle(clientBackend=SimulatedBackend([crownstone]))
+    if useStrategy:
+        core.ble.connectStrategy = ConnectStrategy(core.registry, timeout=TIMEOUT, minTimeout=0.1, attempts=ATTEMPTS, presenceWindow=PRESENCE_WINDOW,
+                                                   backoffBase=0.05, backoffMax=0.2)
+    else:
+        core.ble.connectStrategy = None
+    return core
+
+
+async def measureDead(useStrategy, scanning):
+    crownstone = SimulatedCrownstone(getAddress(0))
+    crownstone.inRange = False
+    core = getCore(crownstone, useStrategy)
+    if scanning:
+        # As if the scanner has been running for the presence window, without advertisements of this Crownstone.
+        core.ble.scanningSince = time.monotonic() - PRESENCE_WINDOW
+
+    errors = {}
+    start = time.perf_counter()
+    for i in range(0, COMMANDS):
+        try:
+            if useStrategy:
+                await core.ble.connect(crownstone.address)
+            else:
+                await core.ble.connect(crownstone.address, TIMEOUT, ATTEMPTS)
+        except CrownstoneBleException as err:
+            errors[err.type] = errors.get(err.type, 0) + 1
+        await asyncio.sleep(COMMAND_INTERVAL)
+    duration = time.perf_counter() - start - COMMANDS * COMMAND_INTERVAL
+    await core.shutDown()
+
+    name = ("strategy" if useStrategy else "fixed") + (", scanning" if scanning else "")
+    errorNames = ", ".join(f"{count} {getattr(errorType, 'name', errorType)}" for errorType, count in errors.items())
+    print(f"dead {name:>18}: {duration:6.2f} s spent on {COMMANDS} failing connects ({errorNames})")
+
+
+async def measureHealthy():
+    crownstone = SimulatedCrownstone(getAddress(1), linkLatency=0.02)
+    core = getCore(crownstone, True)
+    timeouts = []
+    for i in range(0, COMMANDS):
+        timeouts.append(core.ble.connectStrategy.getTimeout(crownstone.address))
+        await core.ble.connect(crownstone.address)
+        await core.ble.disconnect()
+    strategy = core.ble.connectStrategy
+    histogram = {bound: count for bound, count in strategy.getHistogram(crownstone.address).items() if count > 0}
+    print(f"healthy: timeout {timeouts[0]:.2f} s for the first connect, {timeouts[-1]:.2f} s after {COMMANDS - 1} connects, histogram {histogram}")
+    await core.shutDown()
+
+
+async def main():
+    print(f"timeout {TIMEOUT} s, {ATTEMPTS} attempts, presence window {PRESENCE_WINDOW} s:")
+    await measureDead(False, False)
+    await measureDead(True, False)
+    await measureDead(True, True)
+    await measureHealthy()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
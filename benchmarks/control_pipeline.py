@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+"""
+Measures the throughput of control commands over a single connection, for several amounts of commands in flight.
+
+A simulated Crownstone with a fixed link latency and processing time answers the commands. Since a write with response is a full
+round trip, pipelining hides the processing time and the result notification, not the write itself.
+"""
+
+import asyncio
+import time
+
+from crownstone_core.packets.assetFilter.builders.AssetFilter import AssetFilter
+from crownstone_core.protocol.BlePackets import ControlStateGetPacket
+from crownstone_core.protocol.BluenetTypes import StateType
+
+from crownstone_ble import CrownstoneBle
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedCrownstone, SimulatedBackend
+from util.advertisements import getAddress
+
+COMMAND_COUNT = 40
+WINDOWS = [1, 2, 4, 8]
+ADDRESS = getAddress(0)
+
+
+def getFilter():
+    return AssetFilter(0).filterByMacAddress([getAddress(i) for i in range(0, 60)]).outputMacRssiReport()
+
+
+async def measure(core, peripheral, window):
+    core.ble.maxCommandsInFlight = window
+    await core.connect(ADDRESS)
+
+    packets = [ControlStateGetPacket(StateType.SWITCH_STATE).serialize() for i in range(0, COMMAND_COUNT)]
+    start = time.perf_counter()
+    await core.control._writeControlPacketsAndGetResults(packets)
+    stateDuration = time.perf_counter() - start
+
+    handledBefore = peripheral.commandsHandled
+    start = time.perf_counter()
+    await core.control.uploadFilter(getFilter())
+    filterDuration = time.perf_counter() - start
+    chunks = peripheral.commandsHandled - handledBefore
+
+    commandQueue = core.ble.activeClient.commandQueues[next(iter(core.ble.activeClient.commandQueues))]
+    await core.disconnect()
+
+    print(f"window={window}: {COMMAND_COUNT / stateDuration:6.1f} commands/s, "
+          f"filter of {chunks} chunks in {filterDuration * 1000:6.1f} ms")
+    for commandType, latency in commandQueue.getLatencies().items():
+        print(f"    {commandType.name:<20} average={latency.getAverage() * 1000:6.1f} ms  max={latency.max * 1000:6.1f} ms")
+
+
+async def main():
+    peripheral = SimulatedCrownstone(ADDRESS, linkLatency=0.015, processingTime=0.020)
+    core = CrownstoneBle(clientBackend=SimulatedBackend([peripheral]))
+    for window in WINDOWS:
+        await measure(core, peripheral, window)
+    await core.shutDown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+"""
+Measures the time of an emit on a topic with a watcher per Crownstone, when each watcher subscribes to the whole topic
+and checks the address itself, and when each watcher subscribes with an address filter.
+"""
+
+import time
+
+from crownstone_ble.core.container.ScanData import ScanData
+from crownstone_ble.core.modules.AsyncEventBus import AsyncEventBus
+
+WATCHER_COUNTS = [10, 100, 500]
+SCANS_PER_WATCHER = 20
+TOPIC = "benchmark"
+
+
+def getAddress(index):
+    return f"00:00:00:00:{index // 256:02x}:{index % 256:02x}"
+
+
+class Watcher:
+    def __init__(self, address):
+        self.address = address
+        self.count = 0
+
+    def handleAdvertisement(self, scanData):
+        if scanData.address != self.address:
+            return
+        self.count += 1
+
+    def handleFiltered(self, scanData):
+        self.count += 1
+
+
+def getScans(watcherCount):
+    scans = []
+    for i in range(0, watcherCount * SCANS_PER_WATCHER):
+        scanData = ScanData()
+        scanData.address = getAddress(i % watcherCount)
+        scans.append(scanData)
+    return scans
+
+
+def measure(watcherCount, filtered):
+    bus = AsyncEventBus()
+    watchers = [Watcher(getAddress(i)) for i in range(0, watcherCount)]
+    for watcher in watchers:
+        if filtered:
+            bus.subscribe(TOPIC, watcher.handleFiltered, address=watcher.address)
+        else:
+            bus.subscribe(TOPIC, watcher.handleAdvertisement)
+
+    scans = getScans(watcherCount)
+    start = time.perf_counter()
+    for scanData in scans:
+        bus.emit(TOPIC, scanData)
+    duration = time.perf_counter() - start
+
+    assert sum(watcher.count for watcher in watchers) == len(scans)
+    return duration / len(scans)
+
+
+def main():
+    for watcherCount in WATCHER_COUNTS:
+        unfiltered = measure(watcherCount, False)
+        filtered = measure(watcherCount, True)
+        print(f"{watcherCount:4d} watchers: emit {unfiltered * 1e6:8.2f} us without filter, {filtered * 1e6:6.2f} us with address filter")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+"""
+Measures the time from connect until the session nonce is read, for repeated connections to the same Crownstones,
+with and without the GATT cache.
+
+Each Crownstone is a simulated Crownstone with a fixed link latency, on which a service discovery takes DISCOVERY_TIME.
+Each connection also reads the switch state, to check that the cached table works. The persistent run uses a new library
+instance with the cache file of the previous run, so even the first connections skip the discovery. The cache is keyed
+on the operation mode, so each Crownstone is scanned once first.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+from crownstone_ble import CrownstoneBle
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedCrownstone, SimulatedBackend
+from util.advertisements import getAddress, getStateAdvertisement
+
+CROWNSTONE_COUNT = 5
+ROUNDS = 4
+LINK_LATENCY = 0.015
+DISCOVERY_TIME = 0.2
+
+
+async def measure(name, crownstones, useCache, cachePath=None):
+    core = CrownstoneBle(clientBackend=SimulatedBackend(crownstones), gattCachePath=cachePath)
+    if not useCache:
+        core.ble.gattCache = None
+    discoveries = sum(crownstone.discoveryCount for crownstone in crownstones)
+    for i, crownstone in enumerate(crownstones):
+        device, advertisementData = getStateAdvertisement(crownstone.address, -60, core.settings.serviceDataKey, i + 1)
+        core.ble.scanDelegate.handleDiscovery(device, advertisementData)
+
+    connectTimes = []
+    for scanRound in range(0, ROUNDS):
+        for crownstone in crownstones:
+            start = time.perf_counter()
+            await core.connect(crownstone.address)
+            connectTimes.append(time.perf_counter() - start)
+            await core.state.getSwitchState()
+            await core.disconnect()
+    await core.shutDown()
+
+    discoveries = sum(crownstone.discoveryCount for crownstone in crownstones) - discoveries
+    firstRound = connectTimes[:CROWNSTONE_COUNT]
+    otherRounds = connectTimes[CROWNSTONE_COUNT:]
+    print(f"{name:>12}: first connect {sum(firstRound) / len(firstRound) * 1000:6.1f} ms, "
+          f"repeat connect {sum(otherRounds) / len(otherRounds) * 1000:6.1f} ms, {discoveries:3d} discoveries")
+
+
+async def main():
+    crownstones = [SimulatedCrownstone(getAddress(i), linkLatency=LINK_LATENCY, processingTime=0.005, discoveryTime=DISCOVERY_TIME)
+                   for i in range(0, CROWNSTONE_COUNT)]
+    cachePath = os.path.join(tempfile.mkdtemp(), "gatt_cache.json")
+    print(f"{ROUNDS} rounds of connections to {CROWNSTONE_COUNT} Crownstones, discovery takes {DISCOVERY_TIME * 1000:.0f} ms:")
+    await measure("no cache", crownstones, False)
+    await measure("cache", crownstones, True, cachePath)
+    await measure("persistent", crownstones, True, cachePath)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+"""
+Measures the time of a connect, command and disconnect sequence to the same Crownstone, as automation does it, with and
+without keep alive.
+
+The Crownstone is a simulated Crownstone with a fixed link latency. The time to command is the time from the start of
+connect() until the command can be written. Halfway, the Crownstone disconnects by itself, to show that the next command
+connects and reads the session nonce again.
+"""
+
+import asyncio
+import time
+
+from crownstone_ble import CrownstoneBle
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedCrownstone, SimulatedBackend
+from util.advertisements import getAddress
+
+COMMANDS = 20
+LINK_LATENCY = 0.015
+PROCESSING_TIME = 0.005
+
+
+async def measure(keepAlive):
+    crownstone = SimulatedCrownstone(getAddress(0), linkLatency=LINK_LATENCY, processingTime=PROCESSING_TIME)
+    core = CrownstoneBle(clientBackend=SimulatedBackend([crownstone]))
+    if keepAlive:
+        core.enableKeepAlive(5)
+
+    timeToCommand = 0.0
+    totalTime = 0.0
+    for i in range(0, COMMANDS):
+        if i == COMMANDS // 2 and crownstone.connected:
+            crownstone.simulateDisconnect()
+        start = time.perf_counter()
+        await core.connect(crownstone.address)
+        timeToCommand += time.perf_counter() - start
+        await core.control.setSwitch(i % 2 * 100)
+        await core.disconnect()
+        totalTime += time.perf_counter() - start
+    await core.shutDown()
+
+    name = "keep alive" if keepAlive else "no keep alive"
+    print(f"{name:>13}: time to command {timeToCommand / COMMANDS * 1000:6.1f} ms, per sequence {totalTime / COMMANDS * 1000:6.1f} ms, "
+          f"{crownstone.connectCount:2d} connections, {core.ble.reusedConnections:2d} reused")
+
+
+async def main():
+    print(f"{COMMANDS} sequences of connect, setSwitch and disconnect, link latency {LINK_LATENCY * 1000:.0f} ms:")
+    await measure(False)
+    await measure(True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
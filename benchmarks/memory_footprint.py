@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""
+Measures the memory used per tracked Crownstone and per scan, with tracemalloc.
+
+10k addresses are fed into the Validator, so it has a tracker, a heap entry and a registry device for each of them.
+The slotted classes are compared with dict backed versions of the same classes, like they were before.
+The advertisements are kept alive by the benchmark, so this does not include the first advertisement of each address,
+which the tracker cleanup callback used to keep alive as well.
+The memory per scan is measured by creating ScanData objects for 10k advertisements, and by refilling a single reused ScanData.
+"""
+
+import tracemalloc
+
+from crownstone_core.core.modules.EncryptionSettings import EncryptionSettings
+from crownstone_core.packets.Advertisement import Advertisement
+
+import crownstone_ble.core.modules.DeviceRegistry as DeviceRegistryModule
+import crownstone_ble.core.modules.Validator as ValidatorModule
+from crownstone_ble.core.container.RegisteredDevice import RegisteredDevice
+from crownstone_ble.core.container.ScanData import ScanData
+from crownstone_ble.core.container.ScanDataUtil import fillScanDataFromAdvertisement
+from crownstone_ble.core.modules.StoneAdvertisementTracker import StoneAdvertisementTracker
+from crownstone_ble.core.modules.Validator import Validator
+from crownstone_ble.core.modules.SimulatedCrownstone import DEFAULT_KEYS
+from util.advertisements import getAddress, getStateServiceData
+
+ADDRESS_COUNT = 10000
+
+
+def withoutSlots(cls):
+    """ Copy of the class without __slots__, so it is dict backed, like the classes were before. """
+    skip = set(cls.__slots__) | {"__slots__"}
+    return type("Dict" + cls.__name__, (), {key: value for key, value in cls.__dict__.items() if key not in skip})
+
+DictStoneAdvertisementTracker = withoutSlots(StoneAdvertisementTracker)
+DictRegisteredDevice          = withoutSlots(RegisteredDevice)
+DictScanData                  = withoutSlots(ScanData)
+
+
+def getAdvertisements(serviceDataKey):
+    advertisements = []
+    for i in range(0, ADDRESS_COUNT):
+        serviceData = list(getStateServiceData(serviceDataKey, i % 255 + 1, 0))
+        advertisement = Advertisement(getAddress(i), -60, "CS", serviceData, 0xC001)
+        advertisement.parse(serviceDataKey)
+        advertisements.append(advertisement)
+    return advertisements
+
+
+def measureTracking(advertisements, slotted):
+    ValidatorModule.StoneAdvertisementTracker = StoneAdvertisementTracker if slotted else DictStoneAdvertisementTracker
+    DeviceRegistryModule.RegisteredDevice = RegisteredDevice if slotted else DictRegisteredDevice
+    ValidatorModule.fillScanDataFromAdvertisement = \
+        fillScanDataFromAdvertisement if slotted else lambda advertisement, validated: fillScanDataFromAdvertisement(advertisement, validated, DictScanData())
+
+    tracemalloc.start()
+    validator = Validator()
+    for advertisement in advertisements:
+        validator.checkAdvertisement(advertisement)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / ADDRESS_COUNT
+
+
+def measureScans(advertisements, scanDataClass, reuse):
+    tracemalloc.start()
+    reused = scanDataClass()
+    scans = []
+    for advertisement in advertisements:
+        if reuse:
+            fillScanDataFromAdvertisement(advertisement, True, reused)
+        else:
+            scans.append(fillScanDataFromAdvertisement(advertisement, True, scanDataClass()))
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / ADDRESS_COUNT
+
+
+def main():
+    settings = EncryptionSettings()
+    settings.loadKeys(*DEFAULT_KEYS)
+    advertisements = getAdvertisements(settings.serviceDataKey)
+
+    print(f"{ADDRESS_COUNT} tracked addresses:")
+    print(f"    per device, dict backed:  {measureTracking(advertisements, False):6.0f} bytes")
+    print(f"    per device, slotted:      {measureTracking(advertisements, True):6.0f} bytes")
+    print(f"    (includes the ScanData kept by the registry, the tracker cleanup callback, and the dict and heap entries)")
+    print(f"{ADDRESS_COUNT} scans:")
+    print(f"    per ScanData, dict backed: {measureScans(advertisements, DictScanData, False):6.0f} bytes")
+    print(f"    per ScanData, slotted:     {measureScans(advertisements, ScanData, False):6.0f} bytes")
+    print(f"    per scan, reused ScanData: {measureScans(advertisements, ScanData, True):6.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""
+Measures a microapp rollout to a fleet of simulated Crownstones.
+
+- Packets:   the time spent making the chunk packets for the whole fleet, once per Crownstone (like a run of the upload
+             tool per Crownstone), and once for the fleet with a shared MicroappBinary.
+- Rollout:   the wall-clock time of uploading, validating and enabling the app on each Crownstone in sequence, and with
+             rolloutMicroapp for several concurrency values. During the rollouts, a few Crownstones are out of range.
+             They fail, and are done by retryFailed once they are back in range, without uploading to the others again.
+"""
+
+import asyncio
+import os
+import time
+
+from crownstone_ble import CrownstoneBle
+from crownstone_ble.core.modules.ConnectStrategy import ConnectStrategy
+from crownstone_ble.core.modules.MicroappUploader import MicroappBinary
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedCrownstone, SimulatedBackend
+from util.advertisements import getAddress
+
+CROWNSTONE_COUNT = 24
+OUT_OF_RANGE = 3
+APP_SIZE = 4 * 1024
+CHUNK_SIZE = 224
+PACKET_FLEET_SIZE = 200
+LINK_LATENCY = 0.005
+MTU = 247
+MAX_CONNECTIONS = 8
+
+
+def getPackets(binary):
+    return [binary.getChunkPacket(offset, CHUNK_SIZE) for offset in range(0, len(binary.data), CHUNK_SIZE)]
+
+
+def measurePackets(data):
+    start = time.perf_counter()
+    for i in range(0, PACKET_FLEET_SIZE):
+        getPackets(MicroappBinary(data))
+    perCrownstone = time.perf_counter() - start
+
+    start = time.perf_counter()
+    binary = MicroappBinary(data)
+    for i in range(0, PACKET_FLEET_SIZE):
+        getPackets(binary)
+    shared = time.perf_counter() - start
+    print(f"packets for {PACKET_FLEET_SIZE} Crownstones: {perCrownstone * 1000:6.1f} ms when made per Crownstone, {shared * 1000:6.1f} ms when shared")
+
+
+def getCore(crownstones):
+    core = CrownstoneBle(maxConnections=MAX_CONNECTIONS, clientBackend=SimulatedBackend(crownstones))
+    # Fail fast on the Crownstones that are out of range.
+    core.ble.connectStrategy = ConnectStrategy(core.registry, timeout=0.2, attempts=1, failureThreshold=10)
+    return core
+
+
+async def measureSequential(data):
+    crownstones = [SimulatedCrownstone(getAddress(i), linkLatency=LINK_LATENCY, mtu=MTU) for i in range(0, CROWNSTONE_COUNT)]
+    core = getCore(crownstones)
+    start = time.perf_counter()
+    for crownstone in crownstones:
+        await core.connect(crownstone.address)
+        await core._dev.uploadMicroapp(data)
+        await core._dev.validateMicroapp(0)
+        await core._dev.enableMicroapp(0)
+        await core.disconnect()
+    duration = time.perf_counter() - start
+    print(f"{'sequential':>14}: {duration:5.2f} s for {CROWNSTONE_COUNT} Crownstones")
+    await core.shutDown()
+
+
+async def measureRollout(data, concurrency):
+    crownstones = [SimulatedCrownstone(getAddress(i), linkLatency=LINK_LATENCY, mtu=MTU) for i in range(0, CROWNSTONE_COUNT)]
+    for crownstone in crownstones[:OUT_OF_RANGE]:
+        crownstone.inRange = False
+    core = getCore(crownstones)
+    addresses = [crownstone.address for crownstone in crownstones]
+
+    start = time.perf_counter()
+    rollout = await core.rolloutMicroapp(addresses, data, concurrency=concurrency, attempts=2, retryDelay=0.1)
+    duration = time.perf_counter() - start
+    failed = len(rollout.getFailed())
+    done = sum(1 for progress in rollout.getProgress().values() if progress == 1.0)
+
+    for crownstone in crownstones[:OUT_OF_RANGE]:
+        crownstone.inRange = True
+    uploadsBefore = sum(crownstone.commandsHandled for crownstone in crownstones[OUT_OF_RANGE:])
+    start = time.perf_counter()
+    await rollout.retryFailed()
+    retryDuration = time.perf_counter() - start
+    uploadsAfter = sum(crownstone.commandsHandled for crownstone in crownstones[OUT_OF_RANGE:])
+
+    installed = sum(1 for crownstone in crownstones if len(crownstone.microapps.get(0, b"")) >= APP_SIZE)
+    print(f"{f'concurrency {concurrency}':>14}: {duration:5.2f} s, {done} done, {failed} failed, retryFailed {retryDuration:4.2f} s "
+          f"({uploadsAfter - uploadsBefore} commands to the others), {installed}/{CROWNSTONE_COUNT} installed")
+    await core.shutDown()
+
+
+async def main():
+    data = os.urandom(APP_SIZE)
+    measurePackets(data)
+    print(f"{APP_SIZE} byte microapp to {CROWNSTONE_COUNT} Crownstones, link latency {LINK_LATENCY * 1000:.0f} ms, MTU {MTU}, "
+          f"{OUT_OF_RANGE} out of range during the rollouts:")
+    await measureSequential(data)
+    for concurrency in [1, 4, MAX_CONNECTIONS]:
+        await measureRollout(data, concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
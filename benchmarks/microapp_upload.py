@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""
+Measures the upload of a 20 KB microapp to a simulated Crownstone, over a stable and a flaky link, the way the upload
+tool used to do it, and with the MicroappUploader.
+
+- from start:  chunks of 192 bytes, and the upload starts again at offset 0 when the connection is lost.
+- uploader:    core._dev.uploadMicroapp, which picks the chunk size from the MTU, and resumes from the last acknowledged offset.
+On the flaky link, the Crownstone disconnects after random intervals. Both runs get the same intervals.
+Finally, the app is validated, and the upload of the same binary again is measured, which the uploader skips.
+"""
+
+import asyncio
+import os
+import random
+import time
+
+from crownstone_ble import CrownstoneBle
+from crownstone_ble.core.modules.MicroappUploader import padBinary
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedCrownstone, SimulatedBackend
+from util.advertisements import getAddress
+
+APP_SIZE = 20 * 1024
+OLD_CHUNK_SIZE = 192
+LINK_LATENCY = 0.005
+MTU = 247
+# Mean time in seconds between disconnects of the flaky link.
+FLAKY_INTERVAL = 1.0
+MAX_RESTARTS = 30
+
+
+async def disconnectRandomly(crownstone, seed):
+    generator = random.Random(seed)
+    while True:
+        await asyncio.sleep(generator.expovariate(1 / FLAKY_INTERVAL))
+        if crownstone.connected:
+            crownstone.simulateDisconnect()
+
+
+async def uploadFromStart(core, address, data):
+    restarts = 0
+    while True:
+        try:
+            await core.connect(address)
+            for offset in range(0, len(data), OLD_CHUNK_SIZE):
+                await core._dev.uploadMicroappChunk(0, padBinary(data[offset : offset + OLD_CHUNK_SIZE]), offset)
+            return restarts
+        except Exception:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise
+
+
+async def measure(name, data, flaky, useUploader):
+    crownstone = SimulatedCrownstone(getAddress(0), linkLatency=LINK_LATENCY, mtu=MTU)
+    core = CrownstoneBle(clientBackend=SimulatedBackend([crownstone]))
+    disconnector = asyncio.ensure_future(disconnectRandomly(crownstone, 1)) if flaky else None
+
+    start = time.perf_counter()
+    if useUploader:
+        await core.connect(crownstone.address)
+        result = await core._dev.uploadMicroapp(data)
+        details = f"chunk size {result.chunkSize}, resumed {result.resumes} times"
+    else:
+        restarts = await uploadFromStart(core, crownstone.address, data)
+        details = f"chunk size {OLD_CHUNK_SIZE}, restarted {restarts} times"
+    duration = time.perf_counter() - start
+
+    if disconnector is not None:
+        disconnector.cancel()
+    assert bytes(crownstone.microapps[0]) == padBinary(data)
+    print(f"{name:>22}: {duration:5.2f} s, {len(data) / duration / 1024:5.1f} KB/s, {details}")
+
+    if useUploader and not flaky:
+        await core._dev.validateMicroapp(0)
+        start = time.perf_counter()
+        await core.connect(crownstone.address)
+        result = await core._dev.uploadMicroapp(data)
+        print(f"{'uploader, same binary':>22}: {time.perf_counter() - start:5.2f} s, skipped: {result.skipped}")
+
+    if await core.ble.is_connected():
+        await core.disconnect()
+    await core.shutDown()
+
+
+async def main():
+    data = os.urandom(APP_SIZE)
+    print(f"{APP_SIZE} byte microapp, link latency {LINK_LATENCY * 1000:.0f} ms, MTU {MTU}, flaky link disconnects every {FLAKY_INTERVAL} s on average:")
+    await measure("stable, from start", data, False, False)
+    await measure("stable, uploader", data, False, True)
+    await measure("flaky, from start", data, True, False)
+    await measure("flaky, uploader", data, True, True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+"""
+Measures the scan events and the connection routing when scanning on 3 adapters, spread along a corridor with 60 Crownstones.
+
+Each advertisement is heard by every adapter within range, with an RSSI that drops with the distance.
+- Scans: the advertisements of all adapters are passed to a single-adapter pipeline (duplicates included), and to a
+  3-adapter pipeline, which drops the duplicates. Prints the amount of BleTopics.rawAdvertisement events, and the time
+  spent in the scan delegate.
+- Routing: all Crownstones are switched with switchMany via simulated Crownstones, in random order, with a low and a high
+  concurrency. Prints the connections per adapter, and how many were made via the adapter nearest to the Crownstone.
+  The busier an adapter is, the more connections go to an adapter that hears the Crownstone less well.
+"""
+
+import asyncio
+import random
+import time
+
+from crownstone_ble import CrownstoneBle, BleTopics
+from crownstone_ble.core.BleEventBus import BleEventBus
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedCrownstone, SimulatedBackend
+from util.advertisements import getAddress, getStateAdvertisement
+
+ADAPTERS = ["00:00:00:00:aa:01", "00:00:00:00:aa:02", "00:00:00:00:aa:03"]
+ADAPTER_POSITIONS = [5, 30, 55]
+CROWNSTONE_COUNT = 60
+ROUNDS = 20
+# RSSI at a distance of 0 m, and the drop per meter.
+RSSI_AT_ADAPTER = -40
+RSSI_PER_METER = 1.5
+MIN_RSSI = -95
+
+
+def getRssi(adapterIndex, crownstoneIndex):
+    return int(RSSI_AT_ADAPTER - RSSI_PER_METER * abs(ADAPTER_POSITIONS[adapterIndex] - crownstoneIndex))
+
+
+def getScans(serviceDataKey):
+    scans = []
+    for scanRound in range(0, ROUNDS):
+        for i in range(0, CROWNSTONE_COUNT):
+            for adapterIndex, adapter in enumerate(ADAPTERS):
+                rssi = getRssi(adapterIndex, i)
+                if rssi >= MIN_RSSI:
+                    device, advertisementData = getStateAdvertisement(getAddress(i), rssi, serviceDataKey, i + 1, scanRound)
+                    scans.append((adapter, device, advertisementData))
+    return scans
+
+
+async def measureScans(name, core, scans):
+    count = 0
+    def countEvent(data):
+        nonlocal count
+        count += 1
+    subscriptionId = BleEventBus.subscribe(BleTopics.rawAdvertisement, countEvent)
+    multiAdapter = core.ble.adapterRouter is not None
+    start = time.perf_counter()
+    for adapter, device, advertisementData in scans:
+        if multiAdapter:
+            core.ble.scanDelegate.handleAdapterDiscovery(device, advertisementData, adapter)
+        else:
+            core.ble.scanDelegate.handleDiscovery(device, advertisementData)
+    duration = time.perf_counter() - start
+    BleEventBus.unsubscribe(subscriptionId)
+    print(f"{name:>10}: {len(scans)} scans, {count:5d} rawAdvertisement events, {duration / len(scans) * 1e6:5.1f} us per scan")
+
+
+class RoutingBackend(SimulatedBackend):
+    """ Remembers the adapter of each connection. """
+    def __init__(self, crownstones):
+        super().__init__(crownstones)
+        self.adapters = {}
+
+    def __call__(self, address, **kwargs):
+        self.adapters[address.lower()] = kwargs.get("adapter", None)
+        return super().__call__(address, **kwargs)
+
+
+async def main():
+    addresses = [getAddress(i) for i in range(0, CROWNSTONE_COUNT)]
+    backend = RoutingBackend([SimulatedCrownstone(address, linkLatency=0.01) for address in addresses])
+
+    # One library instance at a time, since they share the event bus.
+    single = CrownstoneBle(bleAdapterAddress=ADAPTERS[0], clientBackend=backend)
+    scans = getScans(single.settings.serviceDataKey)
+    await measureScans("1 adapter", single, scans)
+    await single.shutDown()
+    multi = CrownstoneBle(bleAdapterAddress=ADAPTERS, clientBackend=backend)
+    await measureScans("3 adapters", multi, scans)
+
+    sample = multi.registry.getDevice(addresses[20]).scanData
+    print(f"RSSI per adapter of {addresses[20]}: {sample.adapterRssi}")
+
+    order = list(addresses)
+    random.Random(1).shuffle(order)
+    for concurrency in [len(ADAPTERS), len(ADAPTERS) * multi.ble.maxConnections]:
+        backend.adapters = {}
+        start = time.perf_counter()
+        report = await multi.switchMany({address: 100 for address in order}, concurrency=concurrency)
+        duration = time.perf_counter() - start
+        nearest = 0
+        for i, address in enumerate(addresses):
+            distances = [abs(position - i) for position in ADAPTER_POSITIONS]
+            if backend.adapters[address] == ADAPTERS[distances.index(min(distances))]:
+                nearest += 1
+        connections = {adapter: list(backend.adapters.values()).count(adapter) for adapter in ADAPTERS}
+        successes = sum(1 for result in report.values() if result.success)
+        print(f"concurrency {concurrency:2d}: switched {successes}/{CROWNSTONE_COUNT} in {duration * 1000:4.0f} ms, "
+              f"connections per adapter {list(connections.values())}, {nearest}/{CROWNSTONE_COUNT} via the nearest adapter")
+    await multi.shutDown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
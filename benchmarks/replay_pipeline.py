@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+"""
+Measures the throughput and latency of the scan pipeline (BleakScanDelegate -> Validator -> BleTopics), by replaying
+a recording with the ReplayScanner.
+
+A recording of synthetic advertisements of 50 Crownstones and other devices is made with the AdvertisementRecorder.
+Pass the path of a recording made with CrownstoneBle.startRecording to replay that one instead.
+It is replayed as fast as possible to measure the throughput and the time per callback, and in real time to measure
+how closely the replay follows the recorded timing.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from crownstone_ble import CrownstoneBle, BleTopics
+from crownstone_ble.core.BleEventBus import BleEventBus
+from crownstone_ble.core.modules.AdvertisementRecording import AdvertisementRecorder, readRecording
+from crownstone_ble.core.modules.ReplayScanner import ReplayScanner
+from util.advertisements import getAddress, getStateAdvertisement
+from scan_filter import getNoiseAdvertisement
+
+CROWNSTONE_COUNT = 50
+ROUNDS = 100
+NOISE_PER_CROWNSTONE = 2
+REAL_TIME_DURATION = 1.0
+
+
+def makeRecording(path, serviceDataKey):
+    recorder = AdvertisementRecorder(path)
+    for scanRound in range(0, ROUNDS):
+        for i in range(0, CROWNSTONE_COUNT):
+            recorder.record(*getStateAdvertisement(getAddress(i), -60, serviceDataKey, i + 1, scanRound))
+            for noise in range(0, NOISE_PER_CROWNSTONE):
+                recorder.record(*getNoiseAdvertisement(i * NOISE_PER_CROWNSTONE + noise))
+    recorder.close()
+    # Spread the records over REAL_TIME_DURATION, instead of the time it took to write them.
+    records = readRecording(path)
+    for i, record in enumerate(records):
+        record.timestamp = i * REAL_TIME_DURATION / len(records)
+    return records
+
+
+class TimedDelegate:
+    """ Measures the time each callback spends in the pipeline. """
+    def __init__(self, handleDiscovery):
+        self.handleDiscovery = handleDiscovery
+        self.totalTime = 0.0
+        self.callbackTimes = []
+
+    def callback(self, device, advertisementData):
+        start = time.perf_counter()
+        self.handleDiscovery(device, advertisementData)
+        end = time.perf_counter()
+        self.totalTime += end - start
+        self.callbackTimes.append(end)
+
+
+async def replay(core, scanner):
+    counts = {BleTopics.rawAdvertisement: 0, BleTopics.advertisement: 0, BleTopics.newDataAvailable: 0}
+    subscriptionIds = [BleEventBus.subscribe(topic, lambda data, topic=topic: counts.__setitem__(topic, counts[topic] + 1)) for topic in counts]
+
+    await core.ble.setScanner(scanner)
+    timed = TimedDelegate(scanner.callback)
+    scanner.register_detection_callback(timed.callback)
+
+    start = time.perf_counter()
+    await core.ble.startScanning()
+    await scanner.waitUntilFinished()
+    duration = time.perf_counter() - start
+    await core.ble.stopScanning()
+
+    for subscriptionId in subscriptionIds:
+        BleEventBus.unsubscribe(subscriptionId)
+    return duration, timed, counts
+
+
+async def main():
+    core = CrownstoneBle()
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+        records = readRecording(path)
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "scans.csrec")
+        records = makeRecording(path, core.settings.serviceDataKey)
+    print(f"{len(records)} records, {os.path.getsize(path) / len(records):.1f} bytes per record")
+
+    scanner = ReplayScanner(path, realTime=False)
+    duration, timed, counts = await replay(core, scanner)
+    print(f"max speed:  {len(records) / duration:8.0f} callbacks/s, {timed.totalTime / len(records) * 1e6:6.1f} us per callback in the pipeline")
+    print(f"            events: {counts}")
+
+    if len(sys.argv) <= 1:
+        # Replay with the spread out timestamps.
+        scanner = ReplayScanner(path, realTime=True)
+        scanner.records = records
+        duration, timed, counts = await replay(core, scanner)
+        lag = [callbackTime - timed.callbackTimes[0] - (record.timestamp - records[0].timestamp) for callbackTime, record in zip(timed.callbackTimes, records)]
+        print(f"real time:  {duration:8.3f} s for {REAL_TIME_DURATION:.3f} s of recording, "
+              f"average lag {sum(lag) / len(lag) * 1000:.2f} ms, max lag {max(lag) * 1000:.2f} ms")
+
+    await core.shutDown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
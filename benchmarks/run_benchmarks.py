@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+"""
+Runs a fixed set of workloads against the library, and stores the results as JSON, so runs can be compared.
+
+All workloads run offline, with synthetic advertisements (or a recording) and simulated Crownstones without link latency,
+so they measure the time spent in the library itself:
+- ingestion:  advertisements per second through BleakScanDelegate -> Validator -> BleTopics, for several fleet sizes.
+- merge:      notifications per second merged and decrypted by the NotificationDelegate.
+- control:    latency percentiles of control commands, written and answered via a SimulatedCrownstone.
+- upload:     asset filter upload throughput, in bytes per second.
+- microapp:   microapp upload throughput, in bytes per second: chunk by chunk with a fixed chunk size, and with uploadMicroapp.
+- memory:     peak memory while ingesting the first advertisements of the largest fleet.
+
+Usage:
+    python3 run_benchmarks.py --output results.json
+    python3 run_benchmarks.py --compare results.json
+    python3 run_benchmarks.py --recording scans.csrec
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from crownstone_core.core.modules.EncryptionSettings import EncryptionSettings
+from crownstone_core.packets.assetFilter.builders.AssetFilter import AssetFilter
+from crownstone_core.protocol.BlePackets import SUPPORTED_PROTOCOL_VERSION
+from crownstone_core.protocol.BluenetTypes import ResultValue
+from crownstone_core.util.Conversion import Conversion
+from crownstone_core.util.EncryptionHandler import EncryptionHandler
+
+from crownstone_ble import CrownstoneBle
+from crownstone_ble.core.BleEventBus import BleEventBus
+from crownstone_ble.core.bluetooth_delegates.BleakScanDelegate import BleakScanDelegate
+from crownstone_ble.core.bluetooth_delegates.NotificationDelegate import NotificationDelegate, LAST_PACKET_INDEX
+from crownstone_ble.core.modules.AdvertisementRecording import readRecording
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedCrownstone, SimulatedBackend, DEFAULT_KEYS
+from crownstone_ble.core.modules.Validator import Validator
+from util.advertisements import getAddress, getStateAdvertisement
+
+FLEET_SIZES = [10, 100, 1000]
+ADVERTISEMENTS_PER_RUN = 10000
+MERGE_RESULTS = 2000
+CONTROL_COMMANDS = 500
+UPLOAD_FILTERS = 20
+MICROAPP_SIZE = 20 * 1024
+MICROAPP_UPLOADS = 5
+# Chunk size of the chunk by chunk upload, like the upload tool uses.
+MICROAPP_CHUNK_SIZE = 192
+# tracemalloc makes ingestion a lot slower, so the memory workload only uses the first advertisements.
+MEMORY_ADVERTISEMENTS = 2000
+# By default, a metric that is this much worse than in the compared run, is reported as a regression.
+REGRESSION_THRESHOLD = 0.15
+
+
+class Results:
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, higherIsBetter):
+        self.metrics[name] = {"value": value, "unit": unit, "higherIsBetter": higherIsBetter}
+        print(f"    {name:<42} {value:14.2f} {unit}")
+
+
+def getSettings():
+    settings = EncryptionSettings()
+    settings.loadKeys(*DEFAULT_KEYS)
+    return settings
+
+
+def getSyntheticAdvertisements(settings, fleetSize):
+    advertisements = []
+    rounds = max(1, ADVERTISEMENTS_PER_RUN // fleetSize)
+    for scanRound in range(0, rounds):
+        for i in range(0, fleetSize):
+            # Each advertisement has different service data, like a real fleet.
+            uniqueIdentifier = scanRound * fleetSize + i
+            advertisements.append(getStateAdvertisement(getAddress(i), -60 - i % 30, settings.serviceDataKey, i % 255 + 1, uniqueIdentifier))
+    return advertisements
+
+
+def ingest(settings, advertisements):
+    delegate = BleakScanDelegate(settings)
+    validator = Validator()
+    start = time.perf_counter()
+    for device, advertisementData in advertisements:
+        delegate.handleDiscovery(device, advertisementData)
+    duration = time.perf_counter() - start
+    BleEventBus.unsubscribe(validator.subscriptionId)
+    return duration
+
+
+def benchmarkIngestion(results, settings, workloads, repeat):
+    print("ingestion")
+    for name, advertisements in workloads.items():
+        duration = min(ingest(settings, advertisements) for i in range(0, repeat))
+        results.add(f"ingestion.{name}.advertisementsPerSecond", len(advertisements) / duration, "advertisements/s", True)
+
+
+def benchmarkMemory(results, settings, workloads):
+    print("memory")
+    name, advertisements = list(workloads.items())[-1]
+    tracemalloc.start()
+    ingest(settings, advertisements[:MEMORY_ADVERTISEMENTS])
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.add(f"memory.{name}.peakKiB", peak / 1024, "KiB", False)
+
+
+def getResultNotifications(settings, payloadSize, mtu=23):
+    result = [SUPPORTED_PROTOCOL_VERSION] + Conversion.uint16_to_uint8_array(1) + Conversion.uint16_to_uint8_array(ResultValue.SUCCESS)
+    result += Conversion.uint16_to_uint8_array(payloadSize) + [0] * payloadSize
+    encrypted = list(EncryptionHandler.encrypt(result, settings))
+    partSize = mtu - 4
+    parts = [encrypted[i : i + partSize] for i in range(0, len(encrypted), partSize)]
+    return [bytearray([LAST_PACKET_INDEX if index == len(parts) - 1 else index] + part) for index, part in enumerate(parts)]
+
+
+async def benchmarkMerge(results, repeat):
+    print("merge")
+    settings = getSettings()
+    settings.setSessionNonce([1, 2, 3, 4, 5])
+    settings.setValidationKey([1, 2, 3, 4])
+    notifications = getResultNotifications(settings, 40)
+    delegate = NotificationDelegate(None, settings)
+    delegate.resultListener = lambda result: None
+
+    durations = []
+    for i in range(0, repeat):
+        start = time.perf_counter()
+        for j in range(0, MERGE_RESULTS):
+            for notification in notifications:
+                delegate.merge(notification)
+        durations.append(time.perf_counter() - start)
+        # Let the merged results be delivered.
+        await asyncio.sleep(0)
+    results.add("merge.notificationsPerSecond", MERGE_RESULTS * len(notifications) / min(durations), "notifications/s", True)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def benchmarkControl(results):
+    print("control")
+    address = getAddress(0)
+    crownstone = SimulatedCrownstone(address, linkLatency=0, processingTime=0)
+    core = CrownstoneBle(clientBackend=SimulatedBackend([crownstone]))
+    await core.connect(address)
+
+    latencies = []
+    for i in range(0, CONTROL_COMMANDS):
+        start = time.perf_counter()
+        await core.state.getSwitchState()
+        latencies.append(time.perf_counter() - start)
+    results.add("control.getSwitchState.p50", percentile(latencies, 0.50) * 1000, "ms", False)
+    results.add("control.getSwitchState.p90", percentile(latencies, 0.90) * 1000, "ms", False)
+    results.add("control.getSwitchState.p99", percentile(latencies, 0.99) * 1000, "ms", False)
+
+    print("upload")
+    assetFilter = AssetFilter(0).filterByMacAddress([getAddress(i) for i in range(0, 60)]).outputMacRssiReport()
+    filterSize = len(assetFilter.serialize())
+    start = time.perf_counter()
+    for i in range(0, UPLOAD_FILTERS):
+        await core.control.uploadFilter(assetFilter)
+    duration = time.perf_counter() - start
+    results.add("upload.filter.bytesPerSecond", UPLOAD_FILTERS * filterSize / duration, "bytes/s", True)
+
+    await core.disconnect()
+    await core.shutDown()
+
+
+async def benchmarkMicroapp(results):
+    print("microapp")
+    address = getAddress(0)
+    crownstone = SimulatedCrownstone(address, linkLatency=0, processingTime=0, mtu=247)
+    core = CrownstoneBle(clientBackend=SimulatedBackend([crownstone]))
+    await core.connect(address)
+
+    data = os.urandom(MICROAPP_SIZE)
+    start = time.perf_counter()
+    for i in range(0, MICROAPP_UPLOADS):
+        for offset in range(0, MICROAPP_SIZE, MICROAPP_CHUNK_SIZE):
+            await core._dev.uploadMicroappChunk(0, data[offset : offset + MICROAPP_CHUNK_SIZE], offset)
+    duration = time.perf_counter() - start
+    results.add("microapp.chunks.bytesPerSecond", MICROAPP_UPLOADS * MICROAPP_SIZE / duration, "bytes/s", True)
+
+    start = time.perf_counter()
+    for i in range(0, MICROAPP_UPLOADS):
+        await core._dev.uploadMicroapp(data, force=True)
+    duration = time.perf_counter() - start
+    results.add("microapp.upload.bytesPerSecond", MICROAPP_UPLOADS * MICROAPP_SIZE / duration, "bytes/s", True)
+
+    await core.disconnect()
+    await core.shutDown()
+
+
+def getMetadata(recording):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "time":      time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit":    commit,
+        "version":   CrownstoneBle.__version__,
+        "python":    platform.python_version(),
+        "platform":  platform.platform(),
+        "recording": recording,
+    }
+
+
+def compare(metrics, path, threshold):
+    with open(path, "r") as file:
+        previous = json.load(file)["metrics"]
+    print(f"compared with {path}:")
+    regressions = 0
+    for name, metric in metrics.items():
+        if name not in previous:
+            continue
+        old = previous[name]["value"]
+        change = (metric["value"] - old) / old if old != 0 else 0.0
+        worse = -change if metric["higherIsBetter"] else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"    {name:<42} {old:14.2f} -> {metric['value']:14.2f} {metric['unit']:<18} {change * 100:+6.1f}%{flag}")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--output", help="Store the results as JSON in this file.")
+    parser.add_argument("--compare", help="Compare with the results in this JSON file. Exits with 1 on regressions.")
+    parser.add_argument("--recording", help="Ingest this recording, instead of synthetic advertisements.")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Relative change that counts as a regression.")
+    parser.add_argument("--repeat", type=int, default=3, help="Amount of runs of the throughput workloads, the best run counts.")
+    args = parser.parse_args()
+
+    settings = getSettings()
+    if args.recording is not None:
+        records = readRecording(args.recording)
+        workloads = {"recording": [(record.device, record.advertisementData) for record in records]}
+    else:
+        workloads = {f"fleet{fleetSize}": getSyntheticAdvertisements(settings, fleetSize) for fleetSize in FLEET_SIZES}
+
+    results = Results()
+    benchmarkIngestion(results, settings, workloads, args.repeat)
+    await benchmarkMerge(results, args.repeat)
+    await benchmarkControl(results)
+    await benchmarkMicroapp(results)
+    benchmarkMemory(results, settings, workloads)
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump({"metadata": getMetadata(args.recording), "metrics": results.metrics}, file, indent=2)
+        print(f"stored results in {args.output}")
+
+    if args.compare is not None:
+        if compare(results.metrics, args.compare, args.threshold) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+"""
+Measures the time between the advertisement that satisfies a scan helper and the moment that helper returns.
+
+A fake BleakScanner replays advertisements of a small fleet, the matching advertisement is the last one of each run.
+"""
+
+import asyncio
+import statistics
+import time
+
+from crownstone_core.Enums import CrownstoneOperationMode
+
+from crownstone_ble import CrownstoneBle
+from util.advertisements import getAddress, getSetupAdvertisement, getStateAdvertisement
+from util.fake_scanner import FakeBleakScanner, useFakeScanner
+
+RUNS = 20
+FLEET_SIZE = 10
+TARGET_ADDRESS = getAddress(FLEET_SIZE)
+
+
+def getFleetAdvertisements(core, targetAdvertisement):
+    advertisements = []
+    for i in range(0, FLEET_SIZE):
+        # RSSI below the threshold used below, so these never satisfy the nearest selector.
+        advertisements.append(getStateAdvertisement(getAddress(i), -95, core.settings.serviceDataKey, i + 1, i))
+    advertisements.append(targetAdvertisement)
+    return advertisements
+
+
+async def measure(core, advertisements, helper):
+    latencies = []
+    for run in range(0, RUNS):
+        scanner = FakeBleakScanner(advertisements, interval=0.005)
+        useFakeScanner(core, scanner)
+        await helper()
+        returnTime = time.perf_counter()
+        latencies.append((returnTime - scanner.deliveryTimes[-1]) * 1000)
+    return latencies
+
+
+def report(name, latencies):
+    print(f"{name:<40} mean={statistics.mean(latencies):7.2f} ms  max={max(latencies):7.2f} ms")
+
+
+async def main():
+    core = CrownstoneBle()
+
+    stateAdvertisements = getFleetAdvertisements(core, getStateAdvertisement(TARGET_ADDRESS, -50, core.settings.serviceDataKey, 100))
+    setupAdvertisements = getFleetAdvertisements(core, getSetupAdvertisement(TARGET_ADDRESS, -50))
+
+    report("getNearestCrownstone(returnFirstAcceptable)", await measure(core, stateAdvertisements,
+        lambda: core.getNearestCrownstone(rssiAtLeast=-80, scanDuration=5, returnFirstAcceptable=True)))
+    report("getMode", await measure(core, stateAdvertisements,
+        lambda: core.getMode(TARGET_ADDRESS, scanDuration=5)))
+    report("waitForMode(SETUP)", await measure(core, setupAdvertisements,
+        lambda: core.waitForMode(TARGET_ADDRESS, CrownstoneOperationMode.SETUP, scanDuration=5)))
+
+    await core.shutDown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+"""
+Measures the time spent in Python on scans in a busy environment, with and without the OS level scan filter.
+
+Each scan reaches Python as a PropertiesChanged signal of BlueZ on D-Bus. Per scan, txdbus parses the message, bleak's
+BlueZ scanner turns it into a BLEDevice and AdvertisementData, and calls the scan delegate. Without the scan filter, this
+happens for the advertisements of all devices around, like phones, wearables and beacons. With the scan filter, BlueZ
+drops the advertisements without Crownstone service data before they are sent on D-Bus, so only the Crownstone
+advertisements are handled.
+
+This is measured for several shares of advertisements of other devices. In an office or a home, other devices usually
+send most of the advertisements.
+"""
+
+import os
+import time
+
+from crownstone_core.core.modules.EncryptionSettings import EncryptionSettings
+from bleak.backends.bluezdbus.scanner import BleakScannerBlueZDBus
+from txdbus import message
+
+from crownstone_ble.core.bluetooth_delegates.BleakScanDelegate import BleakScanDelegate
+from crownstone_ble.core.modules.SimulatedCrownstone import DEFAULT_KEYS
+from util.advertisements import CROWNSTONE_SERVICE_UUID, getAddress, getStateServiceData
+
+CROWNSTONE_COUNT = 50
+ROUNDS = 40
+# Amount of advertisements of other devices per Crownstone advertisement.
+NOISE_PER_CROWNSTONE = [1, 4, 9, 19]
+APPLE_COMPANY_ID = 0x004C
+
+
+def getPath(address):
+    return "/org/bluez/hci0/dev_" + address.upper().replace(":", "_")
+
+
+def getSignal(address, changed):
+    """
+    :returns: The raw PropertiesChanged signal that BlueZ sends for a scan.
+    """
+    body = ["org.bluez.Device1", changed, []]
+    return message.SignalMessage(getPath(address), "PropertiesChanged", "org.freedesktop.DBus.Properties", signature="sa{sv}as", body=body).rawMessage
+
+
+def getNoiseSignal(index):
+    # Other devices mostly advertise manufacturer data, or service data of other services.
+    address = "aa:" + getAddress(index)[3:]
+    if index % 2 == 0:
+        return address, "Phone", getSignal(address, {"RSSI": -70, "ManufacturerData": {APPLE_COMPANY_ID: bytearray(os.urandom(20))}})
+    return address, "Beacon", getSignal(address, {"RSSI": -70, "ServiceData": {"0000fe9f-0000-1000-8000-00805f9b34fb": bytearray(os.urandom(20))}})
+
+
+def getCrownstoneSignal(index, serviceDataKey, scanRound):
+    address = getAddress(index)
+    serviceData = bytearray(getStateServiceData(serviceDataKey, index + 1, scanRound))
+    return address, "CS", getSignal(address, {"RSSI": -60, "ServiceData": {CROWNSTONE_SERVICE_UUID: serviceData}})
+
+
+def getSignals(serviceDataKey, noisePerCrownstone):
+    """
+    :returns: List of tuples of address, name and raw signal, of all scans, and the same of only the Crownstone scans.
+    """
+    allSignals = []
+    crownstoneSignals = []
+    for scanRound in range(0, ROUNDS):
+        for i in range(0, CROWNSTONE_COUNT):
+            signal = getCrownstoneSignal(i, serviceDataKey, scanRound)
+            allSignals.append(signal)
+            crownstoneSignals.append(signal)
+            for noise in range(0, noisePerCrownstone):
+                allSignals.append(getNoiseSignal(i * noisePerCrownstone + noise))
+    return allSignals, crownstoneSignals
+
+
+def measure(settings, signals):
+    delegate = BleakScanDelegate(settings)
+    scanner = BleakScannerBlueZDBus()
+    scanner._callback = delegate.handleDiscovery
+    # Like the InterfacesAdded signal when BlueZ sees a device for the first time, which is not measured.
+    for address, name, signal in signals:
+        scanner._devices[getPath(address)] = {"Address": address.upper(), "Alias": name}
+
+    start = time.perf_counter()
+    for address, name, signal in signals:
+        scanner.parse_msg(message.parseMessage(signal, []))
+    return time.perf_counter() - start, delegate.getStatistics()
+
+
+def main():
+    settings = EncryptionSettings()
+    settings.loadKeys(*DEFAULT_KEYS)
+
+    print(f"{CROWNSTONE_COUNT} Crownstones, {ROUNDS} advertisements each:")
+    for noisePerCrownstone in NOISE_PER_CROWNSTONE:
+        allSignals, crownstoneSignals = getSignals(settings.serviceDataKey, noisePerCrownstone)
+        withoutFilter, withoutStatistics = measure(settings, allSignals)
+        withFilter, withStatistics = measure(settings, crownstoneSignals)
+        share = noisePerCrownstone / (noisePerCrownstone + 1) * 100
+        print(f"{share:3.0f}% other devices: without scan filter {withoutStatistics['callbacks']:6} scans, {withoutFilter * 1000:7.1f} ms, "
+              f"with scan filter {withStatistics['callbacks']:6} scans, {withFilter * 1000:7.1f} ms ({withoutFilter / withFilter:4.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
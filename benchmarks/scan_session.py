@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+"""
+Measures the cost of scan helpers with and without a scan session.
+
+A fake BleakScanner keeps replaying advertisements of a small fleet. Starting and stopping it takes a fixed time, like the
+D-Bus round trips of BlueZ. Without a session, every helper starts and stops the scanner. With a session, the helpers use
+the running scanner, and can run at the same time.
+"""
+
+import asyncio
+import time
+
+from crownstone_ble import CrownstoneBle
+from util.advertisements import getAddress, getStateAdvertisement
+from util.fake_scanner import FakeBleakScanner, useFakeScanner
+
+FLEET_SIZE = 10
+SWITCH_TIME = 0.1
+
+
+async def getModes(core, concurrent):
+    addresses = [getAddress(i) for i in range(0, FLEET_SIZE)]
+    if concurrent:
+        await asyncio.gather(*[core.getMode(address) for address in addresses])
+    else:
+        for address in addresses:
+            await core.getMode(address)
+
+
+async def measure(name, core, scanner, useSession, concurrent):
+    scanner.startCount = 0
+    start = time.perf_counter()
+    if useSession:
+        await core.startScanSession()
+    try:
+        await getModes(core, concurrent)
+        result = "ok"
+    except Exception as err:
+        result = f"failed: {err}"
+    if useSession:
+        await core.stopScanSession()
+    duration = time.perf_counter() - start
+    print(f"{name:<32} {duration * 1000:7.1f} ms, scanner started {scanner.startCount} times, {result}")
+
+
+async def main():
+    core = CrownstoneBle()
+    advertisements = [getStateAdvertisement(getAddress(i), -60, core.settings.serviceDataKey, i + 1, i) for i in range(0, FLEET_SIZE)]
+    scanner = FakeBleakScanner(advertisements, interval=0.002, switchTime=SWITCH_TIME, repeat=True)
+    useFakeScanner(core, scanner)
+
+    print(f"getMode for {FLEET_SIZE} Crownstones, starting or stopping the scanner takes {SWITCH_TIME * 1000:.0f} ms:")
+    await measure("sequential, without session", core, scanner, False, False)
+    await measure("sequential, with session", core, scanner, True, False)
+    await measure("concurrent, with session", core, scanner, True, True)
+
+    await core.shutDown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+"""
+Measures the time the scan delegate spends per advertisement, with and without the service data cache.
+
+Each Crownstone repeats the same encrypted service data a number of times before it changes, like the firmware does
+between state updates. The validator is not subscribed, so only decrypting and parsing is measured.
+"""
+
+import time
+
+from crownstone_core.core.modules.EncryptionSettings import EncryptionSettings
+
+from crownstone_ble.core.bluetooth_delegates.BleakScanDelegate import BleakScanDelegate
+from crownstone_ble.core.modules.ServiceDataCache import ServiceDataCache
+from crownstone_ble.core.modules.SimulatedCrownstone import DEFAULT_KEYS
+from util.advertisements import getAddress, getStateAdvertisement
+
+ADDRESS_COUNT = 300
+REPEATS = [1, 5, 20]
+UPDATES = 20
+
+
+def getAdvertisements(serviceDataKey, repeats):
+    advertisements = []
+    for update in range(0, UPDATES):
+        for repeat in range(0, repeats):
+            for i in range(0, ADDRESS_COUNT):
+                advertisements.append(getStateAdvertisement(getAddress(i), -60, serviceDataKey, i % 255 + 1, update))
+    return advertisements
+
+
+def measure(delegate, advertisements):
+    start = time.perf_counter()
+    for device, advertisementData in advertisements:
+        delegate.handleDiscovery(device, advertisementData)
+    return (time.perf_counter() - start) / len(advertisements) * 1e6
+
+
+def main():
+    settings = EncryptionSettings()
+    settings.loadKeys(*DEFAULT_KEYS)
+    for repeats in REPEATS:
+        advertisements = getAdvertisements(settings.serviceDataKey, repeats)
+
+        uncachedDelegate = BleakScanDelegate(settings)
+        uncachedDelegate.serviceDataCache = ServiceDataCache(0)
+        uncached = measure(uncachedDelegate, advertisements)
+
+        cachedDelegate = BleakScanDelegate(settings)
+        cached = measure(cachedDelegate, advertisements)
+        statistics = cachedDelegate.serviceDataCache.getStatistics()
+        hitRate = statistics["hits"] / (statistics["hits"] + statistics["misses"]) * 100
+
+        print(f"each service data repeated {repeats:2d} times: without cache {uncached:6.2f} us/advertisement, "
+              f"with cache {cached:6.2f} us/advertisement, hit rate {hitRate:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
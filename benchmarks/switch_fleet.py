@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+"""
+Measures how the wall-clock time of CrownstoneBle.switchMany scales with the size of the fleet, for several concurrency values.
+
+Each Crownstone is a simulated Crownstone with a fixed link latency and processing time, so the time per Crownstone is the same
+for every run. With a concurrency of k, the wall-clock time should be about 1/k of the sequential time.
+"""
+
+import asyncio
+import time
+
+from crownstone_ble import CrownstoneBle
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedCrownstone, SimulatedBackend
+from util.advertisements import getAddress
+
+FLEET_SIZES = [1, 10, 40]
+CONCURRENCIES = [1, 4, 7]
+
+
+async def measure(fleetSize, concurrency):
+    addresses = [getAddress(i) for i in range(0, fleetSize)]
+    backend = SimulatedBackend([SimulatedCrownstone(address, linkLatency=0.015, processingTime=0.020) for address in addresses])
+
+    core = CrownstoneBle(maxConnections=concurrency, clientBackend=backend)
+    start = time.perf_counter()
+    report = await core.switchMany({address: 100 for address in addresses}, concurrency=concurrency)
+    duration = time.perf_counter() - start
+    await core.shutDown()
+
+    successes = sum(1 for result in report.values() if result.success)
+    averageDuration = sum(result.duration for result in report.values()) / len(report)
+    print(f"fleet={fleetSize:3d} concurrency={concurrency}: {duration * 1000:7.1f} ms total, "
+          f"{averageDuration * 1000:6.1f} ms per stone, {successes}/{fleetSize} switched")
+
+
+async def main():
+    for fleetSize in FLEET_SIZES:
+        for concurrency in CONCURRENCIES:
+            await measure(fleetSize, concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+from crownstone_core.protocol.BluenetTypes import DeviceType
+from crownstone_core.util.Conversion import Conversion
+from crownstone_core.util.EncryptionHandler import EncryptionHandler
+
+CROWNSTONE_SERVICE_UUID = "0000c001-0000-1000-8000-00805f9b34fb"
+
+
+class FakeDevice:
+    """ The parts of bleak's BLEDevice that the BleakScanDelegate uses. """
+    def __init__(self, address, rssi, name="CS"):
+        self.address = address
+        self.rssi    = rssi
+        self.name    = name
+
+
+class FakeAdvertisementData:
+    """ The parts of bleak's AdvertisementData that the BleakScanDelegate uses. """
+    def __init__(self, serviceData):
+        self.service_data = serviceData
+
+
+def getAddress(index):
+    return "ec:00:" + ":".join(f"{b:02x}" for b in Conversion.uint32_to_uint8_array(index))
+
+
+def getSetupServiceData(uniqueIdentifier=0):
+    # opCode 6, device type, data type 0 (setup state), switch state, flags, temperature, power factor,
+    # real power (uint16), error bitmask (uint32), unique identifier.
+    return bytes([6, DeviceType.PLUG, 0, 0, 0, 20, 127, 0, 0, 0, 0, 0, 0, uniqueIdentifier % 256])
+
+
+def getStateServiceData(serviceDataKey, crownstoneId, uniqueIdentifier=0):
+    # data type 0 (state), crownstone id, switch state, flags, temperature, power factor, real power (uint16),
+    # energy (int32), partial timestamp (uint16) which doubles as unique identifier, global flags, validation.
+    plain = [0, crownstoneId, 100, 0, 20, 127, 0, 0, 0, 0, 0, 0]
+    plain += Conversion.uint16_to_uint8_array(uniqueIdentifier % 65536)
+    plain += [0, 0xFA]
+    return bytes([7, DeviceType.PLUG]) + bytes(EncryptionHandler.encryptECB(plain, serviceDataKey))
+
+
+def getSetupAdvertisement(address, rssi, uniqueIdentifier=0):
+    return FakeDevice(address, rssi), FakeAdvertisementData({CROWNSTONE_SERVICE_UUID: getSetupServiceData(uniqueIdentifier)})
+
+
+def getStateAdvertisement(address, rssi, serviceDataKey, crownstoneId, uniqueIdentifier=0):
+    serviceData = getStateServiceData(serviceDataKey, crownstoneId, uniqueIdentifier)
+    return FakeDevice(address, rssi), FakeAdvertisementData({CROWNSTONE_SERVICE_UUID: serviceData})
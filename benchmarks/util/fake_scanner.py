@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+
+class FakeBleakScanner:
+    """
+    Stands in for a BleakScanner. Once started, it replays a list of (device, advertisementData) tuples
+    to the registered detection callback, one every interval seconds.
+
+    deliveryTimes contains the time.perf_counter() at which each advertisement was handed to the callback.
+    switchTime is the time in seconds that starting or stopping the scanner takes, like the D-Bus round trips of BlueZ.
+    When repeat is True, the advertisements are replayed until the scanner is stopped.
+    """
+
+    def __init__(self, advertisements, interval=0.01, switchTime=0.0, repeat=False):
+        self.advertisements = advertisements
+        self.interval = interval
+        self.switchTime = switchTime
+        self.repeat = repeat
+        self.startCount = 0
+        self.callback = None
+        self.deliveryTimes = []
+        self._task = None
+
+    def register_detection_callback(self, callback):
+        self.callback = callback
+
+    async def start(self):
+        await asyncio.sleep(self.switchTime)
+        self.startCount += 1
+        self.deliveryTimes = []
+        self._task = asyncio.ensure_future(self._replay())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await asyncio.sleep(self.switchTime)
+
+    async def _replay(self):
+        while True:
+            for device, advertisementData in self.advertisements:
+                await asyncio.sleep(self.interval)
+                self.deliveryTimes.append(time.perf_counter())
+                self.callback(device, advertisementData)
+            if not self.repeat:
+                return
+
+
+def useFakeScanner(core, scanner: FakeBleakScanner):
+    """ Replace the BleakScanner of a CrownstoneBle instance by the given fake scanner. """
+    scanner.register_detection_callback(core.ble.scanDelegate.handleDiscovery)
+    core.ble.scanner = scanner
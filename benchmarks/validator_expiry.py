@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+"""
+Measures the time the Validator spends per advertisement, for several amounts of advertising Crownstones.
+
+100k synthetic advertisements are replayed directly into Validator.checkAdvertisement, round robin over the addresses.
+The heap based expiry of the Validator is compared with the sweep over all trackers that it used before.
+"""
+
+import time
+
+from crownstone_core.core.modules.EncryptionSettings import EncryptionSettings
+from crownstone_core.packets.Advertisement import Advertisement
+
+from crownstone_ble.core.modules.Validator import Validator
+from crownstone_ble.core.modules.SimulatedCrownstone import DEFAULT_KEYS
+from util.advertisements import getAddress, getStateServiceData
+
+ADVERTISEMENT_COUNT = 100000
+ADDRESS_COUNTS = [50, 500, 5000]
+# Advertisements per address with a different unique identifier, so they are not all duplicates.
+VARIATIONS = 4
+
+
+class SweepValidator(Validator):
+    """ The Validator with the cleanup it used before: check every tracker on each advertisement. """
+
+    def cleanupExpiredTrackers(self):
+        for key in list(self.trackedCrownstones.keys()):
+            self.trackedCrownstones[key].checkForCleanup()
+
+
+def getAdvertisements(serviceDataKey, addressCount):
+    advertisements = []
+    for variation in range(0, VARIATIONS):
+        for i in range(0, addressCount):
+            serviceData = list(getStateServiceData(serviceDataKey, i % 255 + 1, variation))
+            advertisement = Advertisement(getAddress(i), -60, "CS", serviceData, 0xC001)
+            advertisement.parse(serviceDataKey)
+            advertisements.append(advertisement)
+    return advertisements
+
+
+def measure(validatorClass, advertisements):
+    validator = validatorClass()
+    start = time.perf_counter()
+    for i in range(0, ADVERTISEMENT_COUNT):
+        validator.checkAdvertisement(advertisements[i % len(advertisements)])
+    duration = time.perf_counter() - start
+    return duration / ADVERTISEMENT_COUNT * 1e6
+
+
+def main():
+    settings = EncryptionSettings()
+    settings.loadKeys(*DEFAULT_KEYS)
+    for addressCount in ADDRESS_COUNTS:
+        advertisements = getAdvertisements(settings.serviceDataKey, addressCount)
+        heap = measure(Validator, advertisements)
+        sweep = measure(SweepValidator, advertisements)
+        print(f"addresses={addressCount:5d}: heap {heap:7.2f} us/advertisement, sweep {sweep:8.2f} us/advertisement")
+
+
+if __name__ == "__main__":
+    main()
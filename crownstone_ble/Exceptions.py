@@ -21,6 +21,11 @@ class BleError(Enum):
     SETUP_FAILED                      = "SETUP_FAILED"
     NOT_IN_RECOVERY_MODE              = "NOT_IN_RECOVERY_MODE"
     RECOVERY_MODE_DISABLED            = "RECOVERY_MODE_DISABLED"
+    UNSUPPORTED_QUEUE_POLICY          = "UNSUPPORTED_QUEUE_POLICY"
+    INVALID_RECORDING                 = "INVALID_RECORDING"
+    DEVICE_NOT_IN_RANGE               = "DEVICE_NOT_IN_RANGE"
+    CONNECTION_CIRCUIT_OPEN           = "CONNECTION_CIRCUIT_OPEN"
+    UNEXPECTED_RESULT                 = "UNEXPECTED_RESULT"
 
     NO_SCANS_RECEIVED                 = "NO_SCANS_RECEIVED"
     DIFFERENT_MODE_THAN_REQUIRED      = "DIFFERENT_MODE_THAN_REQUIRED"
\ No newline at end of file
@@ -1,3 +1,4 @@
 from crownstone_ble.topics.BleTopics   import BleTopics
 from crownstone_ble.core.CrownstoneBle import CrownstoneBle
-from crownstone_ble.core.BleEventBus   import BleEventBus
\ No newline at end of file
+from crownstone_ble.core.BleEventBus   import BleEventBus
+from crownstone_ble.core.modules.AsyncEventBus import QueuePolicy
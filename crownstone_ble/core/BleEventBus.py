@@ -1,3 +1,3 @@
-from crownstone_core.util.EventBus import EventBus
+from crownstone_ble.core.modules.AsyncEventBus import AsyncEventBus
 
-BleEventBus = EventBus()
\ No newline at end of file
+BleEventBus = AsyncEventBus()
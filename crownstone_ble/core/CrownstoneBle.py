@@ -1,11 +1,13 @@
 import logging
 
+from crownstone_core.Constants import UserLevel
 from crownstone_core.Enums import CrownstoneOperationMode
 
 from crownstone_ble.core.ble_modules.DevHandler import DevHandler
 from crownstone_ble.core.container.ScanData import ScanData
 
-from crownstone_ble.core.ble_modules.BleHandler import BleHandler
+from crownstone_ble.core.ble_modules.BleHandler import BleHandler, DEFAULT_MAX_CONNECTIONS, DEFAULT_KEEP_ALIVE_TIME
+from crownstone_ble.core.CrownstoneConnection import CrownstoneConnection
 from crownstone_ble.core.modules.ModeChecker import ModeChecker
 from crownstone_ble.topics.BleTopics import BleTopics
 from crownstone_core.Exceptions import CrownstoneError, CrownstoneBleException, CrownstoneException
@@ -18,24 +20,38 @@ from crownstone_ble.core.ble_modules.ControlHandler import ControlHandler
 from crownstone_ble.core.ble_modules.SetupHandler import SetupHandler
 from crownstone_ble.core.ble_modules.StateHandler import StateHandler
 from crownstone_ble.core.ble_modules.DebugHandler import DebugHandler
+from crownstone_ble.core.modules.AdvertisementCoalescer import AdvertisementCoalescer, DEFAULT_COALESCE_INTERVAL
+from crownstone_ble.core.modules.BatchRunner import BatchRunner
+from crownstone_ble.core.modules.ConnectStrategy import ConnectStrategy, DEFAULT_CONNECT_TIMEOUT, DEFAULT_CONNECT_ATTEMPTS, \
+    DEFAULT_PRESENCE_WINDOW, DEFAULT_FAILURE_THRESHOLD, DEFAULT_OPEN_TIME, DEFAULT_MAX_OPEN_TIME
 from crownstone_ble.core.modules.Gatherer import Gatherer
+from crownstone_ble.core.modules.MicroappRollout import MicroappRollout
 from crownstone_ble.core.modules.NearestSelector import NearestSelector
 from crownstone_ble.core.modules.RssiChecker import RssiChecker
+from crownstone_ble.core.modules.ScanBatcher import ScanBatcher, DEFAULT_BATCH_WINDOW, DEFAULT_BATCH_SIZE
+from crownstone_ble.core.modules.ScanSession import ScanSession
 
 _LOGGER = logging.getLogger(__name__)
 
 class CrownstoneBle:
     __version__ = "2.1.0-git"
     
-    def __init__(self, bleAdapterAddress: str = None):
-        # bleAdapterAddress is the MAC address of the adapter you want to use.
+    def __init__(self, bleAdapterAddress: str or list = None, maxConnections: int = DEFAULT_MAX_CONNECTIONS, useScanFilter: bool = False, clientBackend=None,
+                 gattCachePath: str = None):
+        # bleAdapterAddress is the MAC address of the adapter you want to use, or a list of addresses to use several adapters.
+        # maxConnections is the maximum amount of simultaneous connections via each adapter.
+        # useScanFilter lets BlueZ only pass on scans with Crownstone service data.
+        # clientBackend creates the clients of the connections, like BleakClient (the default) or a SimulatedBackend.
+        # gattCachePath is the JSON file in which the discovered services of the Crownstones are kept between runs.
         self.settings = EncryptionSettings()
         self.control  = ControlHandler(self)
         self.setup    = SetupHandler(self)
         self.state    = StateHandler(self)
         self.debug    = DebugHandler(self)
         self._dev     = DevHandler(self)
-        self.ble      = BleHandler(self.settings, bleAdapterAddress)
+        self.ble      = BleHandler(self.settings, bleAdapterAddress, maxConnections, useScanFilter, clientBackend, gattCachePath)
+        self.scanSession = ScanSession(self.ble)
+        self.registry    = self.ble.validator.registry
 
         self.defaultKeysOverridden = False
 
@@ -52,10 +68,14 @@ class CrownstoneBle:
         """
         Shut down the library nicely.
         """
+        await self.scanSession.stop()
+        self.disableCoalescing()
+        self.disableBatchedDelivery()
         await self.ble.shutDown()
     
     def setSettings(self, adminKey, memberKey, basicKey, serviceDataKey, localizationKey, meshApplicationKey, meshNetworkKey):
         self.settings.loadKeys(adminKey, memberKey, basicKey, serviceDataKey, localizationKey, meshApplicationKey, meshNetworkKey)
+        self.ble.scanDelegate.invalidateCache()
         self.defaultKeysOverridden = True
 
     def loadSettingsFromDictionary(self, data):
@@ -85,9 +105,71 @@ class CrownstoneBle:
 
     async def connect(self, address, ignoreEncryption=False):
         # TODO: let available services determine whether or not to use encryption.
-        await self.ble.connect(address)
-        if not ignoreEncryption:
+        reused = await self.ble.reuseConnection(address)
+        if not reused:
+            await self.ble.connect(address)
+        # The session nonce stays valid as long as the connection, so it's only read after a (re)connect.
+        if not ignoreEncryption and not self.ble.activeClient.sessionRead:
             await self.control._getAndSetSessionNonce()
+            self.ble.activeClient.sessionRead = True
+
+    async def openConnection(self, address, ignoreEncryption=False) -> CrownstoneConnection:
+        """
+        Connect to a Crownstone, next to the connection made with connect() and other open connections.
+        The connection has its own session nonce, and its own control, state and debug modules, so multiple connections
+        can be used at the same time. Waits until a connection slot is free when maxConnections connections are open.
+
+        :param address:           The MAC address of the Crownstone.
+        :param ignoreEncryption:  When True, the session nonce is not read.
+        :returns:                 The connection. Make sure you call disconnect() on it when done.
+        """
+        connection = CrownstoneConnection(self, address)
+        await connection.connect(ignoreEncryption=ignoreEncryption)
+        return connection
+
+    async def switchMany(self, switchValues: dict, concurrency: int = None, attempts: int = 3, retryDelay: float = 0.5) -> dict:
+        """
+        Switch many Crownstones, with at most concurrency connections at the same time.
+        Each Crownstone is connected to, switched, and disconnected from. Failed attempts are retried.
+
+        :param switchValues:  Dict with MAC address as key, and switch value as value (see control.setSwitch).
+        :param concurrency:   Maximum amount of Crownstones that are switched at the same time. Defaults to maxConnections.
+        :param attempts:      Maximum amount of attempts per Crownstone.
+        :param retryDelay:    Time in seconds to wait before a next attempt.
+        :returns:             Dict with MAC address as key, and BatchResult as value.
+        """
+        if concurrency is None:
+            concurrency = self.ble.maxConnections
+
+        async def switch(connection, address):
+            await connection.control.setSwitch(switchValues[address])
+
+        runner = BatchRunner(self, concurrency, attempts, retryDelay)
+        return await runner.run(list(switchValues.keys()), switch)
+
+    async def rolloutMicroapp(self, addresses, data, index: int = 0, concurrency: int = None, attempts: int = 3, retryDelay: float = 0.5,
+                              enable: bool = True, progressCallback=None) -> MicroappRollout:
+        """
+        Upload a microapp to many Crownstones, with at most concurrency connections at the same time.
+        The chunk packets are made once for all Crownstones. Each upload is skipped when the Crownstone already has the
+        binary, and failed attempts resume from the last acknowledged offset. Call retryFailed() on the returned rollout
+        to only redo the Crownstones that failed.
+
+        :param addresses:         The MAC addresses of the Crownstones.
+        :param data:              The microapp binary.
+        :param index:             The app index to upload to.
+        :param concurrency:       Maximum amount of Crownstones that are uploaded to at the same time. Defaults to maxConnections.
+        :param attempts:          Maximum amount of attempts per Crownstone.
+        :param retryDelay:        Time in seconds to wait before a next attempt.
+        :param enable:            When True, the app is validated and enabled after the upload.
+        :param progressCallback:  Optional function that gets the address, the acknowledged offset and the size of the binary, after each chunk.
+        :returns:                 The rollout, with a BatchResult per Crownstone in results.
+        """
+        if concurrency is None:
+            concurrency = self.ble.maxConnections
+        rollout = MicroappRollout(self, data, index, concurrency, attempts, retryDelay, enable, progressCallback)
+        await rollout.run(addresses)
+        return rollout
 
     async def setupCrownstone(self, address, sphereId, crownstoneId, meshDeviceKey, ibeaconUUID, ibeaconMajor, ibeaconMinor):
         if not self.defaultKeysOverridden:
@@ -98,21 +180,148 @@ class CrownstoneBle:
         await self.setup.setup(address, sphereId, crownstoneId, meshDeviceKey, ibeaconUUID, ibeaconMajor, ibeaconMinor)
 
     async def disconnect(self):
+        # A setup connection is never kept alive, the Crownstone reboots after setup.
+        keepAlive = self.settings.userLevel != UserLevel.setup
         self.settings.exitSetup()
-        await self.ble.disconnect()
+        await self.ble.disconnect(keepAlive=keepAlive)
+
+    def enableKeepAlive(self, idleTime: float = DEFAULT_KEEP_ALIVE_TIME):
+        """
+        Keep the connection open for idleTime seconds after disconnect(), so that a next connect() to the same Crownstone
+        reuses it, without connecting and reading the session nonce again.
+        :param idleTime:  Time in seconds the connection stays open after disconnect().
+        """
+        self.ble.keepAliveTime = idleTime
+
+    async def disableKeepAlive(self):
+        """
+        Disconnect on disconnect() again. A connection that is kept open is closed.
+        """
+        self.ble.keepAliveTime = 0
+        await self.ble.closeIdleConnection()
     
+    def enableConnectStrategy(self, timeout: float = DEFAULT_CONNECT_TIMEOUT, attempts: int = DEFAULT_CONNECT_ATTEMPTS,
+                              presenceWindow: float = DEFAULT_PRESENCE_WINDOW, failureThreshold: int = DEFAULT_FAILURE_THRESHOLD,
+                              openTime: float = DEFAULT_OPEN_TIME, maxOpenTime: float = DEFAULT_MAX_OPEN_TIME):
+        """
+        Let a ConnectStrategy decide the timeout and attempts of connects, and fail connects that are known to fail right away.
+        :param timeout:           Maximum timeout of a connect attempt in seconds, it adapts to the latency of recent connects.
+        :param attempts:          Amount of attempts, one more for devices with a weak RSSI.
+        :param presenceWindow:    Connects fail with BleError.DEVICE_NOT_IN_RANGE when the device is not heard during this
+                                  time of scanning.
+        :param failureThreshold:  Amount of failed connects in a row after which connects fail with BleError.CONNECTION_CIRCUIT_OPEN.
+        :param openTime:          Time in seconds that connects fail, doubled after each failed probe, up to maxOpenTime.
+        """
+        self.ble.connectStrategy = ConnectStrategy(self.ble.validator.registry, timeout=timeout, attempts=attempts,
+                                                   presenceWindow=presenceWindow, failureThreshold=failureThreshold,
+                                                   openTime=openTime, maxOpenTime=maxOpenTime)
+
+    def disableConnectStrategy(self):
+        """
+        Always make 3 attempts with a timeout of 5 seconds again.
+        """
+        self.ble.connectStrategy = None
+
     async def startScanning(self, scanDuration=3):
         await self.ble.scan(scanDuration)
 
     async def stopScanning(self):
         await self.ble.stopScanning()
 
+    def startRecording(self, path):
+        """
+        Record all scans to a file, which can be replayed with the ReplayScanner.
+        """
+        self.ble.startRecording(path)
+
+    def stopRecording(self):
+        self.ble.stopRecording()
+
+
+    async def startScanSession(self):
+        """
+        Keep scanning until stopScanSession is called.
+        While the scan session is active, the scan methods use the running scanner instead of starting their own scan,
+        so they can be used at the same time. Use scanSession.scanData() to iterate over the scans.
+        """
+        await self.scanSession.start()
+
+    async def stopScanSession(self):
+        await self.scanSession.stop()
+
+
+    def enableBatchedDelivery(self, window: float = DEFAULT_BATCH_WINDOW, maxItems: int = DEFAULT_BATCH_SIZE):
+        """
+        Also emit the scans as lists, on BleTopics.rawAdvertisementBatch, BleTopics.advertisementBatch and BleTopics.newDataAvailableBatch.
+        :param window:    Maximum time in seconds a scan waits in a batch.
+        :param maxItems:  Maximum amount of scans in a batch.
+        """
+        self.disableBatchedDelivery()
+        self.ble.validator.batcher = ScanBatcher(window, maxItems)
+
+
+    def disableBatchedDelivery(self):
+        """
+        Stop emitting batches. The scans that are still in a batch are emitted first.
+        """
+        batcher = self.ble.validator.batcher
+        if batcher is not None:
+            self.ble.validator.batcher = None
+            batcher.flush()
+
+
+    def enableCoalescing(self, interval: float = DEFAULT_COALESCE_INTERVAL):
+        """
+        Emit BleTopics.advertisement at most once per interval for each Crownstone, always with the newest scan.
+        BleTopics.newDataAvailable and BleTopics.rawAdvertisement still get every scan right away.
+        :param interval:  Minimum time in seconds between two advertisement events of the same Crownstone.
+        """
+        self.disableCoalescing()
+        self.ble.validator.coalescer = AdvertisementCoalescer(self.ble.validator.emitAdvertisement, interval)
+
+
+    def disableCoalescing(self):
+        """
+        Emit each advertisement again. The scans that wait for their interval are emitted first.
+        """
+        coalescer = self.ble.validator.coalescer
+        if coalescer is not None:
+            self.ble.validator.coalescer = None
+            coalescer.flush()
+
+
+    async def _scanUntilFinished(self, topic, checker, scanDuration, address=None):
+        """
+        Pass the scans of the given topic to the checker, until it is finished, or the scan duration has passed.
+        :param address:  When the checker only uses scans of a single address, the MAC address.
+        """
+        if self.scanSession.isActive():
+            # Start with the latest scans in the registry, so the checker might not have to wait for new scans.
+            for scanData in self._getLatestScans(topic, address):
+                checker.handleAdvertisement(scanData)
+                if checker.finished:
+                    return
+            await self.scanSession.waitUntilFinished(topic, checker, scanDuration, address)
+        else:
+            subscriptionId = BleEventBus.subscribe(topic, checker.handleAdvertisement, address=address)
+            await self.ble.scan(duration=scanDuration)
+            BleEventBus.unsubscribe(subscriptionId)
+
+
+    def _getLatestScans(self, topic, address=None) -> list:
+        if address is None:
+            devices = self.registry.getDevices()
+        else:
+            device = self.registry.getDevice(address)
+            devices = [] if device is None else [device]
+        if topic == BleTopics.advertisement:
+            devices = [device for device in devices if device.validated]
+        return [device.scanData for device in devices]
+
 
     async def getCrownstonesByScanning(self, scanDuration=3):
         gatherer = Gatherer()
-        subscriptionIdAll = BleEventBus.subscribe(BleTopics.rawAdvertisement, lambda scanData: gatherer.handleAdvertisement(scanData))
-        await self.ble.scan(duration=scanDuration)
-        BleEventBus.unsubscribe(subscriptionIdAll)
+        await self._scanUntilFinished(BleTopics.rawAdvertisement, gatherer, scanDuration)
         return gatherer.getCollection()
 
 
@@ -130,9 +339,7 @@ class CrownstoneBle:
         """
         _LOGGER.debug(f"isCrownstoneInSetupMode address={address} scanDuration={scanDuration} waitUntilInSetupMode={waitUntilInSetupMode}")
         checker = ModeChecker(address, CrownstoneOperationMode.SETUP, waitUntilInSetupMode)
-        subscriptionId = BleEventBus.subscribe(BleTopics.advertisement, checker.handleAdvertisement)
-        await self.ble.scan(duration=scanDuration)
-        BleEventBus.unsubscribe(subscriptionId)
+        await self._scanUntilFinished(BleTopics.advertisement, checker, scanDuration, address)
         result = checker.getResult()
 
         if result is None:
@@ -155,9 +362,7 @@ class CrownstoneBle:
         """
         _LOGGER.debug(f"isCrownstoneInNormalMode address={address} scanDuration={scanDuration} waitUntilInRequiredMode={waitUntilInNormalMode}")
         checker = ModeChecker(address, CrownstoneOperationMode.NORMAL, waitUntilInNormalMode)
-        subscriptionId = BleEventBus.subscribe(BleTopics.rawAdvertisement, lambda scanData: checker.handleAdvertisement(scanData))
-        await self.ble.scan(duration=scanDuration)
-        BleEventBus.unsubscribe(subscriptionId)
+        await self._scanUntilFinished(BleTopics.rawAdvertisement, checker, scanDuration, address)
         result = checker.getResult()
 
         if result is None:
@@ -179,9 +384,7 @@ class CrownstoneBle:
         """
         _LOGGER.debug(f"getMode address={address} scanDuration={scanDuration}")
         checker = ModeChecker(address, None)
-        subscriptionId = BleEventBus.subscribe(BleTopics.rawAdvertisement, lambda scanData: checker.handleAdvertisement(scanData))
-        await self.ble.scan(duration=scanDuration)
-        BleEventBus.unsubscribe(subscriptionId)
+        await self._scanUntilFinished(BleTopics.rawAdvertisement, checker, scanDuration, address)
         result = checker.getResult()
 
         if result is None:
@@ -203,9 +406,7 @@ class CrownstoneBle:
         """
         _LOGGER.debug(f"waitForMode address={address} requiredMode={requiredMode} scanDuration={scanDuration}")
         checker = ModeChecker(address, requiredMode, True)
-        subscriptionId = BleEventBus.subscribe(BleTopics.rawAdvertisement, lambda scanData: checker.handleAdvertisement(scanData))
-        await self.ble.scan(duration=scanDuration)
-        BleEventBus.unsubscribe(subscriptionId)
+        await self._scanUntilFinished(BleTopics.rawAdvertisement, checker, scanDuration, address)
         result = checker.getResult()
 
         if result is None:
@@ -217,9 +418,7 @@ class CrownstoneBle:
 
     async def getRssiAverage(self, address, scanDuration=3):
         checker = RssiChecker(address)
-        subscriptionId = BleEventBus.subscribe(BleTopics.rawAdvertisement, lambda scanData: checker.handleAdvertisement(scanData))
-        await self.ble.scan(duration=scanDuration)
-        BleEventBus.unsubscribe(subscriptionId)
+        await self._scanUntilFinished(BleTopics.rawAdvertisement, checker, scanDuration, address)
         return checker.getResult()
 
 
@@ -256,10 +455,6 @@ class CrownstoneBle:
         if not validated:
             topic = BleTopics.rawAdvertisement
 
-        subscriptionId = BleEventBus.subscribe(topic, lambda scanData: selector.handleAdvertisement(scanData))
-
-        await self.ble.scan(duration=scanDuration)
-    
-        BleEventBus.unsubscribe(subscriptionId)
+        await self._scanUntilFinished(topic, selector, scanDuration)
         
         return selector.getNearest()
@@ -0,0 +1,68 @@
+import copy
+import logging
+
+from crownstone_core.Exceptions import CrownstoneError, CrownstoneException
+
+from crownstone_ble.core.ble_modules.BleHandler import ActiveClient
+from crownstone_ble.core.ble_modules.ControlHandler import ControlHandler
+from crownstone_ble.core.ble_modules.DebugHandler import DebugHandler
+from crownstone_ble.core.ble_modules.DevHandler import DevHandler
+from crownstone_ble.core.ble_modules.StateHandler import StateHandler
+
+_LOGGER = logging.getLogger(__name__)
+
+"""
+A connection to a single Crownstone, made with CrownstoneBle.openConnection.
+
+Each connection has its own copy of the encryption settings, so it has its own session nonce, and its own control,
+state and debug modules. This makes it possible to talk to multiple Crownstones at the same time, for example with asyncio.gather.
+The keys are copied when the connection is made, changing the keys of the library does not affect open connections.
+"""
+class CrownstoneConnection:
+
+    def __init__(self, bluetoothCore, address: str):
+        self.address = address
+        self._core = bluetoothCore
+
+        self.settings = copy.copy(bluetoothCore.settings)
+        self.settings.invalidateSessionNonce()
+        self.settings.exitSetup()
+
+        # The connection of the BleHandler, which is set when connected.
+        self.ble: ActiveClient or None = None
+
+        self.control = ControlHandler(self)
+        self.state   = StateHandler(self)
+        self.debug   = DebugHandler(self)
+        self._dev    = DevHandler(self)
+
+
+    async def connect(self, address: str = None, ignoreEncryption=False):
+        """
+        (Re)connect to the Crownstone of this connection.
+        :param address:           Only here so the handlers can use this as the library. Must be the address of this connection, or None.
+        :param ignoreEncryption:  When True, the session nonce is not read.
+        """
+        if address is not None and address.lower() != self.address.lower():
+            raise CrownstoneException(CrownstoneError.INVALID_ADDRESS, f"This connection is made to {self.address}, not to {address}.")
+
+        self.settings.invalidateSessionNonce()
+        self.ble = await self._core.ble.openConnection(self.address, self.settings)
+        if not ignoreEncryption:
+            try:
+                await self.control._getAndSetSessionNonce()
+            except BaseException:
+                await self.disconnect()
+                raise
+
+
+    async def disconnect(self):
+        self.settings.exitSetup()
+        if self.ble is not None:
+            await self.ble.disconnect()
+
+
+    async def isConnected(self) -> bool:
+        if self.ble is None:
+            return False
+        return await self.ble.isConnected()
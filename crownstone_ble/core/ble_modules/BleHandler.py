@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import time
 
 import bleak.exc
 from bleak import BleakClient, BleakScanner
@@ -7,13 +8,20 @@ from bleak import BleakClient, BleakScanner
 from crownstone_core.Exceptions import CrownstoneBleException, CrownstoneError
 from crownstone_core.core.modules.EncryptionSettings import EncryptionSettings
 from crownstone_core.protocol.BluenetTypes import ProcessType
+from crownstone_core.protocol.Characteristics import CrownstoneCharacteristics, SetupCharacteristics, DeviceCharacteristics
+from crownstone_core.util.Conversion import Conversion
 from crownstone_core.util.EncryptionHandler import EncryptionHandler
 
 from crownstone_ble.Exceptions import BleError
 from crownstone_ble.core.BleEventBus import BleEventBus
 
-from crownstone_ble.core.bluetooth_delegates.BleakScanDelegate import BleakScanDelegate
+from crownstone_ble.core.bluetooth_delegates.BleakScanDelegate import BleakScanDelegate, SCAN_SERVICE_UUIDS
 from crownstone_ble.core.bluetooth_delegates.NotificationDelegate import NotificationDelegate
+from crownstone_ble.core.modules.AdapterRouter import AdapterRouter
+from crownstone_ble.core.modules.AdvertisementRecording import AdvertisementRecorder
+from crownstone_ble.core.modules.CommandQueue import CommandQueue
+from crownstone_ble.core.modules.ConnectStrategy import ConnectStrategy, DEFAULT_CONNECT_TIMEOUT, DEFAULT_CONNECT_ATTEMPTS
+from crownstone_ble.core.modules.GattCache import GattCache
 from crownstone_ble.core.modules.Validator import Validator
 from crownstone_ble.topics.SystemBleTopics import SystemBleTopics
 
@@ -21,17 +29,41 @@ _LOGGER = logging.getLogger(__name__)
 
 CCCD_UUID = 0x2902
 
+# Most adapters can maintain several links at once, BlueZ defaults to a maximum of 7 for its controllers.
+DEFAULT_MAX_CONNECTIONS = 4
+
+# Time in seconds a connection stays open after disconnect, when keep alive is enabled.
+DEFAULT_KEEP_ALIVE_TIME = 10.0
 
-class ActiveClient:
 
-    def __init__(self, address, cleanupCallback, bleAdapterAddress):
+class ActiveClient:
+    """
+    A connection to a single BLE device, with its own encryption settings (session nonce) and notification subscriptions.
+    """
+
+    def __init__(self, address, cleanupCallback, bleAdapterAddress, settings: EncryptionSettings, clientBackend=None,
+                 gattCache: GattCache = None, operationMode=None):
+        # clientBackend creates the client, like BleakClient, which is the default.
+        # gattCache holds the discovered services of devices, so they don't have to be discovered on each connection.
+        # operationMode is the mode the device last advertised in, or None when unknown. It's part of the GATT cache key,
+        # so the cache is not used when it's unknown: the device might have changed mode, like after a factory reset.
         self.address = address
+        if clientBackend is None:
+            clientBackend = BleakClient
+        # The adapter this connection is made via.
+        self.adapter = bleAdapterAddress
         if bleAdapterAddress is None:
-            self.client = BleakClient(address)
+            self.client = clientBackend(address)
         else:
-            self.client = BleakClient(address, adapter=bleAdapterAddress)
+            self.client = clientBackend(address, adapter=bleAdapterAddress)
         self.cleanupCallback = cleanupCallback
         self.client.set_disconnected_callback(self.forcedDisconnect)
+        self.settings = settings
+        self.gattCache = gattCache
+        self.operationMode = operationMode
+
+        # Amount of control commands that may be written before their result came in.
+        self.maxCommandsInFlight = 1
 
         # Dict with service UUID as key, handle as value.
         self.services = {}
@@ -39,81 +71,393 @@ class ActiveClient:
         # Dict with characteristic UUID as key, handle as value.
         self.characteristics = {}
 
-        # Current callbacks for notifications, in the form of: def handleNotification(uuid: str, data)
-        # Characteristic UUID is key, callback is value.
-        self.notificationCallbacks = {}
+        # True when the services and characteristics came from the GATT cache, and have not been confirmed by a discovery.
+        self.servicesFromCache = False
+
+        # True when the session nonce of this connection has been read into the settings.
+        self.sessionRead = False
+
+        # Notification delegates that merge the notifications of the characteristics we subscribed to.
+        # Characteristic UUID is key, NotificationDelegate is value.
+        self.notificationDelegates = {}
 
         # Notifications we subscribed to.
         # Handle as key, UUID as value.
         self.notificationSubscriptions = {}
 
+        # Queues of control commands that wait for a result.
+        # Result characteristic UUID as key, CommandQueue as value.
+        self.commandQueues = {}
+
     def forcedDisconnect(self, data):
+        # Commands that wait for a result won't get it anymore.
+        for commandQueue in self.commandQueues.values():
+            commandQueue.failAll(CrownstoneBleException(CrownstoneError.DISCONNECTED, f"Disconnected from {self.address}."))
         BleEventBus.emit(SystemBleTopics.forcedDisconnect, self.address)
-        self.cleanupCallback()
+        self.cleanupCallback(self)
 
     async def isConnected(self):
         return await self.client.is_connected()
 
-    async def subscribeNotifications(self, characteristicUuid: str, callback):
-        _LOGGER.debug(f"register callback for notifications to uuid={characteristicUuid}")
-        if characteristicUuid in self.notificationCallbacks:
-            _LOGGER.error(f"There is already a callback registered for {characteristicUuid}")
+    async def is_connected(self) -> bool:
+        return await self.isConnected()
+
+    def getMtu(self) -> int or None:
+        """
+        :returns: The negotiated ATT MTU, or None when the client doesn't expose it.
+        """
+        return getattr(self.client, "mtu_size", None)
+
+    async def is_connected_guard(self):
+        connected = await self.isConnected()
+        if not connected:
+            _LOGGER.debug(f"Could not perform action since the client is not connected!.")
+            raise CrownstoneBleException("Not connected.")
 
-        if characteristicUuid not in self.notificationSubscriptions.values():
-            # handle = self.characteristics.get(uuid, None)
-            # if handle is not None:
+    async def discoverServices(self):
+        cachedTable = None
+        if self._useGattCache():
+            cachedTable = self.gattCache.get(self.address, self.operationMode)
+        if cachedTable is not None:
+            _LOGGER.debug(f"Using the cached services of {self.address}")
+            self.services, self.characteristics = cachedTable
+            self.servicesFromCache = True
+        else:
+            await self._loadServices()
+
+        self.notificationDelegates = {}
+        self.notificationSubscriptions = {}
+        self.commandQueues = {}
+
+        # Subscribe to the result characteristic right away, so commands don't have to wait for the CCCD write.
+        for resultCharacteristic in [CrownstoneCharacteristics.Result, SetupCharacteristics.Result]:
+            if self.hasCharacteristic(resultCharacteristic):
+                try:
+                    await self.subscribeNotifications(resultCharacteristic)
+                except (bleak.BleakError, CrownstoneBleException) as err:
+                    # Commands will try to subscribe again when they need the result.
+                    _LOGGER.warning(f"Failed to subscribe to result notifications: {err}")
+
+    async def _loadServices(self):
+        """
+        Discover the services and characteristics, and put them in the GATT cache.
+        Subscriptions are kept, with the handles of the new table.
+        """
+        serviceSet = await self.client.get_services()
+        self.services = {}
+        self.characteristics = {}
+        for key, service in serviceSet.services.items():
+            self.services[service.uuid] = key
+        for key, characteristic in serviceSet.characteristics.items():
+            self.characteristics[characteristic.uuid] = characteristic.handle
+        self.servicesFromCache = False
+
+        self.notificationSubscriptions = {}
+        for uuid in self.notificationDelegates:
+            if uuid in self.characteristics:
+                self.notificationSubscriptions[self.characteristics[uuid]] = uuid
+
+        if self._useGattCache():
+            self.gattCache.put(self.address, self.operationMode, self.services, self.characteristics)
+
+    def _useGattCache(self) -> bool:
+        return self.gattCache is not None and self.operationMode is not None
+
+    async def _gattOperation(self, operation):
+        """
+        Perform a GATT operation. When it fails while the services came from the GATT cache, the cached table might be
+        outdated: the entry is removed, the services are discovered, and the operation is tried once more.
+        """
+        try:
+            return await operation()
+        except (bleak.BleakError, CrownstoneBleException) as err:
+            if not self.servicesFromCache:
+                raise
+            if isinstance(err, CrownstoneBleException) and err.type != BleError.CAN_NOT_FIND_CHACTERISTIC:
+                raise
+            _LOGGER.info(f"GATT operation failed with the cached services of {self.address}, discovering services: {err}")
+            self.gattCache.invalidate(self.address)
+            await self._loadServices()
+            return await operation()
+
+    def setDeviceVersion(self, firmwareVersion: str = None, bootloaderVersion: str = None):
+        """
+        Let the GATT cache know the version of the device, so the cached table is dropped after a firmware update.
+        """
+        if self.gattCache is not None:
+            self.gattCache.setVersion(self.address, firmwareVersion, bootloaderVersion)
+
+    async def disconnect(self):
+        try:
+            await self.client.disconnect()
+        finally:
+            self.cleanupCallback(self)
+
+    async def waitForPeripheralToDisconnect(self, timeout: int = 10):
+        if await self.isConnected():
+            waiting = True
+            def disconnectListener(address):
+                nonlocal waiting
+                if address == self.address:
+                    waiting = False
+
+            listenerId = BleEventBus.subscribe(SystemBleTopics.forcedDisconnect, disconnectListener)
+
+            timer = 0
+            while waiting and timer < timeout:
+                await asyncio.sleep(0.1)
+                timer += 0.1
+
+            self.settings.exitSetup()
+            BleEventBus.unsubscribe(listenerId)
+
+            self.cleanupCallback(self)
+
+    async def subscribeNotifications(self, characteristicUuid: str) -> NotificationDelegate:
+        """
+        Subscribe to notifications of a characteristic. This is done only once per connection.
+        :returns: The NotificationDelegate that merges all notifications of this characteristic for this connection.
+        """
+        if characteristicUuid not in self.notificationDelegates:
             _LOGGER.debug(f"subscribe to uuid={characteristicUuid}")
-            handle = self.characteristics[characteristicUuid]
-            await self.client.start_notify(characteristicUuid, self._resultNotificationHandler)
+            delegate = NotificationDelegate(None, self.settings)
+            async def startNotify():
+                # Checked on each try, since the services might be discovered again in between.
+                if not self.hasCharacteristic(characteristicUuid):
+                    raise CrownstoneBleException(BleError.CAN_NOT_FIND_CHACTERISTIC, f"{self.address} has no characteristic {characteristicUuid}.")
+                await self.client.start_notify(characteristicUuid, self._resultNotificationHandler)
+                return self.characteristics[characteristicUuid]
+            handle = await self._gattOperation(startNotify)
             self.notificationSubscriptions[handle] = characteristicUuid
-        self.notificationCallbacks[characteristicUuid] = callback
+            self.notificationDelegates[characteristicUuid] = delegate
+        return self.notificationDelegates[characteristicUuid]
 
-    def unsubscribeNotifications(self, characteristicUuid: str):
-        _LOGGER.debug(f"remove callback for notifications to uuid={characteristicUuid}")
-        self.notificationCallbacks.pop(characteristicUuid, None)
+    async def unsubscribeNotifications(self, characteristicUuid: str):
+        _LOGGER.debug(f"unsubscribe from uuid={characteristicUuid}")
+        self.commandQueues.pop(characteristicUuid, None)
+        if self.notificationDelegates.pop(characteristicUuid, None) is not None:
+            handle = self.characteristics.get(characteristicUuid, None)
+            self.notificationSubscriptions.pop(handle, None)
+            await self.client.stop_notify(characteristicUuid)
 
     def _resultNotificationHandler(self, characteristicHandle, data):
         uuid = self.notificationSubscriptions.get(characteristicHandle, None)
         if uuid is None:
             _LOGGER.error(f"UUID not found for handle {characteristicHandle}")
-        callback = self.notificationCallbacks.get(uuid, None)
-        if callback is not None:
-            callback(uuid, data)
+            if self.servicesFromCache:
+                # The cached handles are outdated, so the next connection discovers the services again.
+                self.servicesFromCache = False
+                self.gattCache.invalidate(self.address)
+            return
+        delegate = self.notificationDelegates.get(uuid, None)
+        if delegate is not None:
+            delegate.handleNotification(uuid, data)
+
+    def hasService(self, serviceUUID) -> bool:
+        _LOGGER.debug(f"hasService serviceUUID={serviceUUID}")
+        return serviceUUID in self.services
+
+    def hasCharacteristic(self, characteristicUUID) -> bool:
+        _LOGGER.debug(f"hasCharacteristic characteristicUUID={characteristicUUID}")
+        return characteristicUUID in self.characteristics
+
+    async def writeToCharacteristic(self, serviceUUID, characteristicUUID, content):
+        _LOGGER.debug(f"writeToCharacteristic serviceUUID={serviceUUID} characteristicUUID={characteristicUUID} content={content}")
+        await self.is_connected_guard()
+        encryptedContent = EncryptionHandler.encrypt(content, self.settings)
+        payload = self._preparePayload(encryptedContent)
+        await self._gattOperation(lambda: self.client.write_gatt_char(characteristicUUID, payload, response=True))
+
+    async def writeToCharacteristicWithoutEncryption(self, serviceUUID, characteristicUUID, content):
+        _LOGGER.debug(f"writeToCharacteristicWithoutEncryption serviceUUID={serviceUUID} characteristicUUID={characteristicUUID} content={content}")
+        await self.is_connected_guard()
+        payload = self._preparePayload(content)
+        await self._gattOperation(lambda: self.client.write_gatt_char(characteristicUUID, payload, response=True))
+
+    async def readCharacteristic(self, serviceUUID, characteristicUUID):
+        _LOGGER.debug(f"readCharacteristic serviceUUID={serviceUUID} characteristicUUID={characteristicUUID}")
+        data = await self.readCharacteristicWithoutEncryption(serviceUUID, characteristicUUID)
+        if self.settings.isEncryptionEnabled():
+            return EncryptionHandler.decrypt(data, self.settings)
+
+    async def readCharacteristicWithoutEncryption(self, serviceUUID, characteristicUUID):
+        _LOGGER.debug(f"readCharacteristicWithoutEncryption serviceUUID={serviceUUID} characteristicUUID={characteristicUUID}")
+        await self.is_connected_guard()
+        data = await self._gattOperation(lambda: self.client.read_gatt_char(characteristicUUID))
+        if characteristicUUID == DeviceCharacteristics.FirmwareRevision:
+            self.setDeviceVersion(firmwareVersion=Conversion.uint8_array_to_string(data))
+        return data
+
+    async def getCommandQueue(self, resultCharacteristicUuid: str) -> CommandQueue:
+        """
+        :returns: The CommandQueue that matches the notifications of the given result characteristic to control commands.
+        """
+        await self.is_connected_guard()
+        delegate = await self.subscribeNotifications(resultCharacteristicUuid)
+        if resultCharacteristicUuid not in self.commandQueues:
+            self.commandQueues[resultCharacteristicUuid] = CommandQueue(delegate)
+        commandQueue = self.commandQueues[resultCharacteristicUuid]
+        commandQueue.maxInFlight = self.maxCommandsInFlight
+        return commandQueue
+
+    async def setupSingleNotification(self, serviceUUID, characteristicUUID, writeCommand, timeout = None):
+        if timeout is None:
+            timeout = 12.5
+
+        _LOGGER.debug(f"setupSingleNotification serviceUUID={serviceUUID} characteristicUUID={characteristicUUID}")
+        await self.is_connected_guard()
+
+        # get the delegate that collects the notification data, and drop results that no command waited for.
+        notificationDelegate = await self.subscribeNotifications(characteristicUUID)
+        notificationDelegate.clearResults()
+
+        # execute something that will trigger the notifications
+        _LOGGER.debug(f"setupSingleNotification: writeCommand().")
+        await writeCommand()
+
+        # wait for the result to come in.
+        try:
+            result = await notificationDelegate.getResult(timeout)
+        except asyncio.TimeoutError:
+            result = None
+
+        if result is None:
+            raise CrownstoneBleException(BleError.NO_NOTIFICATION_DATA_RECEIVED, "No notification data received.")
+
+        return result
+
+    async def setupNotificationStream(self, serviceUUID, characteristicUUID, writeCommand, resultHandler, timeout):
+        _LOGGER.debug(f"setupNotificationStream serviceUUID={serviceUUID} characteristicUUID={characteristicUUID} timeout={timeout}")
+        await self.is_connected_guard()
+
+        # get the delegate that collects the notification data, and drop results that no command waited for.
+        notificationDelegate = await self.subscribeNotifications(characteristicUUID)
+        notificationDelegate.clearResults()
+
+        # execute something that will trigger the notifications
+        _LOGGER.debug(f"setupNotificationStream: writeCommand().")
+        await writeCommand()
+
+        # handle the results as they come in.
+        successful = False
+        async for result in notificationDelegate.results(timeout):
+            command = resultHandler(result)
+            if command == ProcessType.ABORT_ERROR:
+                _LOGGER.debug("abort")
+                raise CrownstoneBleException(BleError.ABORT_NOTIFICATION_STREAM_W_ERROR, "Aborting the notification stream because the resultHandler raised an error.")
+            elif command == ProcessType.FINISHED:
+                _LOGGER.debug("finished")
+                successful = True
+                break
+            elif command == ProcessType.CONTINUE:
+                _LOGGER.debug("continue")
+
+        if not successful:
+            raise CrownstoneBleException(BleError.NOTIFICATION_STREAM_TIMEOUT, "Notification stream not finished within timeout.")
+
+    def _preparePayload(self, data: list or bytes or bytearray):
+        return bytearray(data)
 
 
 
 class BleHandler:
 
-    def __init__(self, settings: EncryptionSettings, bleAdapterAddress: str=None):
-        # bleAdapterAddress is the MAC address of the adapter you want to use.
+    def __init__(self, settings: EncryptionSettings, bleAdapterAddress: str or list = None, maxConnections: int = DEFAULT_MAX_CONNECTIONS, useScanFilter: bool = False,
+                 clientBackend=None, gattCachePath: str = None):
+        # bleAdapterAddress is the MAC address of the adapter you want to use, or a list of addresses to use several adapters.
+        # With several adapters, all of them scan, and each connection is made via the adapter that hears the device best.
+        # useScanFilter lets the OS drop scans without Crownstone service data UUIDs, before they reach Python. Only supported by BlueZ.
+        # clientBackend creates the clients of the connections, BleakClient when None. See SimulatedBackend.
+        # gattCachePath is the file the discovered services are stored in. When None, they are only cached in memory.
 
         self.settings = settings
-        self.bleAdapterAddress = bleAdapterAddress
+        if isinstance(bleAdapterAddress, (list, tuple)):
+            self.bleAdapterAddresses = list(bleAdapterAddress)
+        else:
+            self.bleAdapterAddresses = [bleAdapterAddress]
+        # The first adapter, which is used when a connection can't be routed.
+        self.bleAdapterAddress = self.bleAdapterAddresses[0]
+        self.clientBackend = clientBackend
 
-        # Connection
+        # Connections
+        # The connection made with connect(), used by the methods that don't get an address.
         self.activeClient: ActiveClient or None = None
+        # All connections, including the active client. Lower case address as key, ActiveClient as value.
+        self.activeClients = {}
+        # Maximum amount of simultaneous connections per adapter. Connecting waits until a connection slot is free.
+        self.maxConnections = maxConnections
+        # Adapter as key, amount of connections (including the ones being made) as value.
+        self.adapterConnections = {adapter: 0 for adapter in self.bleAdapterAddresses}
+        # Created on the first connect, so it is bound to the running event loop.
+        self.connectionSlots: asyncio.Semaphore or None = None
+
+        # Amount of control commands that may be written before their result came in.
+        # Only increase this when the firmware can handle multiple commands in flight.
+        self.maxCommandsInFlight = 1
+
+        # Keep alive
+        # Time in seconds the connection made with connect() stays open after disconnect(), so a next connect() to the
+        # same address can reuse it. 0 disables keep alive.
+        self.keepAliveTime = 0
+        # The connection that is kept open, and the timer that closes it.
+        self.idleClient: ActiveClient or None = None
+        self.idleTimer: asyncio.TimerHandle or None = None
+        self.reusedConnections = 0
+
+        # Discovered services of the devices, set to None to discover the services on every connection.
+        self.gattCache: GattCache or None = GattCache(gattCachePath)
 
         # Scanning
-        self.scanner = BleakScanner(adapter=bleAdapterAddress)
+        # The scanner of the first adapter, and the scanners of the other adapters, with the adapter as key.
+        self.scanner = self._createScanner(self.bleAdapterAddress, useScanFilter)
+        self.extraScanners = {adapter: self._createScanner(adapter, useScanFilter) for adapter in self.bleAdapterAddresses[1:]}
         self.scanningActive = False
-        self.scanAborted = False
-        scanDelegate = BleakScanDelegate(self.settings)
-        self.scanner.register_detection_callback(scanDelegate.handleDiscovery)
+        # time.monotonic() since when the scanner runs, or None when it's not running.
+        self.scanningSince = None
+        # When a scan session is active, the scanner keeps running after scan() is done.
+        self.scanSessionActive = False
+        # Events of the scan() calls that are waiting, which are set when the scan is aborted.
+        self.scanAbortedEvents = set()
+        self.scanDelegate = BleakScanDelegate(self.settings)
 
         # Event bus
         self.subscriptionIds = []
         self.validator = Validator()
         self.subscriptionIds.append(BleEventBus.subscribe(SystemBleTopics.abortScanning, lambda x: self.abortScan()))
 
-        # To be moved to active client or notification handler.
-        self.notificationLoopActive = False
+        # Merges the scans of multiple adapters, and routes connections. None with a single adapter.
+        self.adapterRouter: AdapterRouter or None = None
+        if len(self.bleAdapterAddresses) > 1:
+            self.adapterRouter = AdapterRouter(self.bleAdapterAddresses)
+            self.scanDelegate.adapterRouter = self.adapterRouter
+            self.validator.adapterRouter = self.adapterRouter
+            self.scanner.register_detection_callback(self.scanDelegate.getAdapterCallback(self.bleAdapterAddress))
+            for adapter, scanner in self.extraScanners.items():
+                scanner.register_detection_callback(self.scanDelegate.getAdapterCallback(adapter))
+        else:
+            self.scanner.register_detection_callback(self.scanDelegate.handleDiscovery)
+
+        # Decides the timeout and attempts of connects, and fails connects to absent devices right away.
+        # None until enabled, which always uses the given timeout and attempts.
+        self.connectStrategy: ConnectStrategy or None = None
+
+
+    def _createScanner(self, adapter, useScanFilter):
+        if useScanFilter:
+            # Other backends than BlueZ ignore the filters.
+            return BleakScanner(adapter=adapter, filters={"UUIDs": list(SCAN_SERVICE_UUIDS.keys()), "Transport": "le"})
+        return BleakScanner(adapter=adapter)
 
 
     async def shutDown(self):
         for subscriptionId in self.subscriptionIds:
             BleEventBus.unsubscribe(subscriptionId)
-        await self.disconnect()
-        await self.stopScanning()
+        BleEventBus.unsubscribe(self.validator.subscriptionId)
+        self._cancelIdleTimer()
+        for client in list(self.activeClients.values()):
+            await client.disconnect()
+        await self.stopScanSession()
+        self.stopRecording()
 
 
     async def is_connected_guard(self):
@@ -126,245 +470,357 @@ class BleHandler:
     async def is_connected(self, address = None) -> bool:
         """
         Check if connected to a BLE device.
-        :param address: When not None, check if connected to given address.
+        :param address: When not None, check if connected to given address, else check the active client.
         :returns:       True when connected.
         """
-        if self.activeClient is None:
+        client = self.getClient(address)
+        if client is None:
             return False
-        if address is not None:
-            if self.activeClient.address.lower() != address.lower():
-                return False
-        connected = await self.activeClient.client.is_connected()
+        connected = await client.isConnected()
         if connected:
             return True
+        return False
+
+
+    def getClient(self, address = None) -> ActiveClient or None:
+        """
+        :param address: Address of the connection. When None, the active client is returned.
+        :returns:       The connection to the given address, or None when not connected.
+        """
+        if address is None:
+            return self.activeClient
+        return self.activeClients.get(address.lower(), None)
 
 
     def resetClient(self):
         self.activeClient = None
 
 
-    async def connect(self, address, timeout: int = 5, attempts: int = 3) -> bool:
-        # TODO: Check if activeClient is already set.
-        self.activeClient = ActiveClient(address, lambda: self.resetClient(), self.bleAdapterAddress)
-        _LOGGER.info(f"Connecting to {address}")
+    def _releaseClient(self, client: ActiveClient):
+        """
+        Remove a connection from the pool, and free its connection slot. Can be called multiple times for the same client.
+        """
+        if self.activeClient is client:
+            self.resetClient()
+        if self.idleClient is client:
+            self._cancelIdleTimer()
+        if self.activeClients.get(client.address.lower(), None) is client:
+            del self.activeClients[client.address.lower()]
+            self._releaseSlot(client.adapter)
 
-        connected = False
-        for i in range(0, attempts):
-            connected = await self.connectAttempt(timeout)
-            if connected:
-                break
-        if not connected:
-            raise CrownstoneBleException(CrownstoneError.CONNECTION_FAILED)
 
-        _LOGGER.info(f"Connected")
-        serviceSet = await self.activeClient.client.get_services()
-        self.activeClient.services = {}
-        self.activeClient.characteristics = {}
-        for key, service in serviceSet.services.items():
-            self.activeClient.services[service.uuid] = key
-        for key, characteristic in serviceSet.characteristics.items():
-            self.activeClient.characteristics[characteristic.uuid] = characteristic.handle
+    def _acquireAdapter(self, address):
+        """
+        Pick the adapter for a connection to the given address, and take one of its connection slots.
+        Must be called after a connection slot is acquired.
+        """
+        adapter = None
+        if self.adapterRouter is not None:
+            adapter = self.adapterRouter.getBestAdapter(address, self.adapterConnections, self.maxConnections)
+        if adapter is None:
+            adapter = self.bleAdapterAddress
+        self.adapterConnections[adapter] += 1
+        return adapter
 
-        self.activeClient.notificationCallbacks = {}
-        self.activeClient.notificationSubscriptions = {}
 
+    def _releaseSlot(self, adapter):
+        self.adapterConnections[adapter] -= 1
+        self.connectionSlots.release()
 
 
-        return connected
-        # print(self.activeClient.client.services.characteristics)
+    async def connect(self, address, timeout: float = None, attempts: int = None) -> bool:
+        """
+        Connect to a BLE device, and make it the active client. A connection that is kept alive, and an active client to
+        another device, are closed first, so they don't keep their connection slot.
+        :param timeout:   Timeout of each attempt in seconds. When None, the connect strategy decides.
+        :param attempts:  Maximum amount of attempts. When None, the connect strategy decides.
+        """
+        await self.closeIdleConnection()
+        previousClient = self.activeClient
+        if previousClient is not None and previousClient.address.lower() != address.lower():
+            _LOGGER.info(f"Still connected to {previousClient.address}, disconnecting first.")
+            await previousClient.disconnect()
+        self.activeClient = await self.openConnection(address, self.settings, timeout, attempts)
+        return True
+
 
-    async def connectAttempt(self, timeout: int) -> bool:
+    async def openConnection(self, address, settings: EncryptionSettings, timeout: float = None, attempts: int = None) -> ActiveClient:
+        """
+        Connect to a BLE device, without changing the active client.
+        Waits until a connection slot is free when there are already maxConnections connections.
+        :param settings:  The encryption settings of this connection. Don't share these between connections, since they hold the session nonce.
+        :param timeout:   Timeout of each attempt in seconds. When None, the connect strategy decides.
+        :param attempts:  Maximum amount of attempts. When None, the connect strategy decides.
+        :returns:         The connection.
+        """
+        strategy = self.connectStrategy
+        if strategy is not None:
+            # Raises when the device is absent, or when its circuit is open.
+            strategy.checkConnect(address, self.scanningSince)
+            if timeout is None:
+                timeout = strategy.getTimeout(address)
+            if attempts is None:
+                attempts = strategy.getAttempts(address)
+        if timeout is None:
+            timeout = DEFAULT_CONNECT_TIMEOUT
+        if attempts is None:
+            attempts = DEFAULT_CONNECT_ATTEMPTS
+
+        if self.connectionSlots is None:
+            self.connectionSlots = asyncio.Semaphore(self.maxConnections * len(self.bleAdapterAddresses))
+
+        previousClient = self.getClient(address)
+        if previousClient is not None:
+            _LOGGER.info(f"Already connected to {address}, disconnecting first.")
+            await previousClient.disconnect()
+
+        await self.connectionSlots.acquire()
+        adapter = self._acquireAdapter(address)
+        try:
+            device = self.validator.registry.getDevice(address)
+            operationMode = None if device is None else device.operationMode
+            client = ActiveClient(address, self._releaseClient, adapter, settings, self.clientBackend, self.gattCache, operationMode)
+            client.maxCommandsInFlight = self.maxCommandsInFlight
+            _LOGGER.info(f"Connecting to {address}")
+
+            connected = False
+            startTime = time.perf_counter()
+            for i in range(0, attempts):
+                if i > 0 and strategy is not None:
+                    await asyncio.sleep(strategy.getBackoff(i))
+                attemptStartTime = time.perf_counter()
+                connected = await self.connectAttempt(client, timeout)
+                if connected:
+                    if strategy is not None:
+                        now = time.perf_counter()
+                        strategy.recordSuccess(address, now - attemptStartTime, now - startTime)
+                    break
+            if not connected:
+                if strategy is not None:
+                    strategy.recordFailure(address)
+                raise CrownstoneBleException(CrownstoneError.CONNECTION_FAILED)
+        except BaseException:
+            self._releaseSlot(adapter)
+            raise
+
+        _LOGGER.info(f"Connected to {address}")
+        self.activeClients[address.lower()] = client
+        try:
+            await client.discoverServices()
+        except BaseException:
+            await client.disconnect()
+            raise
+        return client
+
+
+    async def connectAttempt(self, client: ActiveClient, timeout: int) -> bool:
         # this can throw an error when the connection fails.
         # these BleakErrors are nicely human readable.
         # TODO: document/convert these errors.
         try:
             _LOGGER.debug(f"Connecting..")
-            connected = await self.activeClient.client.connect(timeout = timeout)
+            connected = await client.client.connect(timeout = timeout)
         except bleak.BleakError as err:
             _LOGGER.info(f"Failed to connect: {err}")
             connected = False
         return connected
 
 
-    async def disconnect(self):
-        if self.activeClient is not None:
-            await self.activeClient.client.disconnect()
-            self.activeClient = None
+    async def disconnect(self, address = None, keepAlive: bool = False):
+        """
+        :param address:    Address of the connection to disconnect. When None, the active client is disconnected.
+        :param keepAlive:  When keep alive is enabled, keep the active client open for keepAliveTime seconds, so it can be reused.
+        """
+        client = self.getClient(address)
+        if client is None:
+            return
+        if keepAlive and address is None and self.keepAliveTime > 0:
+            self._cancelIdleTimer()
+            self.idleClient = client
+            self.idleTimer = asyncio.get_event_loop().call_later(self.keepAliveTime, self._onIdleTimeout)
+            return
+        await client.disconnect()
+
+
+    async def reuseConnection(self, address) -> bool:
+        """
+        Make the connection that is kept alive in use again, when it's to the given address and still connected.
+        :returns: True when the connection is reused, False when a new connection has to be made.
+        """
+        client = self.idleClient
+        if client is None or client.address.lower() != address.lower():
+            return False
+        self._cancelIdleTimer()
+        # A connection that was lost has already been released via forcedDisconnect.
+        if self.activeClient is not client or not await client.isConnected():
+            await client.disconnect()
+            return False
+        self.reusedConnections += 1
+        return True
 
 
-    async def waitForPeripheralToDisconnect(self, timeout: int = 10):
-        if self.activeClient is not None:
-            if await self.activeClient.isConnected():
-                waiting = True
-                def disconnectListener(data):
-                    nonlocal waiting
-                    waiting = False
+    async def closeIdleConnection(self):
+        """
+        Close the connection that is kept alive, if any.
+        """
+        client = self.idleClient
+        self._cancelIdleTimer()
+        if client is not None:
+            _LOGGER.debug(f"Closing idle connection to {client.address}")
+            await client.disconnect()
 
-                listenerId = BleEventBus.subscribe(SystemBleTopics.forcedDisconnect, disconnectListener)
 
-                timer = 0
-                while waiting and timer < 10:
-                    await asyncio.sleep(0.1)
-                    timer += 0.1
+    def _onIdleTimeout(self):
+        self.idleTimer = None
+        asyncio.ensure_future(self.closeIdleConnection())
 
-                self.settings.exitSetup()
-                BleEventBus.unsubscribe(listenerId)
 
-                self.activeClient = None
+    def _cancelIdleTimer(self):
+        if self.idleTimer is not None:
+            self.idleTimer.cancel()
+            self.idleTimer = None
+        self.idleClient = None
+
+
+    async def waitForPeripheralToDisconnect(self, timeout: int = 10):
+        if self.activeClient is not None:
+            await self.activeClient.waitForPeripheralToDisconnect(timeout)
 
 
     async def scan(self, duration=3):
+        """
+        Scan until the duration has passed, or until the scan is aborted via SystemBleTopics.abortScanning.
+        The scan ends the moment it is aborted, the duration is a deadline on the monotonic event loop clock.
+        The scanner keeps running while other scans are waiting, or while a scan session is active.
+        """
         _LOGGER.debug(f"scan duration={duration}")
+        # Created here, so it is bound to the running event loop.
+        scanAbortedEvent = asyncio.Event()
+        self.scanAbortedEvents.add(scanAbortedEvent)
+        try:
+            await self.startScanning()
+            await asyncio.wait_for(scanAbortedEvent.wait(), timeout=max(duration, 0))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.scanAbortedEvents.discard(scanAbortedEvent)
+
+        if not self.scanSessionActive and len(self.scanAbortedEvents) == 0:
+            await self.stopScanning()
+
+
+    async def startScanSession(self):
+        """
+        Start scanning until stopScanSession is called. Scans that are done in the meantime don't stop the scanner.
+        """
+        self.scanSessionActive = True
         await self.startScanning()
-        while duration > 0 and self.scanAborted == False:
-            await asyncio.sleep(0.1)
-            duration -= 0.1
+
+
+    async def stopScanSession(self):
+        self.scanSessionActive = False
         await self.stopScanning()
 
 
     async def startScanning(self):
         _LOGGER.debug(f"startScanning scanningActive={self.scanningActive}")
         if not self.scanningActive:
-            self.scanAborted = False
             self.scanningActive = True
             await self.scanner.start()
+            for scanner in self.extraScanners.values():
+                await scanner.start()
+            self.scanningSince = time.monotonic()
 
 
     async def stopScanning(self):
         _LOGGER.debug(f"stopScanning scanningActive={self.scanningActive}")
         if self.scanningActive:
             self.scanningActive = False
-            self.scanAborted = False
+            self.scanningSince = None
             await self.scanner.stop()
+            for scanner in self.extraScanners.values():
+                await scanner.stop()
 
 
     def abortScan(self):
         _LOGGER.debug("abortScan")
-        self.scanAborted = True
+        for scanAbortedEvent in self.scanAbortedEvents:
+            scanAbortedEvent.set()
+
+
+    async def setScanner(self, scanner):
+        """
+        Replace the scanner of the first adapter, for example by a ReplayScanner. The current scanner is stopped first.
+        :param scanner:  Object with the register_detection_callback, start and stop methods of a BleakScanner.
+        """
+        wasScanning = self.scanningActive
+        await self.stopScanning()
+        self.scanner = scanner
+        if self.adapterRouter is not None:
+            self.scanner.register_detection_callback(self.scanDelegate.getAdapterCallback(self.bleAdapterAddress))
+        else:
+            self.scanner.register_detection_callback(self.scanDelegate.handleDiscovery)
+        if wasScanning:
+            await self.startScanning()
+
+
+    def startRecording(self, path: str):
+        """
+        Record all scanner callbacks to a file, which can be replayed with the ReplayScanner.
+        """
+        self.stopRecording()
+        self.scanDelegate.recorder = AdvertisementRecorder(path)
+
+
+    def stopRecording(self):
+        if self.scanDelegate.recorder is not None:
+            self.scanDelegate.recorder.close()
+            self.scanDelegate.recorder = None
+
+    def setDeviceVersion(self, firmwareVersion: str = None, bootloaderVersion: str = None):
+        if self.activeClient is not None:
+            self.activeClient.setDeviceVersion(firmwareVersion, bootloaderVersion)
 
     def hasService(self, serviceUUID) -> bool:
-        _LOGGER.debug(f"hasService serviceUUID={serviceUUID}")
-        return serviceUUID in self.activeClient.services
+        return self.activeClient.hasService(serviceUUID)
 
     def hasCharacteristic(self, characteristicUUID) -> bool:
-        _LOGGER.debug(f"hasCharacteristic characteristicUUID={characteristicUUID}")
-        return characteristicUUID in self.activeClient.characteristics
+        return self.activeClient.hasCharacteristic(characteristicUUID)
 
     async def writeToCharacteristic(self, serviceUUID, characteristicUUID, content):
-        _LOGGER.debug(f"writeToCharacteristic serviceUUID={serviceUUID} characteristicUUID={characteristicUUID} content={content}")
         await self.is_connected_guard()
-        encryptedContent = EncryptionHandler.encrypt(content, self.settings)
-        payload = self._preparePayload(encryptedContent)
-        await self.activeClient.client.write_gatt_char(characteristicUUID, payload, response=True)
+        await self.activeClient.writeToCharacteristic(serviceUUID, characteristicUUID, content)
 
 
     async def writeToCharacteristicWithoutEncryption(self, serviceUUID, characteristicUUID, content):
-        _LOGGER.debug(f"writeToCharacteristicWithoutEncryption serviceUUID={serviceUUID} characteristicUUID={characteristicUUID} content={content}")
         await self.is_connected_guard()
-        payload = self._preparePayload(content)
-        await self.activeClient.client.write_gatt_char(characteristicUUID, payload, response=True)
+        await self.activeClient.writeToCharacteristicWithoutEncryption(serviceUUID, characteristicUUID, content)
 
 
     async def readCharacteristic(self, serviceUUID, characteristicUUID):
-        _LOGGER.debug(f"readCharacteristic serviceUUID={serviceUUID} characteristicUUID={characteristicUUID}")
-        data = await self.readCharacteristicWithoutEncryption(serviceUUID, characteristicUUID)
-        if self.settings.isEncryptionEnabled():
-            return EncryptionHandler.decrypt(data, self.settings)
+        await self.is_connected_guard()
+        return await self.activeClient.readCharacteristic(serviceUUID, characteristicUUID)
 
 
     async def readCharacteristicWithoutEncryption(self, serviceUUID, characteristicUUID):
-        _LOGGER.debug(f"readCharacteristicWithoutEncryption serviceUUID={serviceUUID} characteristicUUID={characteristicUUID}")
         await self.is_connected_guard()
-        return await self.activeClient.client.read_gatt_char(characteristicUUID)
+        return await self.activeClient.readCharacteristicWithoutEncryption(serviceUUID, characteristicUUID)
 
 
-    async def setupSingleNotification(self, serviceUUID, characteristicUUID, writeCommand, timeout = None):
-        if timeout is None:
-            timeout = 12.5
-
-        _LOGGER.debug(f"setupSingleNotification serviceUUID={serviceUUID} characteristicUUID={characteristicUUID}")
+    async def getCommandQueue(self, resultCharacteristicUUID) -> CommandQueue:
+        """
+        Get the command queue of the active client, for control commands that get their result via the given characteristic.
+        """
         await self.is_connected_guard()
-
-        # setup the collecting of the notification data.
-        _LOGGER.debug(f"setupSingleNotification: subscribe for notifications.")
-        notificationDelegate = NotificationDelegate(self._killNotificationLoop, self.settings)
-        await self.activeClient.subscribeNotifications(characteristicUUID, notificationDelegate.handleNotification)
-
-        # execute something that will trigger the notifications
-        _LOGGER.debug(f"setupSingleNotification: writeCommand().")
-        await writeCommand()
-
-        # wait for the results to come in.
-        self.notificationLoopActive = True
-        loopCount = 0
-        polInterval = 0.1
-        while self.notificationLoopActive and loopCount < (timeout / polInterval):
-            await asyncio.sleep(polInterval)
-            loopCount += 1
+        self.activeClient.maxCommandsInFlight = self.maxCommandsInFlight
+        return await self.activeClient.getCommandQueue(resultCharacteristicUUID)
 
 
-        if notificationDelegate.result is None:
-            if self.activeClient is not None:
-                self.activeClient.unsubscribeNotifications(characteristicUUID)
-            raise CrownstoneBleException(BleError.NO_NOTIFICATION_DATA_RECEIVED, "No notification data received.")
-
-        if self.activeClient is not None:
-            self.activeClient.unsubscribeNotifications(characteristicUUID)
-        return notificationDelegate.result
+    async def setupSingleNotification(self, serviceUUID, characteristicUUID, writeCommand, timeout = None):
+        await self.is_connected_guard()
+        return await self.activeClient.setupSingleNotification(serviceUUID, characteristicUUID, writeCommand, timeout)
 
 
     async def setupNotificationStream(self, serviceUUID, characteristicUUID, writeCommand, resultHandler, timeout):
-        _LOGGER.debug(f"setupNotificationStream serviceUUID={serviceUUID} characteristicUUID={characteristicUUID} timeout={timeout}")
         await self.is_connected_guard()
-
-        # setup the collecting of the notification data.
-        _LOGGER.debug(f"setupNotificationStream: subscribe for notifications.")
-        notificationDelegate = NotificationDelegate(None, self.settings)
-        await self.activeClient.subscribeNotifications(characteristicUUID, notificationDelegate.handleNotification)
-
-        # execute something that will trigger the notifications
-        _LOGGER.debug(f"setupNotificationStream: writeCommand().")
-        await writeCommand()
-
-        # wait for the results to come in.
-        self.notificationLoopActive = True
-        loopCount = 0
-        successful = False
-        polInterval = 0.1
-        while self.notificationLoopActive and loopCount < (timeout / polInterval):
-            await asyncio.sleep(polInterval)
-            _LOGGER.debug(f"loopActive={self.notificationLoopActive} loopCount={loopCount}")
-            loopCount += 1
-            if notificationDelegate.result is not None:
-                command = resultHandler(notificationDelegate.result)
-                notificationDelegate.reset()
-                if command == ProcessType.ABORT_ERROR:
-                    _LOGGER.debug("abort")
-                    self.notificationLoopActive = False
-                    self.activeClient.unsubscribeNotifications(characteristicUUID)
-                    raise CrownstoneBleException(BleError.ABORT_NOTIFICATION_STREAM_W_ERROR, "Aborting the notification stream because the resultHandler raised an error.")
-                elif command == ProcessType.FINISHED:
-                    _LOGGER.debug("finished")
-                    self.notificationLoopActive = False
-                    successful = True
-                elif command == ProcessType.CONTINUE:
-                    _LOGGER.debug("continue")
-
-        if not successful:
-            self.activeClient.unsubscribeNotifications(characteristicUUID)
-            raise CrownstoneBleException(BleError.NOTIFICATION_STREAM_TIMEOUT, "Notification stream not finished within timeout.")
-
-        # remove subscription from this characteristic
-        self.activeClient.unsubscribeNotifications(characteristicUUID)
-
-    def _killNotificationLoop(self):
-        _LOGGER.debug("_killNotificationLoop")
-        self.notificationLoopActive = False
-
-
-    def _preparePayload(self, data: list or bytes or bytearray):
-        return bytearray(data)
-
-
-
-
+        await self.activeClient.setupNotificationStream(serviceUUID, characteristicUUID, writeCommand, resultHandler, timeout)
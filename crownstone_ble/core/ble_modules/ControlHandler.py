@@ -96,13 +96,14 @@ class ControlHandler:
             # Only wait for a short time, because we don't expect a result packet.
             await self._writeControlAndGetResult(ControlPacketsGenerator.getDisconnectPacket(), [ResultValue.SUCCESS], 1)
         except CrownstoneBleException as err:
-            if err.type == BleError.NO_NOTIFICATION_DATA_RECEIVED:
+            # The Crownstone may drop the link before the result comes in.
+            if err.type == BleError.NO_NOTIFICATION_DATA_RECEIVED or err.type == CrownstoneError.DISCONNECTED:
                 _LOGGER.info(f"Ignoring expected error: {err}")
             else:
                 raise err
 
         # Disconnect from this side as well.
-        self.core.ble.disconnect()
+        await self.core.ble.disconnect()
 
 
     async def lockSwitch(self, lock: bool):
@@ -171,8 +172,9 @@ class ControlHandler:
         if not syncer.commitRequired:
             return syncer.masterVersion
 
-        for filterId in syncer.removeIds:
-            await self.removeFilter(filterId)
+        _LOGGER.info(f"removeFilters ids={syncer.removeIds}")
+        removePackets = [ControlPacketsGenerator.getRemoveFilterPacket(filterId) for filterId in syncer.removeIds]
+        await self._writeControlPacketsAndGetResults(removePackets)
 
         for filter in filters:
             if filter.getFilterId() in syncer.uploadIds:
@@ -205,9 +207,8 @@ class ControlHandler:
         """
         _LOGGER.info(f"uploadFilter {filter}")
         chunker = FilterChunker(filter, 128)
-        for i in range(0, chunker.getAmountOfChunks()):
-            chunk = chunker.getChunk()
-            await self._writeControlAndGetResult(ControlPacketsGenerator.getUploadFilterPacket(chunk))
+        packets = [ControlPacketsGenerator.getUploadFilterPacket(chunker.getChunk()) for i in range(0, chunker.getAmountOfChunks())]
+        await self._writeControlPacketsAndGetResults(packets)
 
     async def removeFilter(self, filterId):
         """
@@ -257,11 +258,9 @@ class ControlHandler:
         :param acceptedResultValues:   List of result values that are ok.
         :returns:                      The result packet.
         """
-        if self.core.ble.hasCharacteristic(SetupCharacteristics.Result):
-            result = await self.core.ble.setupSingleNotification(CSServices.SetupService, SetupCharacteristics.Result, lambda: self._writeControlPacket(controlPacket), timeout)
-        else:
-            result = await self.core.ble.setupSingleNotification(CSServices.CrownstoneService, CrownstoneCharacteristics.Result, lambda: self._writeControlPacket(controlPacket), timeout)
-        resultPacket = ResultPacket(result)
+        if timeout is None:
+            timeout = 12.5
+        resultPacket = await self._executeControlCommand(controlPacket, None, timeout)
         if not resultPacket.valid:
             raise CrownstoneException(CrownstoneError.INCORRECT_RESPONSE_LENGTH, "Result is invalid")
         if resultPacket.resultCode not in acceptedResultValues:
@@ -269,7 +268,21 @@ class ControlHandler:
 
         return resultPacket
 
-    async def _writeControlAndWaitForSuccess(self, controlPacket, timeout = 5, acceptedResultValues = [ResultValue.SUCCESS, ResultValue.SUCCESS_NO_CHANGE]):
+    async def _writeControlPacketsAndGetResults(self, controlPackets) -> List[ResultPacket]:
+        """
+        Writes multiple control packets, pipelined when the connection allows multiple commands in flight.
+        Stops at the first command that fails.
+        :param controlPackets:         List of serialized control packets to write, in order.
+        :returns:                      List with the result packet of each control packet.
+        """
+        tasks = [asyncio.ensure_future(self._writeControlAndGetResult(packet)) for packet in controlPackets]
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _writeControlAndWaitForSuccess(self, controlPacket, timeout = 5, acceptedResultValues = [ResultValue.SUCCESS, ResultValue.SUCCESS_NO_CHANGE]) -> ResultPacket:
         """
         Writes the control packet, checks the result value, and returns the result packet.
         :param controlPacket:          Serialized control packet to write.
@@ -293,20 +306,23 @@ class ControlHandler:
                 _LOGGER.warning("Invalid result packet.")
                 return ProcessType.ABORT_ERROR
 
+        return await self._executeControlCommand(controlPacket, handleResult, timeout)
+
+    async def _executeControlCommand(self, controlPacket, resultHandler, timeout) -> ResultPacket:
+        """
+        Writes the control packet via the command queue of the connection, and waits for the result.
+        :param controlPacket:          Serialized control packet to write.
+        :param resultHandler:          Optional function that gets each result, and returns a ProcessType.
+        :param timeout:                Timeout in seconds.
+        :returns:                      The (final) result packet.
+        """
         if self.core.ble.hasCharacteristic(SetupCharacteristics.Result):
-            service = CSServices.SetupService
             resultCharacteristic = SetupCharacteristics.Result
         else:
-            service = CSServices.CrownstoneService
             resultCharacteristic = CrownstoneCharacteristics.Result
 
-        await self.core.ble.setupNotificationStream(
-            service,
-            resultCharacteristic,
-            lambda: self._writeControlPacket(controlPacket),
-            lambda notification: handleResult(notification),
-            timeout
-        )
+        commandQueue = await self.core.ble.getCommandQueue(resultCharacteristic)
+        return await commandQueue.execute(controlPacket, lambda: self._writeControlPacket(controlPacket), resultHandler, timeout)
 
 def ProcessSessionNoncePacket(encryptedPacket, key, settings):
     # decrypt it
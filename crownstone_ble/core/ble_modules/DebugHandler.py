@@ -35,6 +35,7 @@ class DebugHandler:
 		bootloaderVersion = f"{bootloaderInfo.major}.{bootloaderInfo.minor}.{bootloaderInfo.patch}"
 		if bootloaderInfo.preReleaseVersion != 255:
 			bootloaderVersion += f".{bootloaderInfo.preReleaseVersion}"
+		self.core.ble.setDeviceVersion(bootloaderVersion=bootloaderVersion)
 		return bootloaderVersion
 
 	async def getBootloaderInfo(self) -> BootloaderInfoPacket:
@@ -8,6 +8,9 @@ from crownstone_core.packets.microapp.MicroappUploadPacket import MicroappUpload
 from crownstone_core.protocol.BlePackets import ControlStateGetPacket, ControlStateSetPacket, ControlPacket
 from crownstone_core.protocol.BluenetTypes import StateType, ControlType
 
+from crownstone_ble.core.container.MicroappUploadResult import MicroappUploadResult
+from crownstone_ble.core.modules.MicroappUploader import MicroappUploader
+
 _LOGGER = logging.getLogger(__name__)
 
 class DevHandler:
@@ -30,15 +33,18 @@ class DevHandler:
         infoPacket = MicroappInfoPacket(resultPacket.payload)
         return infoPacket
 
-    async def uploadMicroapp(self, data: bytearray, index: int = 0, chunkSize: int = 128):
-        for i in range(0, len(data), chunkSize):
-            chunk = data[i : i + chunkSize]
-            # Pad the chunk with 0xFF, so the size is a multiple of 4.
-            if len(chunk) % 4:
-                if isinstance(chunk, bytes):
-                    chunk = bytearray(chunk)
-                chunk.extend((4 - (len(chunk) % 4)) * [0xFF])
-            await self.uploadMicroappChunk(index, chunk, i)
+    async def uploadMicroapp(self, data: bytearray, index: int = 0, chunkSize: int = None, force: bool = False) -> MicroappUploadResult:
+        """
+        Upload a microapp binary with a MicroappUploader: skipped when the Crownstone already has it validated, resumed after a
+        lost connection, and with the chunk size that uploads the fastest.
+        :param data:       The binary.
+        :param index:      The app index to upload to.
+        :param chunkSize:  Upper limit of the chunk size, on top of the limit of the Crownstone.
+        :param force:      When True, the binary is uploaded, even when the Crownstone already has it.
+        :returns:          The result, with the statistics of the upload.
+        """
+        uploader = MicroappUploader(self.core, data, index, maxChunkSize=chunkSize)
+        return await uploader.upload(force)
 
     async def uploadMicroappChunk(self, index: int, data: bytearray, offset: int):
         _LOGGER.info(f"Upload microapp chunk index={index} offset={offset} size={len(data)}")
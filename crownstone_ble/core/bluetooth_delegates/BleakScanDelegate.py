@@ -4,34 +4,119 @@ from crownstone_core.protocol.Services import DFU_ADVERTISEMENT_SERVICE_UUID
 from crownstone_core.packets.Advertisement import Advertisement
 
 from crownstone_ble.core.BleEventBus import BleEventBus
+from crownstone_ble.core.modules.ServiceDataCache import ServiceDataCache
 from crownstone_ble.topics.SystemBleTopics import SystemBleTopics
 
 SERVICE_DATA_ADTYPE = 22
 NAME_ADTYPE         = 8
 FLAGS_ADTYPE        = 1
 
+CROWNSTONE_SERVICE_DATA_UUID = "0000c001-0000-1000-8000-00805f9b34fb"
+
+# The service data UUIDs of Crownstones, with the service UUID that is used to parse the service data as value.
+SCAN_SERVICE_UUIDS = {
+    CROWNSTONE_SERVICE_DATA_UUID:   0xC001,
+    DFU_ADVERTISEMENT_SERVICE_UUID: DFU_ADVERTISEMENT_SERVICE_UUID,
+}
+
 class BleakScanDelegate:
 
     def __init__(self, settings):
         self.settings = settings
 
+        # Parsed service data of advertisements that were received before.
+        self.serviceDataCache = ServiceDataCache()
+        # The service data key that the cached service data was decrypted with.
+        self.cachedServiceDataKey = None
+
+        # Counters of the scans at each stage.
+        self.callbackCount                = 0  # Scans received from bleak.
+        self.noCrownstoneServiceDataCount = 0  # Scans that were dropped, because they have no Crownstone service data.
+        self.notCrownstoneFamilyCount     = 0  # Scans that were dropped, because the service data is not of a Crownstone.
+        self.forwardedCount               = 0  # Scans that were parsed and forwarded.
+        self.duplicateCount               = 0  # Scans that were dropped, because another adapter received the same scan.
+
+        # AdvertisementRecorder, when recording.
+        self.recorder = None
+        # AdapterRouter, when scanning on multiple adapters.
+        self.adapterRouter = None
+
     def handleDiscovery(self, device, advertisement_data):
-        serviceData = advertisement_data.service_data
-        for serviceUUID, serviceData in serviceData.items():
-            longUUID = serviceUUID
-            if "0000c001-0000-1000-8000-00805f9b34fb" in longUUID:
-                shortUUID = int(longUUID[4:8], 16)
-                self.parsePayload(device.address, device.rssi, device.name, list(serviceData), shortUUID)
-            elif DFU_ADVERTISEMENT_SERVICE_UUID in longUUID:
-                self.parsePayload(device.address, device.rssi, device.name, list(serviceData), DFU_ADVERTISEMENT_SERVICE_UUID)
+        self.handleAdapterDiscovery(device, advertisement_data, None)
+
+    def getAdapterCallback(self, adapter):
+        """
+        :returns: Detection callback for the scanner of the given adapter. Bleak requires a callback with 2 parameters.
+        """
+        return lambda device, advertisement_data: self.handleAdapterDiscovery(device, advertisement_data, adapter)
+
+    def handleAdapterDiscovery(self, device, advertisement_data, adapter):
+        """
+        :param adapter:  The adapter that received the scan, when scanning on multiple adapters.
+        """
+        self.callbackCount += 1
+        if self.recorder is not None:
+            self.recorder.record(device, advertisement_data)
+        forwarded = False
+        duplicate = False
+        for longUUID, serviceData in advertisement_data.service_data.items():
+            serviceUUID = SCAN_SERVICE_UUIDS.get(longUUID.lower(), None)
+            if serviceUUID is not None:
+                if self.adapterRouter is not None and not self.adapterRouter.handleScan(adapter, device.address, bytes(serviceData), device.rssi):
+                    duplicate = True
+                    continue
+                self.parsePayload(device.address, device.rssi, device.name, serviceData, serviceUUID)
+                forwarded = True
+        if duplicate and not forwarded:
+            self.duplicateCount += 1
+        elif not forwarded:
+            self.noCrownstoneServiceDataCount += 1
+
+
+    def getStatistics(self) -> dict:
+        """
+        :returns: Dict with the counters of the scans at each stage, and of the service data cache.
+        """
+        return {
+            "callbacks":                self.callbackCount,
+            "noCrownstoneServiceData":  self.noCrownstoneServiceDataCount,
+            "notCrownstoneFamily":      self.notCrownstoneFamilyCount,
+            "forwarded":                self.forwardedCount,
+            "duplicates":               self.duplicateCount,
+            "serviceDataCache":         self.serviceDataCache.getStatistics(),
+        }
+
+
+    def invalidateCache(self):
+        """
+        Drop the cached service data, must be called when the service data key changes.
+        """
+        self.serviceDataCache.invalidate()
+        self.cachedServiceDataKey = None
 
 
     def parsePayload(self, address, rssi, nameText, serviceDataArray, serviceUUID):
-        advertisement = Advertisement(address, rssi, nameText, serviceDataArray, serviceUUID)
+        if self.settings.serviceDataKey is not self.cachedServiceDataKey:
+            self.invalidateCache()
+            self.cachedServiceDataKey = self.settings.serviceDataKey
+
+        rawServiceData = bytes(serviceDataArray)
+        serviceData = self.serviceDataCache.get(serviceUUID, rawServiceData)
+        if serviceData is not None:
+            # Same service data as before, so skip decrypting and parsing.
+            advertisement = Advertisement(address, rssi, nameText, None, serviceUUID)
+            advertisement.serviceData = serviceData
+            advertisement.operationMode = serviceData.getOperationMode()
+            if serviceUUID == DFU_ADVERTISEMENT_SERVICE_UUID:
+                advertisement.operationMode = CrownstoneOperationMode.DFU
+            self.forwardedCount += 1
+            BleEventBus.emit(SystemBleTopics.rawAdvertisementClass, advertisement)
+            return
+
+        advertisement = Advertisement(address, rssi, nameText, list(serviceDataArray), serviceUUID)
         if advertisement.isCrownstoneFamily():
             if advertisement.operationMode == CrownstoneOperationMode.SETUP:
                 advertisement.parse()
-                BleEventBus.emit(SystemBleTopics.rawAdvertisementClass, advertisement)
             else:
                 try:
                     advertisement.parse(self.settings.serviceDataKey)
@@ -39,4 +124,9 @@ class BleakScanDelegate:
                     # fail silently. If we can't parse this, we just to propagate this message
                     pass
 
-                BleEventBus.emit(SystemBleTopics.rawAdvertisementClass, advertisement)
+            if advertisement.hasServiceData():
+                self.serviceDataCache.put(serviceUUID, rawServiceData, advertisement.serviceData)
+            self.forwardedCount += 1
+            BleEventBus.emit(SystemBleTopics.rawAdvertisementClass, advertisement)
+        else:
+            self.notCrownstoneFamilyCount += 1
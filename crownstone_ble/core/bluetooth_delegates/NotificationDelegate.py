@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 from crownstone_core.Exceptions import CrownstoneBleException
@@ -10,7 +11,9 @@ _LOGGER = logging.getLogger(__name__)
 class NotificationDelegate:
     """
     Merges notifications and decrypts the merged data.
-    The decrypted data is then placed in the "result" variable.
+    Each decrypted result is placed in the "result" variable, and put on a queue which can be awaited with getResult(),
+    or iterated with results(). If a resultListener is set, results are passed to it instead of being put on the queue.
+    Must be constructed from within the event loop that awaits the results.
     """
 
     def __init__(self, callback, settings):
@@ -20,21 +23,27 @@ class NotificationDelegate:
         self.result = None
         self.settings = settings
 
+        # Some bleak backends call the notification handler from another thread, so results are handed over via the loop.
+        self.loop = asyncio.get_event_loop()
+        self.resultQueue = asyncio.Queue()
+        self.resultListener = None
+
     def handleNotification(self, uuid, data):
         self.merge(data)
 
     def merge(self, data):
         part = data[0]
 
-        if self.result is not None:
-            _LOGGER.info(f"Last part already received, ignoring this part.")
-            return
-
         # Ignore the case where we receive the same part twice.
         if part == self.previousPart:
             _LOGGER.info(f"Already received part {part}, ignoring this part.")
             return
 
+        # A new message always starts at part 0, drop any message that was left unfinished.
+        if part == 0 and self.previousPart != -1:
+            _LOGGER.info(f"Received part 0 while expecting part {self.previousPart + 1}, starting a new message.")
+            self.reset()
+
         # Check the part number.
         if part != LAST_PACKET_INDEX and part != self.previousPart + 1:
             _LOGGER.info(f"Receive part {part}, expected part {self.previousPart + 1}")
@@ -51,9 +60,48 @@ class NotificationDelegate:
             self.reset()
             self.result = result
             _LOGGER.debug(f"Result: {result}")
+            self.loop.call_soon_threadsafe(self._deliverResult, result)
             if self.callback is not None:
                 self.callback()
 
+    def _deliverResult(self, result):
+        if self.resultListener is not None:
+            self.resultListener(result)
+        else:
+            self.resultQueue.put_nowait(result)
+
+    async def getResult(self, timeout):
+        """
+        Wait for the next merged result.
+        The result is None when the merged data could not be decrypted.
+        Raises asyncio.TimeoutError when no result arrived within timeout seconds.
+        """
+        return await asyncio.wait_for(self.resultQueue.get(), timeout)
+
+    async def results(self, timeout):
+        """
+        Async iterator over the merged results, in order of arrival.
+        Results that could not be decrypted are skipped. Iteration stops once timeout seconds have passed.
+        """
+        deadline = self.loop.time() + timeout
+        while True:
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                return
+            try:
+                result = await self.getResult(remaining)
+            except asyncio.TimeoutError:
+                return
+            if result is not None:
+                yield result
+
+    def clearResults(self):
+        """
+        Drop the results that have been merged, but not retrieved yet.
+        """
+        while not self.resultQueue.empty():
+            self.resultQueue.get_nowait()
+
     def checkPayload(self):
         try:
             return EncryptionHandler.decrypt(self.dataCollected, self.settings)
@@ -0,0 +1,23 @@
+class BatchResult:
+    """
+    Result of an action that was performed on a single Crownstone, as part of a batch.
+    - duration:  time in seconds from the start of the first attempt until the end of the last attempt.
+    - error:     the error of the last failed attempt, None when successful.
+    - result:    the value returned by the action.
+    """
+
+    def __init__(self, address):
+        self.address  = address
+        self.success  = False
+        self.attempts = 0
+        self.duration = None
+        self.error    = None
+        self.result   = None
+
+    def __str__(self):
+        return \
+           f"address:  {self.address  }\n" \
+           f"success:  {self.success  }\n" \
+           f"attempts: {self.attempts }\n" \
+           f"duration: {self.duration }\n" \
+           f"error:    {self.error    }\n"
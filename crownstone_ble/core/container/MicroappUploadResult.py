@@ -0,0 +1,41 @@
+class MicroappUploadResult:
+    """
+    Result of a microapp upload to a single Crownstone.
+    - skipped:              True when the Crownstone already had a validated app at the index with the checksums of the binary, so nothing was uploaded.
+    - bytesUploaded:        amount of bytes acknowledged during this upload, less than size when it was resumed from an earlier upload.
+    - chunks:               amount of chunks acknowledged during this upload.
+    - chunkSize:            chunk size at the end of the upload.
+    - chunkSizeReductions:  amount of times the chunk size was lowered after a failed chunk, or after the connection was lost twice at the same chunk.
+    - resumes:              amount of times the upload was resumed after the connection was lost.
+    - resumedFrom:          offsets from which the upload was resumed.
+    - duration:             time in seconds from the start of the upload until the last chunk was acknowledged.
+    - bytesPerSecond:       bytesUploaded divided by the duration, or None when nothing was uploaded.
+    """
+
+    def __init__(self, address, index: int, size: int):
+        self.address             = address
+        self.index               = index
+        self.size                = size
+        self.skipped             = False
+        self.bytesUploaded       = 0
+        self.chunks              = 0
+        self.chunkSize           = None
+        self.chunkSizeReductions = 0
+        self.resumes             = 0
+        self.resumedFrom         = []
+        self.duration            = None
+        self.bytesPerSecond      = None
+
+    def __str__(self):
+        return \
+           f"address:             {self.address            }\n" \
+           f"index:               {self.index              }\n" \
+           f"size:                {self.size               }\n" \
+           f"skipped:             {self.skipped            }\n" \
+           f"bytesUploaded:       {self.bytesUploaded      }\n" \
+           f"chunks:              {self.chunks             }\n" \
+           f"chunkSize:           {self.chunkSize          }\n" \
+           f"chunkSizeReductions: {self.chunkSizeReductions}\n" \
+           f"resumes:             {self.resumes            }\n" \
+           f"duration:            {self.duration           }\n" \
+           f"bytesPerSecond:      {self.bytesPerSecond     }\n"
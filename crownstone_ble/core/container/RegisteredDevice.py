@@ -0,0 +1,26 @@
+class RegisteredDevice:
+    """
+    What the DeviceRegistry knows about a single Crownstone.
+    - rssi:          exponentially smoothed RSSI, None when no valid RSSI has been received.
+    - crownstoneId:  None when the device is not validated in normal mode.
+    - lastSeen:      time.monotonic() of the last scan.
+    """
+    __slots__ = ("address", "scanData", "rssi", "operationMode", "validated", "crownstoneId", "lastSeen")
+
+    def __init__(self, address):
+        self.address       = address
+        self.scanData      = None
+        self.rssi          = None
+        self.operationMode = None
+        self.validated     = False
+        self.crownstoneId  = None
+        self.lastSeen      = None
+
+    def __str__(self):
+        return \
+           f"address:       {self.address      }\n" \
+           f"rssi:          {self.rssi         }\n" \
+           f"operationMode: {self.operationMode}\n" \
+           f"validated:     {self.validated    }\n" \
+           f"crownstoneId:  {self.crownstoneId }\n" \
+           f"lastSeen:      {self.lastSeen     }\n"
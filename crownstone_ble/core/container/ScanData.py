@@ -1,4 +1,6 @@
 class ScanData:
+    # A ScanData is made for every scan, slots make them smaller and faster to create.
+    __slots__ = ("address", "rssi", "name", "operationMode", "deviceType", "payload", "validated", "adapterRssi")
 
     def __init__(self):
         self.address       = None
@@ -8,6 +10,8 @@ class ScanData:
         self.deviceType    = None
         self.payload       = None
         self.validated     = None
+        # When scanning on multiple adapters: dict with adapter as key, and the recent RSSI of that adapter as value.
+        self.adapterRssi   = None
 
     def __str__(self):
         return \
@@ -17,4 +21,5 @@ class ScanData:
            f"operationMode: {self.operationMode        }\n" \
            f"deviceType:    {self.deviceType.__str__() }\n" \
            f"payload:       {self.payload              }\n" \
-           f"validated:     {self.validated            }\n"
+           f"validated:     {self.validated            }\n" \
+           f"adapterRssi:   {self.adapterRssi          }\n"
@@ -2,8 +2,12 @@ from crownstone_core.packets.Advertisement import Advertisement
 from crownstone_ble.core.container.ScanData import ScanData
 
 
-def fillScanDataFromAdvertisement(advertisement: Advertisement, validated: bool):
-    data = ScanData()
+def fillScanDataFromAdvertisement(advertisement: Advertisement, validated: bool, data: ScanData = None):
+    """
+    :param data:  ScanData to fill, instead of creating a new one. Only reuse a ScanData when nothing keeps a reference to it.
+    """
+    if data is None:
+        data = ScanData()
 
     data.address        = advertisement.address.lower()
     data.rssi           = advertisement.rssi
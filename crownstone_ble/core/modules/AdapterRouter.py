@@ -0,0 +1,127 @@
+import time
+
+# Time in seconds in which the same service data heard by another adapter is a duplicate.
+DEFAULT_DEDUPLICATION_WINDOW = 0.5
+# RSSI of an adapter that has not heard a device during this time in seconds is ignored.
+DEFAULT_RSSI_WINDOW = 10.0
+# Weight of a new RSSI measurement in the smoothed RSSI per adapter.
+ADAPTER_RSSI_SMOOTHING_FACTOR = 0.3
+# Amount of dB an adapter scores lower for each connection it already has, to spread connections over the adapters.
+CONNECTION_PENALTY = 5.0
+PRUNE_INTERVAL = 60.0
+
+
+class AdapterRssi:
+    __slots__ = ("rssi", "lastSeen")
+
+    def __init__(self, rssi, lastSeen):
+        self.rssi     = rssi
+        self.lastSeen = lastSeen
+
+
+"""
+Merges the scans of several adapters, and routes connections to the adapter that hears a device best.
+
+Each scan is passed to handleScan, with the adapter that received it. A scan with the same service data as the last scan
+of that device, from another adapter within the deduplication window, is a duplicate and should be dropped. The RSSI of
+each adapter is still used: it is smoothed per device and adapter.
+
+getBestAdapter picks the adapter with the best smoothed RSSI, lowered by CONNECTION_PENALTY for each connection the
+adapter already has, from the adapters that heard the device within the RSSI window, and have a free connection slot.
+"""
+class AdapterRouter:
+
+    def __init__(self, adapters: list, deduplicationWindow: float = DEFAULT_DEDUPLICATION_WINDOW, rssiWindow: float = DEFAULT_RSSI_WINDOW):
+        self.adapters = list(adapters)
+        self.deduplicationWindow = deduplicationWindow
+        self.rssiWindow = rssiWindow
+
+        # Lower case address as key, dict with adapter as key and AdapterRssi as value.
+        self.rssiByAddress = {}
+        # Lower case address as key, tuple of the service data, adapter and time of the last forwarded scan as value.
+        self.lastForwarded = {}
+        self.nextPrune = time.monotonic() + PRUNE_INTERVAL
+
+        self.scanCounts      = {adapter: 0 for adapter in self.adapters}
+        self.duplicateCounts = {adapter: 0 for adapter in self.adapters}
+        self.routedCounts    = {adapter: 0 for adapter in self.adapters}
+
+
+    def handleScan(self, adapter, address, serviceData: bytes, rssi) -> bool:
+        """
+        :returns: True when the scan should be forwarded, False when it's a duplicate of a scan of another adapter.
+        """
+        now = time.monotonic()
+        if now >= self.nextPrune:
+            self._prune(now)
+
+        address = address.lower()
+        self.scanCounts[adapter] = self.scanCounts.get(adapter, 0) + 1
+        if rssi is not None and rssi < 0:
+            adapterRssi = self.rssiByAddress.setdefault(address, {})
+            entry = adapterRssi.get(adapter, None)
+            if entry is None or now - entry.lastSeen > self.rssiWindow:
+                adapterRssi[adapter] = AdapterRssi(rssi, now)
+            else:
+                entry.rssi += ADAPTER_RSSI_SMOOTHING_FACTOR * (rssi - entry.rssi)
+                entry.lastSeen = now
+
+        last = self.lastForwarded.get(address, None)
+        if last is not None and last[1] != adapter and last[0] == serviceData and now - last[2] < self.deduplicationWindow:
+            self.duplicateCounts[adapter] = self.duplicateCounts.get(adapter, 0) + 1
+            return False
+        self.lastForwarded[address] = (serviceData, adapter, now)
+        return True
+
+
+    def getRssiByAdapter(self, address) -> dict:
+        """
+        :returns: Dict with adapter as key, and the smoothed RSSI as value, of the adapters that heard the device within the RSSI window.
+        """
+        now = time.monotonic()
+        adapterRssi = self.rssiByAddress.get(address.lower(), {})
+        return {adapter: round(entry.rssi) for adapter, entry in adapterRssi.items() if now - entry.lastSeen <= self.rssiWindow}
+
+
+    def getBestAdapter(self, address, connectionCounts: dict, maxConnections: int):
+        """
+        :param connectionCounts:  Dict with adapter as key, and its amount of connections as value.
+        :param maxConnections:    Maximum amount of connections per adapter.
+        :returns:                 The adapter to connect via, or None when no adapter has a free connection slot.
+        """
+        available = [adapter for adapter in self.adapters if connectionCounts.get(adapter, 0) < maxConnections]
+        if len(available) == 0:
+            return None
+        rssiByAdapter = self.getRssiByAdapter(address)
+
+        def score(adapter):
+            penalty = CONNECTION_PENALTY * connectionCounts.get(adapter, 0)
+            if adapter not in rssiByAdapter:
+                # Adapters that didn't hear the device only get the connection when none of the others can take it.
+                return float("-inf"), -penalty
+            return rssiByAdapter[adapter] - penalty, -penalty
+
+        best = max(available, key=score)
+        self.routedCounts[best] = self.routedCounts.get(best, 0) + 1
+        return best
+
+
+    def getStatistics(self) -> dict:
+        """
+        :returns: Dict with adapter as key, and a dict with the amount of scans, dropped duplicates and routed connections as value.
+        """
+        return {adapter: {"scans":      self.scanCounts.get(adapter, 0),
+                          "duplicates": self.duplicateCounts.get(adapter, 0),
+                          "routed":     self.routedCounts.get(adapter, 0)} for adapter in self.adapters}
+
+
+    def _prune(self, now):
+        self.nextPrune = now + PRUNE_INTERVAL
+        for address in list(self.rssiByAddress.keys()):
+            adapterRssi = self.rssiByAddress[address]
+            for adapter in [adapter for adapter, entry in adapterRssi.items() if now - entry.lastSeen > self.rssiWindow]:
+                del adapterRssi[adapter]
+            if len(adapterRssi) == 0:
+                del self.rssiByAddress[address]
+        for address in [address for address, last in self.lastForwarded.items() if now - last[2] > self.deduplicationWindow]:
+            del self.lastForwarded[address]
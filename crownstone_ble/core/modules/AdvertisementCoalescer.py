@@ -0,0 +1,94 @@
+import asyncio
+import logging
+
+from crownstone_ble.core.container.ScanData import ScanData
+
+_LOGGER = logging.getLogger(__name__)
+
+# Minimum time in seconds between two emissions of the same address.
+DEFAULT_COALESCE_INTERVAL = 1.0
+
+
+"""
+Class that limits the emissions of each address to one per interval.
+
+The first scan of an address is emitted right away. Scans that arrive within the interval after an emission are not
+emitted, but the newest of them is kept, and emitted when the interval has passed. So a consumer always ends up with
+the newest scan of each address, at most 'interval' seconds late.
+The interval uses the event loop, so scans have to be added from within the event loop, like the scanner callbacks do.
+"""
+class AdvertisementCoalescer:
+
+    def __init__(self, emitFunction, interval: float = DEFAULT_COALESCE_INTERVAL):
+        """
+        :param emitFunction:  Function that emits a ScanData.
+        :param interval:      Minimum time in seconds between two emissions of the same address.
+        """
+        self.emitFunction = emitFunction
+        self.interval     = interval
+
+        # Address as key, loop time of the last emission as value.
+        self.lastEmitTimes = {}
+        # Address as key, newest ScanData that has not been emitted as value.
+        self.pending = {}
+        # Address as key, timer handle of the pending emission as value.
+        self.timerHandles = {}
+
+        self.receivedCount = 0
+        self.emittedCount  = 0
+
+
+    def add(self, scanData: ScanData):
+        self.receivedCount += 1
+        address = scanData.address
+        if address in self.timerHandles:
+            # An emission is already scheduled, it will emit this newer scan.
+            self.pending[address] = scanData
+            return
+
+        loop = asyncio.get_event_loop()
+        now = loop.time()
+        lastEmitTime = self.lastEmitTimes.get(address, None)
+        if lastEmitTime is None or now - lastEmitTime >= self.interval:
+            self._emit(address, scanData, now)
+        else:
+            self.pending[address] = scanData
+            self.timerHandles[address] = loop.call_at(lastEmitTime + self.interval, self._emitPending, address)
+
+
+    def remove(self, address: str):
+        """
+        Forget an address, without emitting its pending scan.
+        """
+        handle = self.timerHandles.pop(address, None)
+        if handle is not None:
+            handle.cancel()
+        self.pending.pop(address, None)
+        self.lastEmitTimes.pop(address, None)
+
+
+    def flush(self):
+        """
+        Emit all pending scans.
+        """
+        now = asyncio.get_event_loop().time()
+        for address in list(self.timerHandles.keys()):
+            self.timerHandles.pop(address).cancel()
+            self._emit(address, self.pending.pop(address), now)
+
+
+    def getStatistics(self) -> dict:
+        return {"received": self.receivedCount, "emitted": self.emittedCount}
+
+
+    def _emitPending(self, address):
+        del self.timerHandles[address]
+        scanData = self.pending.pop(address, None)
+        if scanData is not None:
+            self._emit(address, scanData, asyncio.get_event_loop().time())
+
+
+    def _emit(self, address, scanData: ScanData, now: float):
+        self.lastEmitTimes[address] = now
+        self.emittedCount += 1
+        self.emitFunction(scanData)
@@ -0,0 +1,150 @@
+import logging
+import struct
+import time
+import uuid
+
+from crownstone_core.Exceptions import CrownstoneBleException
+
+from crownstone_ble.Exceptions import BleError
+
+_LOGGER = logging.getLogger(__name__)
+
+"""
+Binary format of recorded scanner callbacks, all little endian:
+
+Header:
+- magic:              5 bytes, "CSREC"
+- version:            uint8
+- start time:         float64, time.time() at the start of the recording.
+
+Followed by a record per callback:
+- timestamp:          float64, seconds since the start of the recording.
+- rssi:               int8
+- address length:     uint8
+- name length:        uint8, 0 when the device has no name.
+- service data count: uint8
+- address:            utf-8
+- name:               utf-8
+- per service data:   16 bytes UUID, uint16 length, data.
+"""
+RECORDING_MAGIC   = b"CSREC"
+RECORDING_VERSION = 1
+
+HEADER_FORMAT       = struct.Struct("<5sBd")
+RECORD_FORMAT       = struct.Struct("<dbBBB")
+SERVICE_DATA_FORMAT = struct.Struct("<16sH")
+
+
+class RecordedDevice:
+    """ The parts of bleak's BLEDevice that the BleakScanDelegate uses. """
+    __slots__ = ("address", "rssi", "name")
+
+    def __init__(self, address: str, rssi: int, name: str or None):
+        self.address = address
+        self.rssi    = rssi
+        self.name    = name
+
+
+class RecordedAdvertisementData:
+    """ The parts of bleak's AdvertisementData that the BleakScanDelegate uses. """
+    __slots__ = ("service_data",)
+
+    def __init__(self, serviceData: dict):
+        self.service_data = serviceData
+
+
+class RecordedAdvertisement:
+    """
+    A single recorded scanner callback.
+    - timestamp:  seconds since the start of the recording.
+    """
+    __slots__ = ("timestamp", "device", "advertisementData")
+
+    def __init__(self, timestamp: float, device: RecordedDevice, advertisementData: RecordedAdvertisementData):
+        self.timestamp         = timestamp
+        self.device            = device
+        self.advertisementData = advertisementData
+
+
+class AdvertisementRecorder:
+    """
+    Writes scanner callbacks to a file, in the format above.
+    Call record() with the arguments of the detection callback, and close() when done.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "wb")
+        self.startTime = time.monotonic()
+        self.recordCount = 0
+        self.file.write(HEADER_FORMAT.pack(RECORDING_MAGIC, RECORDING_VERSION, time.time()))
+
+
+    def record(self, device, advertisementData):
+        if self.file is None:
+            return
+        address = device.address.encode("utf-8")
+        name = (device.name or "").encode("utf-8")[:255]
+        serviceData = advertisementData.service_data
+        rssi = max(-128, min(127, device.rssi if device.rssi is not None else -128))
+
+        parts = [
+            RECORD_FORMAT.pack(time.monotonic() - self.startTime, rssi, len(address), len(name), len(serviceData)),
+            address,
+            name,
+        ]
+        for serviceUUID, data in serviceData.items():
+            parts.append(SERVICE_DATA_FORMAT.pack(uuid.UUID(serviceUUID).bytes, len(data)))
+            parts.append(bytes(data))
+        self.file.write(b"".join(parts))
+        self.recordCount += 1
+
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            _LOGGER.info(f"Recorded {self.recordCount} scans to {self.path}")
+
+
+def readRecording(path: str) -> list:
+    """
+    Read a recording made by the AdvertisementRecorder.
+    :returns: List of RecordedAdvertisement, in order of recording.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+
+    if len(data) < HEADER_FORMAT.size:
+        raise CrownstoneBleException(BleError.INVALID_RECORDING, f"{path} is not a recording.")
+    magic, version, startTime = HEADER_FORMAT.unpack_from(data, 0)
+    if magic != RECORDING_MAGIC:
+        raise CrownstoneBleException(BleError.INVALID_RECORDING, f"{path} is not a recording.")
+    if version != RECORDING_VERSION:
+        raise CrownstoneBleException(BleError.INVALID_RECORDING, f"Recording version {version} is not supported.")
+
+    records = []
+    offset = HEADER_FORMAT.size
+    try:
+        while offset < len(data):
+            timestamp, rssi, addressLength, nameLength, serviceDataCount = RECORD_FORMAT.unpack_from(data, offset)
+            offset += RECORD_FORMAT.size
+            address = data[offset:offset + addressLength].decode("utf-8")
+            offset += addressLength
+            name = data[offset:offset + nameLength].decode("utf-8") if nameLength > 0 else None
+            offset += nameLength
+
+            serviceData = {}
+            for i in range(0, serviceDataCount):
+                uuidBytes, length = SERVICE_DATA_FORMAT.unpack_from(data, offset)
+                offset += SERVICE_DATA_FORMAT.size
+                serviceData[str(uuid.UUID(bytes=uuidBytes))] = data[offset:offset + length]
+                offset += length
+
+            if offset > len(data):
+                raise struct.error("Incomplete record")
+            records.append(RecordedAdvertisement(timestamp, RecordedDevice(address, rssi, name), RecordedAdvertisementData(serviceData)))
+    except (struct.error, UnicodeDecodeError):
+        # The recording was not closed properly, keep the complete records.
+        _LOGGER.warning(f"Recording {path} ends with an incomplete record.")
+    return records
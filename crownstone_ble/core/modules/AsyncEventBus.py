@@ -0,0 +1,263 @@
+import asyncio
+import collections
+import logging
+import traceback
+import uuid
+from enum import Enum
+from typing import Callable, Any
+
+from crownstone_core.Exceptions import CrownstoneBleException
+from crownstone_core.util.EventBus import EventBus
+
+from crownstone_ble.Exceptions import BleError
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_ASYNC_QUEUE_SIZE = 1000
+
+
+class QueuePolicy(Enum):
+    # When the queue is full, the emitter handles the oldest item inline, in its own call of emit. Nothing is dropped, and
+    # the emitter is slowed down to the speed of the subscriber, without waiting. Only for callbacks that are not async.
+    INLINE             = "INLINE"
+    # When the queue is full, the oldest item is dropped.
+    DROP_OLDEST        = "DROP_OLDEST"
+    # Only the latest item per address is queued, an item replaces the queued item with the same address.
+    # When the queue is full with other addresses, the oldest item is dropped.
+    LATEST_PER_ADDRESS = "LATEST_PER_ADDRESS"
+
+
+class AsyncSubscriber:
+    """
+    A subscriber that gets the items of a topic via its own bounded queue, from a task in the event loop.
+    - dropped:        items that were dropped, or replaced by a newer item of the same address.
+    - maxQueueDepth:  the highest amount of items that were queued at the same time.
+    """
+
+    def __init__(self, topic: str, callback, maxQueueSize: int, policy: QueuePolicy, name: str = None):
+        self.topic        = topic
+        self.callback     = callback
+        self.maxQueueSize = maxQueueSize
+        self.policy       = policy
+        self.name         = name
+
+        if policy == QueuePolicy.LATEST_PER_ADDRESS:
+            self.queue = collections.OrderedDict()
+        else:
+            self.queue = collections.deque()
+        self.itemAvailable = asyncio.Event()
+        self.task = asyncio.ensure_future(self._run())
+
+        self.emitted       = 0
+        self.handled       = 0
+        self.dropped       = 0
+        self.maxQueueDepth = 0
+
+
+    def put(self, data):
+        self.emitted += 1
+        if self.policy == QueuePolicy.LATEST_PER_ADDRESS:
+            address = getattr(data, "address", None)
+            if address in self.queue:
+                self.queue[address] = data
+                self.dropped += 1
+                return
+            if len(self.queue) >= self.maxQueueSize:
+                self.queue.popitem(last=False)
+                self.dropped += 1
+            self.queue[address] = data
+        else:
+            if len(self.queue) >= self.maxQueueSize:
+                oldest = self.queue.popleft()
+                if self.policy == QueuePolicy.INLINE:
+                    self._handle(oldest)
+                else:
+                    self.dropped += 1
+            self.queue.append(data)
+
+        self.maxQueueDepth = max(self.maxQueueDepth, len(self.queue))
+        self.itemAvailable.set()
+
+
+    def stop(self):
+        self.task.cancel()
+
+
+    def getMetrics(self) -> dict:
+        return {
+            "topic":         self.topic,
+            "name":          self.name,
+            "policy":        self.policy,
+            "queueDepth":    len(self.queue),
+            "maxQueueDepth": self.maxQueueDepth,
+            "emitted":       self.emitted,
+            "handled":       self.handled,
+            "dropped":       self.dropped,
+        }
+
+
+    async def _run(self):
+        while True:
+            if len(self.queue) == 0:
+                self.itemAvailable.clear()
+                await self.itemAvailable.wait()
+                continue
+
+            if self.policy == QueuePolicy.LATEST_PER_ADDRESS:
+                address, data = self.queue.popitem(last=False)
+            else:
+                data = self.queue.popleft()
+
+            result = self._handle(data)
+            if asyncio.iscoroutine(result):
+                try:
+                    await result
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._logError(e)
+            else:
+                # Let the emitter and other tasks run between items.
+                await asyncio.sleep(0)
+
+
+    def _handle(self, data):
+        self.handled += 1
+        try:
+            return self.callback(data)
+        except Exception as e:
+            self._logError(e)
+
+
+    def _logError(self, e):
+        _LOGGER.error(f"Error in async callback of {self.name or self.topic}: {e}")
+        _LOGGER.info(traceback.format_exc())
+
+
+# The fields of the emitted data that subscriptions can be filtered on, from most to least selective.
+FILTER_FIELDS = ["address", "crownstoneId", "operationMode"]
+
+
+def _getFilterValue(data, field):
+    if field == "crownstoneId":
+        return getattr(getattr(data, "payload", None), "crownstoneId", None)
+    return getattr(data, field, None)
+
+
+"""
+EventBus that can also deliver the items of a topic asynchronously, and only to the subscribers that match a filter.
+
+Subscribers of subscribeAsync() get the items via their own bounded queue, from a task in the event loop, so a slow
+subscriber does not stall the emitter (like the scanner callback) or the other subscribers.
+Subscribers of subscribe() are called synchronously, as before.
+
+Subscriptions with an address, crownstoneId or operationMode filter are indexed on the value of the most selective filter,
+so emit only calls the subscribers with a matching value, instead of all subscribers of the topic.
+"""
+class AsyncEventBus(EventBus):
+
+    def __init__(self):
+        super().__init__()
+        # Subscription id as key, AsyncSubscriber as value.
+        self.asyncSubscribers = {}
+
+        # Topic as key, value is a dict with the filter field as key, and a dict with filter value as key and
+        # a dict of {subscriptionId: callback} as value.
+        self.indexedTopics = {}
+        # Subscription id as key, (topic, field, value) as value.
+        self.indexedSubscriptions = {}
+
+
+    def subscribe(self, topic: str, callback: Callable[[Any], None], address: str = None, crownstoneId: int = None,
+                  operationMode = None) -> str:
+        """
+        Subscribe to a topic. When filters are given, the callback only gets the data that matches all of them.
+        :param address:        Only get data with this MAC address.
+        :param crownstoneId:   Only get data of which the payload has this Crownstone id.
+        :param operationMode:  Only get data with this CrownstoneOperationMode.
+        :returns:              A subscriptionId to be used to unsubscribe.
+        """
+        filters = {"address": address.lower() if address is not None else None, "crownstoneId": crownstoneId, "operationMode": operationMode}
+        filters = {field: value for field, value in filters.items() if value is not None}
+        if len(filters) == 0:
+            return super().subscribe(topic, callback)
+
+        # Index on the most selective filter, and check the other filters in the callback.
+        indexField = next(field for field in FILTER_FIELDS if field in filters)
+        indexValue = filters.pop(indexField)
+        if len(filters) > 0:
+            callback = self._getFilteredCallback(callback, filters)
+
+        subscriptionId = str(uuid.uuid4())
+        index = self.indexedTopics.setdefault(topic, {field: {} for field in FILTER_FIELDS})
+        index[indexField].setdefault(indexValue, {})[subscriptionId] = callback
+        self.indexedSubscriptions[subscriptionId] = (topic, indexField, indexValue)
+        return subscriptionId
+
+
+    def emit(self, topic: str, data: Any = None):
+        super().emit(topic, data)
+        index = self.indexedTopics.get(topic)
+        if index is None or data is None:
+            return
+        for field in FILTER_FIELDS:
+            subscribers = index[field].get(_getFilterValue(data, field))
+            if subscribers:
+                for subscriptionId, callback in list(subscribers.items()):
+                    try:
+                        callback(data)
+                    except Exception as e:
+                        _LOGGER.error(f"Error in callback of subscriptionId={subscriptionId}: {e}")
+                        _LOGGER.info(traceback.format_exc())
+
+
+    def subscribeAsync(self, topic: str, callback: Callable[[Any], Any], maxQueueSize: int = DEFAULT_ASYNC_QUEUE_SIZE,
+                       policy: QueuePolicy = QueuePolicy.DROP_OLDEST, name: str = None, **filters) -> str:
+        """
+        Subscribe to a topic, with a queue between the emitter and the callback. Must be called from within the event loop.
+        :param callback:      Function or async function that gets the emitted data.
+        :param maxQueueSize:  Maximum amount of items in the queue.
+        :param policy:        What to do when the queue is full, see QueuePolicy.
+        :param name:          Name of the subscriber in the metrics.
+        :param filters:       The address, crownstoneId and operationMode filters of subscribe().
+        :returns:             A subscriptionId to be used to unsubscribe.
+        """
+        if policy == QueuePolicy.INLINE and asyncio.iscoroutinefunction(callback):
+            raise CrownstoneBleException(BleError.UNSUPPORTED_QUEUE_POLICY, "The INLINE policy can't be used with an async callback.")
+
+        subscriber = AsyncSubscriber(topic, callback, maxQueueSize, policy, name)
+        subscriptionId = self.subscribe(topic, subscriber.put, **filters)
+        self.asyncSubscribers[subscriptionId] = subscriber
+        return subscriptionId
+
+
+    def unsubscribe(self, subscriptionId: str):
+        subscriber = self.asyncSubscribers.pop(subscriptionId, None)
+        if subscriber is not None:
+            subscriber.stop()
+
+        if subscriptionId in self.indexedSubscriptions:
+            topic, field, value = self.indexedSubscriptions.pop(subscriptionId)
+            subscribers = self.indexedTopics[topic][field][value]
+            subscribers.pop(subscriptionId)
+            if len(subscribers) == 0:
+                del self.indexedTopics[topic][field][value]
+            return
+
+        super().unsubscribe(subscriptionId)
+
+
+    def getAsyncMetrics(self) -> dict:
+        """
+        :returns: Dict with subscription id as key, and a dict with the queue depth and drop metrics of the subscriber as value.
+        """
+        return {subscriptionId: subscriber.getMetrics() for subscriptionId, subscriber in self.asyncSubscribers.items()}
+
+
+    def _getFilteredCallback(self, callback, filters: dict):
+        def filteredCallback(data):
+            for field, value in filters.items():
+                if _getFilterValue(data, field) != value:
+                    return
+            return callback(data)
+        return filteredCallback
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import time
+
+from crownstone_ble.core.container.BatchResult import BatchResult
+
+_LOGGER = logging.getLogger(__name__)
+
+"""
+Class that performs an action on many Crownstones, with a bounded amount of connections at the same time.
+
+For each address, it connects (which also gets the session nonce), performs the action on the connection, and disconnects.
+A failed attempt is retried after retryDelay seconds, until the given amount of attempts is used.
+"""
+class BatchRunner:
+
+    def __init__(self, bluetoothCore, concurrency: int, attempts: int = 3, retryDelay: float = 0.5):
+        self.core        = bluetoothCore
+        self.concurrency = concurrency
+        self.attempts    = attempts
+        self.retryDelay  = retryDelay
+
+
+    async def run(self, addresses, action) -> dict:
+        """
+        :param addresses: The MAC addresses of the Crownstones.
+        :param action:    Async function that gets a CrownstoneConnection and the address, and performs the action.
+        :returns:         Dict with address as key, and BatchResult as value.
+        """
+        # Created here, so it is bound to the running event loop.
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*[self._runForAddress(address, action, semaphore) for address in addresses])
+        return {result.address: result for result in results}
+
+
+    async def _runForAddress(self, address, action, semaphore) -> BatchResult:
+        batchResult = BatchResult(address)
+        async with semaphore:
+            startTime = time.perf_counter()
+            while batchResult.attempts < self.attempts:
+                if batchResult.attempts > 0:
+                    await asyncio.sleep(self.retryDelay)
+                batchResult.attempts += 1
+                try:
+                    batchResult.result = await self._attempt(address, action)
+                    batchResult.success = True
+                    batchResult.error = None
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as err:
+                    _LOGGER.info(f"Attempt {batchResult.attempts} for {address} failed: {err}")
+                    batchResult.error = err
+            batchResult.duration = time.perf_counter() - startTime
+        return batchResult
+
+
+    async def _attempt(self, address, action):
+        connection = await self.core.openConnection(address)
+        try:
+            return await action(connection, address)
+        finally:
+            try:
+                await connection.disconnect()
+            except Exception as err:
+                _LOGGER.info(f"Failed to disconnect from {address}: {err}")
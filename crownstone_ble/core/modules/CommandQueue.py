@@ -0,0 +1,226 @@
+import asyncio
+import collections
+import logging
+import time
+
+from crownstone_core.Exceptions import CrownstoneBleException
+from crownstone_core.packets.ResultPacket import ResultPacket
+from crownstone_core.protocol.BluenetTypes import ProcessType, ControlType
+from crownstone_core.util.Conversion import Conversion
+
+from crownstone_ble.Exceptions import BleError
+from crownstone_ble.core.bluetooth_delegates.NotificationDelegate import NotificationDelegate
+
+_LOGGER = logging.getLogger(__name__)
+
+# Amount of commands without a result of which a late result is recognized.
+MAX_UNANSWERED = 8
+
+
+class PendingCommand:
+
+    def __init__(self, commandType: int, resultHandler, future):
+        self.commandType   = commandType
+        self.resultHandler = resultHandler
+        self.future        = future
+        self.startTime     = None
+
+
+class CommandLatency:
+    """
+    Latency statistics of a single command type, in seconds.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min   = None
+        self.max   = None
+
+    def add(self, latency: float):
+        self.count += 1
+        self.total += latency
+        if self.min is None or latency < self.min:
+            self.min = latency
+        if self.max is None or latency > self.max:
+            self.max = latency
+
+    def getAverage(self):
+        if self.count == 0:
+            return None
+        return self.total / self.count
+
+    def __str__(self):
+        return f"CommandLatency(count={self.count}, average={self.getAverage()}, min={self.min}, max={self.max})"
+
+
+"""
+Class that pipelines control commands over the control characteristic of a single connection.
+
+Each command is written, and then waits for its result notification. Results are matched to the commands in flight by
+the command type of the ResultPacket, in the order in which the commands were written.
+Up to 'maxInFlight' commands can be written before their results came in. Only use more than 1 when the firmware can handle
+multiple commands in flight.
+
+Results that don't belong to a command in flight are put on the result queue of the notification delegate, so
+BleHandler.setupSingleNotification and BleHandler.setupNotificationStream keep working. When a single command waits, such a
+result fails it right away with BleError.UNEXPECTED_RESULT, instead of after its timeout. Unless the result is a late result
+of an earlier command that got no result, like after a timeout.
+"""
+class CommandQueue:
+
+    def __init__(self, notificationDelegate: NotificationDelegate, maxInFlight: int = 1):
+        self.notificationDelegate = notificationDelegate
+        self.notificationDelegate.resultListener = self.handleResult
+        self.maxInFlight = maxInFlight
+
+        # Commands that have been (or are being) written, and wait for their result. In order of writing.
+        self.inFlight = collections.deque()
+        self.inFlightChanged = asyncio.Condition()
+        self.writeLock = asyncio.Lock()
+
+        # Command type as key, CommandLatency as value.
+        self.latencies = {}
+
+        # Command types of the recent commands that finished without a result, of which a late result may still come in.
+        self.unanswered = collections.deque(maxlen=MAX_UNANSWERED)
+
+
+    async def execute(self, controlPacket, writeCommand, resultHandler=None, timeout=12.5) -> ResultPacket:
+        """
+        Write a control command, and wait for its result.
+        :param controlPacket:   Serialized control packet, used to get the command type.
+        :param writeCommand:    Async function that writes the control packet.
+        :param resultHandler:   Optional function that gets each result of this command, and returns a ProcessType.
+                                Without result handler, the first result finishes the command.
+        :param timeout:         Time in seconds to wait for the (final) result.
+        :returns:               The ResultPacket of the (final) result.
+        """
+        commandType = Conversion.uint8_array_to_uint16(controlPacket[1:3])
+        pending = PendingCommand(commandType, resultHandler, asyncio.get_event_loop().create_future())
+
+        async with self.inFlightChanged:
+            await self.inFlightChanged.wait_for(lambda: len(self.inFlight) < self.maxInFlight)
+            self.inFlight.append(pending)
+
+        try:
+            async with self.writeLock:
+                pending.startTime = time.perf_counter()
+                await writeCommand()
+            return await asyncio.wait_for(pending.future, timeout)
+        except asyncio.TimeoutError:
+            if resultHandler is None:
+                raise CrownstoneBleException(BleError.NO_NOTIFICATION_DATA_RECEIVED, "No notification data received.")
+            raise CrownstoneBleException(BleError.NOTIFICATION_STREAM_TIMEOUT, "Notification stream not finished within timeout.")
+        finally:
+            if pending.startTime is not None and not self._hasResult(pending):
+                self.unanswered.append(commandType)
+            async with self.inFlightChanged:
+                self.inFlight.remove(pending)
+                self.inFlightChanged.notify_all()
+
+
+    def handleResult(self, result):
+        """
+        Handle a merged and decrypted result of the result characteristic.
+        """
+        if result is None:
+            # Could not decrypt, so we can't tell which command this belongs to.
+            pending = self._getOnlyPendingCommand()
+            if pending is not None and pending.resultHandler is None:
+                pending.future.set_exception(CrownstoneBleException(BleError.NO_NOTIFICATION_DATA_RECEIVED, "No notification data received."))
+            else:
+                _LOGGER.warning("Ignoring result that could not be decrypted.")
+            return
+
+        resultPacket = ResultPacket(result)
+        pending = self._getPendingCommand(resultPacket)
+        if pending is None:
+            self._handleUnexpectedResult(resultPacket)
+            self.notificationDelegate.resultQueue.put_nowait(result)
+            return
+
+        if pending.resultHandler is None:
+            self._finish(pending, resultPacket)
+            return
+
+        command = pending.resultHandler(result)
+        if command == ProcessType.ABORT_ERROR:
+            _LOGGER.debug("abort")
+            pending.future.set_exception(CrownstoneBleException(BleError.ABORT_NOTIFICATION_STREAM_W_ERROR,
+                                                                "Aborting the notification stream because the resultHandler raised an error."))
+        elif command == ProcessType.FINISHED:
+            _LOGGER.debug("finished")
+            self._finish(pending, resultPacket)
+        elif command == ProcessType.CONTINUE:
+            _LOGGER.debug("continue")
+
+
+    def failAll(self, error: Exception):
+        """
+        Let the commands that have been written, and wait for their result, fail with the given error.
+        """
+        for pending in self.inFlight:
+            if self._isWaiting(pending):
+                pending.future.set_exception(error)
+
+
+    def getLatencies(self) -> dict:
+        """
+        :returns: Dict with command type as key, and CommandLatency as value.
+        """
+        return self.latencies
+
+
+    def _handleUnexpectedResult(self, resultPacket: ResultPacket):
+        if resultPacket.commandTypeUInt16 in self.unanswered:
+            self.unanswered.remove(resultPacket.commandTypeUInt16)
+            _LOGGER.debug(f"Late result of command {resultPacket.commandType}.")
+            return
+
+        pending = self._getOnlyPendingCommand()
+        if pending is None:
+            _LOGGER.warning(f"Result of command {resultPacket.commandTypeUInt16}, while no command of that type waits for a result.")
+            return
+        pending.future.set_exception(CrownstoneBleException(BleError.UNEXPECTED_RESULT,
+                                                            f"Expected a result of command {pending.commandType}, got a result of command {resultPacket.commandTypeUInt16}."))
+
+
+    def _getPendingCommand(self, resultPacket: ResultPacket) -> PendingCommand or None:
+        for pending in self.inFlight:
+            if self._isWaiting(pending) and pending.commandType == resultPacket.commandTypeUInt16:
+                return pending
+
+        if not resultPacket.valid:
+            # Let the command that waits for it deal with the invalid result.
+            return self._getOnlyPendingCommand()
+        return None
+
+
+    def _getOnlyPendingCommand(self) -> PendingCommand or None:
+        waiting = [pending for pending in self.inFlight if self._isWaiting(pending)]
+        if len(waiting) == 1:
+            return waiting[0]
+        return None
+
+
+    def _hasResult(self, pending: PendingCommand) -> bool:
+        return pending.future.done() and not pending.future.cancelled() and pending.future.exception() is None
+
+
+    def _isWaiting(self, pending: PendingCommand) -> bool:
+        # Only commands that have been written can get a result.
+        return pending.startTime is not None and not pending.future.done()
+
+
+    def _finish(self, pending: PendingCommand, resultPacket: ResultPacket):
+        latency = time.perf_counter() - pending.startTime
+        commandType = pending.commandType
+        if ControlType.has_value(commandType):
+            commandType = ControlType(commandType)
+        if commandType not in self.latencies:
+            self.latencies[commandType] = CommandLatency()
+        self.latencies[commandType].add(latency)
+        _LOGGER.debug(f"Command {commandType} finished in {latency * 1000:.1f} ms")
+
+        pending.future.set_result(resultPacket)
@@ -0,0 +1,224 @@
+import bisect
+import collections
+import logging
+import random
+import time
+
+from crownstone_core.Exceptions import CrownstoneBleException
+
+from crownstone_ble.Exceptions import BleError
+from crownstone_ble.core.modules.DeviceRegistry import DeviceRegistry
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CONNECT_TIMEOUT  = 5.0
+DEFAULT_CONNECT_ATTEMPTS = 3
+# A device that is not advertised during this time, while scanning, is considered absent.
+DEFAULT_PRESENCE_WINDOW  = 10.0
+# Amount of failed connects in a row after which connects to the device fail right away.
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_OPEN_TIME         = 30.0
+DEFAULT_MAX_OPEN_TIME     = 300.0
+DEFAULT_BACKOFF_BASE      = 0.2
+DEFAULT_BACKOFF_MAX       = 2.0
+
+# The timeout is this many times the slowest recent connect attempt, but no shorter than the minimum timeout.
+TIMEOUT_MARGIN              = 3.0
+DEFAULT_MIN_CONNECT_TIMEOUT = 1.0
+# Amount of successful attempts that is needed before the timeout adapts.
+MIN_LATENCY_SAMPLES = 3
+LATENCY_SAMPLES     = 20
+# Devices with a weaker RSSI get the full timeout, and an extra attempt.
+WEAK_RSSI = -85
+
+# Upper bounds in seconds of the buckets of the connect latency histograms.
+HISTOGRAM_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, float("inf")]
+
+
+class AddressConnectStats:
+    """
+    Connect history of a single address.
+    """
+    __slots__ = ("latencies", "histogram", "successes", "failures", "consecutiveFailures", "openUntil", "openTime", "rejected")
+
+    def __init__(self):
+        # Durations of the recent successful attempts.
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        # Counts of the durations of successful connects, including failed attempts and backoff, per bucket of HISTOGRAM_BUCKETS.
+        self.histogram = [0] * len(HISTOGRAM_BUCKETS)
+        self.successes = 0
+        self.failures = 0
+        self.consecutiveFailures = 0
+        # Circuit breaker: time.monotonic() until which connects fail right away, or None when closed.
+        self.openUntil = None
+        self.openTime = 0.0
+        self.rejected = 0
+
+
+"""
+Decides how to connect to a device, based on what is known about it.
+
+- A device that has not been advertised during the presence window, while the scanner has been running for at least that
+  long, is absent: the connect fails right away with BleError.DEVICE_NOT_IN_RANGE.
+- The timeout of an attempt adapts to the latency of recent successful attempts to the device, between minTimeout and
+  timeout. Devices with a weak RSSI get the full timeout and an extra attempt.
+- Attempts are spaced with an exponential backoff with full jitter.
+- After failureThreshold failed connects in a row, the circuit of the device opens: connects fail right away with
+  BleError.CONNECTION_CIRCUIT_OPEN, for openTime seconds. After that, a single attempt is made. When it fails, the circuit
+  opens again for twice as long, up to maxOpenTime. A successful connect, or a new advertisement of the device, closes the circuit.
+
+Latency histograms of successful connects are kept per address and in total.
+"""
+class ConnectStrategy:
+
+    def __init__(self, registry: DeviceRegistry,
+                 timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 minTimeout: float = DEFAULT_MIN_CONNECT_TIMEOUT,
+                 attempts: int = DEFAULT_CONNECT_ATTEMPTS,
+                 presenceWindow: float = DEFAULT_PRESENCE_WINDOW,
+                 failureThreshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 openTime: float = DEFAULT_OPEN_TIME,
+                 maxOpenTime: float = DEFAULT_MAX_OPEN_TIME,
+                 backoffBase: float = DEFAULT_BACKOFF_BASE,
+                 backoffMax: float = DEFAULT_BACKOFF_MAX):
+        self.registry         = registry
+        self.timeout          = timeout
+        self.minTimeout       = minTimeout
+        self.attempts         = attempts
+        self.presenceWindow   = presenceWindow
+        self.failureThreshold = failureThreshold
+        self.openTime         = openTime
+        self.maxOpenTime      = maxOpenTime
+        self.backoffBase      = backoffBase
+        self.backoffMax       = backoffMax
+
+        # Lower case address as key, AddressConnectStats as value.
+        self.stats = {}
+        self.histogram = [0] * len(HISTOGRAM_BUCKETS)
+
+
+    def checkConnect(self, address, scanningSince: float or None):
+        """
+        Raise when connecting to the device is known to fail.
+        :param scanningSince:  time.monotonic() since when the scanner runs, or None when it's not running.
+        """
+        stats = self._getStats(address)
+        now = time.monotonic()
+        device = self.registry.getDevice(address)
+
+        if stats.openUntil is not None:
+            if device is not None and device.lastSeen is not None and device.lastSeen > stats.openUntil - stats.openTime:
+                _LOGGER.debug(f"{address} advertised after the circuit opened, closing it.")
+                stats.openUntil = None
+                stats.consecutiveFailures = 0
+            elif now < stats.openUntil:
+                stats.rejected += 1
+                raise CrownstoneBleException(BleError.CONNECTION_CIRCUIT_OPEN,
+                                             f"Connecting to {address} failed {stats.consecutiveFailures} times in a row, "
+                                             f"not trying again for {stats.openUntil - now:.1f} seconds.")
+
+        if scanningSince is not None and now - scanningSince >= self.presenceWindow:
+            if device is None or device.lastSeen is None or now - device.lastSeen > self.presenceWindow:
+                stats.rejected += 1
+                raise CrownstoneBleException(BleError.DEVICE_NOT_IN_RANGE,
+                                             f"{address} has not been advertised in the last {self.presenceWindow} seconds of scanning.")
+
+
+    def getTimeout(self, address) -> float:
+        stats = self._getStats(address)
+        if self._isWeak(address) or len(stats.latencies) < MIN_LATENCY_SAMPLES:
+            return self.timeout
+        return min(self.timeout, max(self.minTimeout, TIMEOUT_MARGIN * max(stats.latencies)))
+
+
+    def getAttempts(self, address) -> int:
+        stats = self._getStats(address)
+        if stats.openUntil is not None:
+            # The circuit is half open: probe with a single attempt.
+            return 1
+        if self._isWeak(address):
+            return self.attempts + 1
+        return self.attempts
+
+
+    def getBackoff(self, attempt: int) -> float:
+        """
+        :param attempt:  Number of the attempt that failed, starting at 1.
+        :returns:        Time in seconds to wait before the next attempt.
+        """
+        return random.uniform(0, min(self.backoffMax, self.backoffBase * 2 ** (attempt - 1)))
+
+
+    def recordSuccess(self, address, attemptDuration: float, totalDuration: float):
+        """
+        :param attemptDuration:  Duration of the successful attempt.
+        :param totalDuration:    Duration of the connect, including failed attempts and backoff.
+        """
+        stats = self._getStats(address)
+        stats.latencies.append(attemptDuration)
+        stats.successes += 1
+        stats.consecutiveFailures = 0
+        stats.openUntil = None
+        stats.openTime = 0.0
+        bucket = bisect.bisect_left(HISTOGRAM_BUCKETS, totalDuration)
+        stats.histogram[bucket] += 1
+        self.histogram[bucket] += 1
+
+
+    def recordFailure(self, address):
+        stats = self._getStats(address)
+        stats.failures += 1
+        stats.consecutiveFailures += 1
+        if stats.openUntil is not None or stats.consecutiveFailures >= self.failureThreshold:
+            stats.openTime = min(self.maxOpenTime, self.openTime if stats.openTime == 0 else 2 * stats.openTime)
+            stats.openUntil = time.monotonic() + stats.openTime
+            _LOGGER.info(f"Connecting to {address} failed {stats.consecutiveFailures} times in a row, failing connects for {stats.openTime} seconds.")
+
+
+    def reset(self, address=None):
+        """
+        Forget the connect history of a device, or of all devices when address is None. This also closes their circuits.
+        """
+        if address is None:
+            self.stats = {}
+            self.histogram = [0] * len(HISTOGRAM_BUCKETS)
+        else:
+            self.stats.pop(address.lower(), None)
+
+
+    def getHistogram(self, address=None) -> dict:
+        """
+        :returns: Dict with the upper bound in seconds of each bucket as key, and the amount of successful connects as value.
+        """
+        if address is None:
+            histogram = self.histogram
+        else:
+            histogram = self._getStats(address).histogram
+        return dict(zip(HISTOGRAM_BUCKETS, histogram))
+
+
+    def getStatistics(self, address) -> dict:
+        stats = self._getStats(address)
+        return {
+            "successes":           stats.successes,
+            "failures":            stats.failures,
+            "consecutiveFailures": stats.consecutiveFailures,
+            "rejected":            stats.rejected,
+            "circuitOpen":         stats.openUntil is not None and time.monotonic() < stats.openUntil,
+            "timeout":             self.getTimeout(address),
+            "attempts":            self.getAttempts(address),
+        }
+
+
+    def _getStats(self, address) -> AddressConnectStats:
+        address = address.lower()
+        stats = self.stats.get(address, None)
+        if stats is None:
+            stats = AddressConnectStats()
+            self.stats[address] = stats
+        return stats
+
+
+    def _isWeak(self, address) -> bool:
+        device = self.registry.getDevice(address)
+        return device is not None and device.rssi is not None and device.rssi < WEAK_RSSI
@@ -0,0 +1,139 @@
+import time
+
+from crownstone_core.Enums import CrownstoneOperationMode
+
+from crownstone_ble.core.container.RegisteredDevice import RegisteredDevice
+from crownstone_ble.core.container.ScanData import ScanData
+
+# Weight of a new RSSI measurement in the smoothed RSSI.
+RSSI_SMOOTHING_FACTOR = 0.1
+
+"""
+Class that keeps what is known about each Crownstone that is in range, updated by the Validator on each scan.
+
+Devices are removed when the Validator stops tracking them, which happens when they haven't been seen for a while.
+Lookups by address, crownstone id, operation mode and validated state don't have to iterate over all devices.
+"""
+class DeviceRegistry:
+
+    def __init__(self):
+        # Lower case address as key, RegisteredDevice as value.
+        self.devices = {}
+
+        # Indexes, with sets of addresses as value.
+        self.addressesByCrownstoneId = {}
+        self.addressesByMode = {}
+        self.validatedAddresses = set()
+
+
+    def update(self, scanData: ScanData, crownstoneId: int or None):
+        """
+        :param scanData:      Scan of the device.
+        :param crownstoneId:  The validated crownstone id of the device, or None.
+        """
+        address = scanData.address
+        device = self.devices.get(address, None)
+        if device is None:
+            device = RegisteredDevice(address)
+            self.devices[address] = device
+
+        if device.operationMode != scanData.operationMode:
+            self._removeFromIndex(self.addressesByMode, device.operationMode, address)
+            self._addToIndex(self.addressesByMode, scanData.operationMode, address)
+        if device.crownstoneId != crownstoneId:
+            self._removeFromIndex(self.addressesByCrownstoneId, device.crownstoneId, address)
+            self._addToIndex(self.addressesByCrownstoneId, crownstoneId, address)
+        if scanData.validated:
+            self.validatedAddresses.add(address)
+        else:
+            self.validatedAddresses.discard(address)
+
+        # Only use valid RSSI measurements.
+        if 0 > scanData.rssi > -100:
+            if device.rssi is None:
+                device.rssi = scanData.rssi
+            else:
+                device.rssi = (1 - RSSI_SMOOTHING_FACTOR) * device.rssi + RSSI_SMOOTHING_FACTOR * scanData.rssi
+
+        device.scanData      = scanData
+        device.operationMode = scanData.operationMode
+        device.validated     = scanData.validated
+        device.crownstoneId  = crownstoneId
+        device.lastSeen      = time.monotonic()
+
+
+    def remove(self, address):
+        device = self.devices.pop(address.lower(), None)
+        if device is None:
+            return
+        self._removeFromIndex(self.addressesByMode, device.operationMode, device.address)
+        self._removeFromIndex(self.addressesByCrownstoneId, device.crownstoneId, device.address)
+        self.validatedAddresses.discard(device.address)
+
+
+    def getDevice(self, address) -> RegisteredDevice or None:
+        return self.devices.get(address.lower(), None)
+
+
+    def getDevices(self) -> list:
+        return list(self.devices.values())
+
+
+    def getByCrownstoneId(self, crownstoneId: int) -> list:
+        """
+        :returns: List of validated devices with the given crownstone id. Multiple spheres can use the same id.
+        """
+        return [self.devices[address] for address in self.addressesByCrownstoneId.get(crownstoneId, ())]
+
+
+    def getByMode(self, operationMode: CrownstoneOperationMode) -> list:
+        return [self.devices[address] for address in self.addressesByMode.get(operationMode, ())]
+
+
+    def getValidated(self) -> list:
+        return [self.devices[address] for address in self.validatedAddresses]
+
+
+    def getNearest(self, setupModeOnly=False, rssiAtLeast=-100, validated=False, addressesToExcludeSet=None) -> RegisteredDevice or None:
+        """
+        Get the device with the highest smoothed RSSI, with the same filters as the NearestSelector.
+        :param setupModeOnly:  When True, only devices in setup mode, else only devices that are not in setup mode.
+        :param validated:      When True, only validated devices.
+        """
+        if setupModeOnly:
+            addresses = self.addressesByMode.get(CrownstoneOperationMode.SETUP, set())
+        elif validated:
+            addresses = self.validatedAddresses
+        else:
+            addresses = self.devices.keys()
+
+        nearest = None
+        for address in addresses:
+            device = self.devices[address]
+            if addressesToExcludeSet is not None and address in addressesToExcludeSet:
+                continue
+            if not setupModeOnly and device.operationMode == CrownstoneOperationMode.SETUP:
+                continue
+            if validated and not device.validated:
+                continue
+            if device.rssi is None or device.rssi < rssiAtLeast:
+                continue
+            if nearest is None or device.rssi > nearest.rssi:
+                nearest = device
+        return nearest
+
+
+    def _addToIndex(self, index, key, address):
+        if key is None:
+            return
+        if key not in index:
+            index[key] = set()
+        index[key].add(address)
+
+
+    def _removeFromIndex(self, index, key, address):
+        if key is None or key not in index:
+            return
+        index[key].discard(address)
+        if len(index[key]) == 0:
+            del index[key]
@@ -6,6 +6,8 @@ class Gatherer:
     
     def __init__(self):
         self.deviceList = {}
+        # Gathers during the whole scan, so it is never finished early.
+        self.finished = False
         
     def handleAdvertisement(self, scanData: ScanData):
         rssi = float(scanData.rssi)
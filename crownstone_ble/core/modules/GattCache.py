@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+
+_LOGGER = logging.getLogger(__name__)
+
+"""
+Cache of the discovered GATT tables (service and characteristic handles) of devices, so a repeated connection doesn't
+have to discover the services again.
+
+Entries are keyed on the address and the operation mode, since a Crownstone has other services in setup and DFU mode.
+The firmware and bootloader version of a device are remembered once they are read. When a different version is read,
+the entries of that device are removed, since a firmware update can change the handles.
+An entry has to be invalidated when a handle lookup with a cached table fails.
+
+When a path is given, the cache is loaded from, and stored in, that JSON file, so it survives a restart.
+"""
+class GattCache:
+
+    def __init__(self, path: str = None):
+        self.path = path
+
+        # "address|operationMode" as key, dict with the services and characteristics as value.
+        self.entries = {}
+        # Lower case address as key, dict with firmwareVersion and bootloaderVersion as value.
+        self.versions = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._load()
+
+
+    def get(self, address, operationMode=None) -> (dict, dict) or None:
+        """
+        :returns: Tuple of the services dict (UUID as key, handle as value) and characteristics dict (UUID as key, handle as value),
+                  or None when the table of this device in this mode is not cached.
+        """
+        entry = self.entries.get(self._getKey(address, operationMode), None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(entry["services"]), dict(entry["characteristics"])
+
+
+    def put(self, address, operationMode, services: dict, characteristics: dict):
+        self.entries[self._getKey(address, operationMode)] = {"services": dict(services), "characteristics": dict(characteristics)}
+        self._store()
+
+
+    def setVersion(self, address, firmwareVersion: str = None, bootloaderVersion: str = None):
+        """
+        Remember the version of a device. When it differs from the version that was remembered before, the device got
+        updated, and its entries are removed.
+        """
+        address = address.lower()
+        versions = self.versions.setdefault(address, {"firmwareVersion": None, "bootloaderVersion": None})
+        changed = False
+        for name, version in [("firmwareVersion", firmwareVersion), ("bootloaderVersion", bootloaderVersion)]:
+            if version is None or versions[name] == version:
+                continue
+            if versions[name] is not None:
+                _LOGGER.info(f"{name} of {address} changed from {versions[name]} to {version}")
+                changed = True
+            versions[name] = version
+        if changed:
+            self.invalidate(address)
+        else:
+            self._store()
+
+
+    def getVersion(self, address) -> dict or None:
+        return self.versions.get(address.lower(), None)
+
+
+    def invalidate(self, address=None):
+        """
+        Remove the entries of a device, or all entries when address is None.
+        """
+        if address is None:
+            self.entries = {}
+        else:
+            prefix = address.lower() + "|"
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+        self.invalidations += 1
+        self._store()
+
+
+    def getStatistics(self) -> dict:
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
+
+
+    def _getKey(self, address, operationMode):
+        modeName = None if operationMode is None else operationMode.name
+        return f"{address.lower()}|{modeName}"
+
+
+    def _load(self):
+        if self.path is None or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r") as file:
+                data = json.load(file)
+            self.entries  = data["entries"]
+            self.versions = data["versions"]
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            # It's only a cache, start with an empty one.
+            _LOGGER.warning(f"Failed to load the GATT cache from {self.path}: {err}")
+            self.entries = {}
+            self.versions = {}
+
+
+    def _store(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "w") as file:
+                json.dump({"entries": self.entries, "versions": self.versions}, file)
+        except OSError as err:
+            _LOGGER.warning(f"Failed to store the GATT cache in {self.path}: {err}")
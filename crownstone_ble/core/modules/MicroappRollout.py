@@ -0,0 +1,115 @@
+import logging
+
+from crownstone_ble.core.modules.BatchRunner import BatchRunner
+from crownstone_ble.core.modules.MicroappUploader import MicroappBinary, MicroappUploader
+
+_LOGGER = logging.getLogger(__name__)
+
+"""
+Rolls a microapp out to many Crownstones, with a bounded amount of connections at the same time, via the BatchRunner.
+
+The binary is a single MicroappBinary, so the chunk packets are made once and shared by all uploads. Each Crownstone gets
+its own MicroappUploader, which is kept between attempts and runs, so a next attempt resumes from the last acknowledged
+offset. After the upload, the app is validated and enabled, unless enable is False, or the upload was skipped because
+the Crownstone already had the binary.
+
+run only handles the Crownstones that did not succeed in an earlier run of this rollout, and retryFailed runs the failed
+ones again. results has a BatchResult per Crownstone, of which the result is the MicroappUploadResult of the last upload.
+"""
+class MicroappRollout:
+
+    def __init__(self, bluetoothCore, data, index: int = 0, concurrency: int = 4, attempts: int = 3, retryDelay: float = 0.5,
+                 enable: bool = True, progressCallback=None):
+        """
+        :param data:              The binary, or a MicroappBinary, in which case index is taken from the MicroappBinary.
+        :param progressCallback:  Optional function that gets the address, the acknowledged offset and the size of the binary, after each chunk.
+        """
+        if not isinstance(data, MicroappBinary):
+            data = MicroappBinary(data, index)
+        self.core             = bluetoothCore
+        self.binary           = data
+        self.concurrency      = concurrency
+        self.attempts         = attempts
+        self.retryDelay       = retryDelay
+        self.enable           = enable
+        self.progressCallback = progressCallback
+
+        # Lower case address as key, MicroappUploader as value.
+        self.uploaders = {}
+        # Address as key, BatchResult as value.
+        self.results = {}
+        # Address as key, acknowledged offset as value.
+        self.progress = {}
+
+
+    async def run(self, addresses) -> dict:
+        """
+        :param addresses: The MAC addresses of the Crownstones. Crownstones that succeeded in an earlier run are skipped.
+        :returns:         Dict with address as key, and BatchResult as value, of all Crownstones of this rollout.
+        """
+        addresses = [address for address in addresses if not self._succeeded(address)]
+        for address in addresses:
+            self.progress.setdefault(address, 0)
+        runner = BatchRunner(self.core, self.concurrency, self.attempts, self.retryDelay)
+        self.results.update(await runner.run(addresses, self._upload))
+        failed = self.getFailed()
+        if len(failed) > 0:
+            _LOGGER.warning(f"Microapp rollout failed for {len(failed)} of {len(self.results)} Crownstones: {failed}")
+        return self.results
+
+
+    async def retryFailed(self) -> dict:
+        """
+        Run the rollout again for the Crownstones that failed.
+        :returns: Dict with address as key, and BatchResult as value, of all Crownstones of this rollout.
+        """
+        return await self.run(self.getFailed())
+
+
+    def getFailed(self) -> list:
+        """
+        :returns: The addresses of the Crownstones of which the last run failed.
+        """
+        return [address for address, result in self.results.items() if not result.success]
+
+
+    def getProgress(self) -> dict:
+        """
+        :returns: Dict with address as key, and the fraction of the binary that has been acknowledged as value.
+                  A Crownstone that already had the binary counts as done.
+        """
+        progress = {}
+        for address, offset in self.progress.items():
+            if self._succeeded(address):
+                progress[address] = 1.0
+            else:
+                progress[address] = offset / len(self.binary.data)
+        return progress
+
+
+    async def _upload(self, connection, address):
+        uploader = self.uploaders.get(address.lower(), None)
+        if uploader is None:
+            uploader = MicroappUploader(connection, self.binary, address=address, progressCallback=self._handleProgress)
+            self.uploaders[address.lower()] = uploader
+        else:
+            # Resume via the new connection.
+            uploader.core = connection
+
+        result = await uploader.upload()
+        # A Crownstone that already had the binary was validated before, so it's left as is.
+        if self.enable and not result.skipped:
+            await connection._dev.validateMicroapp(self.binary.index)
+            await connection._dev.enableMicroapp(self.binary.index)
+        return result
+
+
+    def _handleProgress(self, address, offset, size):
+        self.progress[address] = offset
+        if self.progressCallback is not None:
+            self.progressCallback(address, offset, size)
+
+
+    def _succeeded(self, address) -> bool:
+        result = self.results.get(address, None)
+        return result is not None and result.success
@@ -0,0 +1,309 @@
+import asyncio
+import logging
+import math
+import time
+
+from crownstone_core.Exceptions import CrownstoneException, CrownstoneError
+from crownstone_core.packets.microapp.MicroappHeaderPacket import MicroappHeaderPacket
+from crownstone_core.packets.microapp.MicroappUploadPacket import MicroappUploadPacket
+from crownstone_core.protocol.BlePackets import ControlPacket
+from crownstone_core.protocol.BluenetTypes import ControlType
+from crownstone_core.util.Conversion import Conversion
+
+from crownstone_ble.core.ble_modules.BleHandler import ActiveClient
+from crownstone_ble.core.container.MicroappUploadResult import MicroappUploadResult
+
+_LOGGER = logging.getLogger(__name__)
+
+# Chunks, and so the binary, must be a multiple of 4 bytes. The binary is padded with 0xFF.
+CHUNK_ALIGNMENT = 4
+PADDING_BYTE = 0xFF
+MIN_CHUNK_SIZE = 32
+
+# Size of an encrypted control write: encryption header (session nonce and key level), then a multiple of 16 bytes with
+# the validation, the control packet header (protocol, type and size) and the upload header (app header and offset).
+ENCRYPTION_HEADER_SIZE = 4
+ENCRYPTION_BLOCK_SIZE = 16
+VALIDATION_SIZE = 4
+CONTROL_HEADER_SIZE = 5
+UPLOAD_HEADER_SIZE = 4
+
+# A write can't be larger than the maximum length of an attribute value.
+MAX_ATTRIBUTE_SIZE = 512
+# ATT header of a write request, and of a prepare write request, which is used for writes that don't fit in the MTU.
+WRITE_HEADER_SIZE = 3
+PREPARE_WRITE_HEADER_SIZE = 5
+
+# Header at the start of a microapp binary: SDK version (major, minor), size, checksum of the binary after the header,
+# checksum of the header, build version, start offset, and 2 reserved fields. The Crownstone reports both checksums.
+MICROAPP_BINARY_HEADER_SIZE = 24
+MICROAPP_BINARY_HEADER_CHECKSUM_OFFSET = 4
+MICROAPP_BINARY_HEADER_CHECKSUM_HEADER_OFFSET = 6
+# State of the checksum test of an app, once the Crownstone validated it.
+MICROAPP_TEST_STATE_PASSED = 3
+
+DEFAULT_CHUNK_TIMEOUT = 5.0
+DEFAULT_RESUME_ATTEMPTS = 3
+
+
+def padBinary(data) -> bytes:
+    """
+    :returns: The binary, padded with 0xFF so that its size is a multiple of 4.
+    """
+    padding = -len(data) % CHUNK_ALIGNMENT
+    return bytes(data) + bytes([PADDING_BYTE] * padding)
+
+
+def getMicroappChecksums(data) -> (int, int):
+    """
+    :returns: Tuple of the checksum and the header checksum in the header of the binary, which the Crownstone reports as
+              checksum and checksumHeader in the status of an app.
+    """
+    if len(data) < MICROAPP_BINARY_HEADER_SIZE:
+        raise CrownstoneException(CrownstoneError.INVALID_SIZE, f"The binary of {len(data)} bytes is smaller than the microapp header.")
+    checksum = Conversion.uint8_array_to_uint16(data[MICROAPP_BINARY_HEADER_CHECKSUM_OFFSET : MICROAPP_BINARY_HEADER_CHECKSUM_OFFSET + 2])
+    checksumHeader = Conversion.uint8_array_to_uint16(data[MICROAPP_BINARY_HEADER_CHECKSUM_HEADER_OFFSET : MICROAPP_BINARY_HEADER_CHECKSUM_HEADER_OFFSET + 2])
+    return checksum, checksumHeader
+
+
+def getChunkWriteSize(chunkSize: int) -> int:
+    """
+    :returns: Size of the encrypted control write of a chunk.
+    """
+    plainSize = VALIDATION_SIZE + CONTROL_HEADER_SIZE + UPLOAD_HEADER_SIZE + chunkSize
+    return ENCRYPTION_HEADER_SIZE + ENCRYPTION_BLOCK_SIZE * math.ceil(plainSize / ENCRYPTION_BLOCK_SIZE)
+
+
+def getWriteRoundTrips(writeSize: int, mtu: int) -> int:
+    """
+    :returns: Amount of round trips of a write with response: one when it fits in the MTU, else a prepare write per
+              part, and an execute write.
+    """
+    if writeSize <= mtu - WRITE_HEADER_SIZE:
+        return 1
+    return math.ceil(writeSize / (mtu - PREPARE_WRITE_HEADER_SIZE)) + 1
+
+
+def getBestChunkSize(maxChunkSize: int, mtu: int = None) -> int:
+    """
+    Get the chunk size that uploads the fastest.
+    :param maxChunkSize:  Largest chunk size the Crownstone accepts.
+    :param mtu:           Negotiated ATT MTU, or None when unknown.
+    :returns:             When the MTU is unknown: the largest chunk size of which the write fits in an attribute value.
+                          Else: the chunk size with the most bytes per round trip, where each chunk takes the round trips
+                          of its write, and one for its result.
+    """
+    sizes = [size for size in range(CHUNK_ALIGNMENT, maxChunkSize + 1, CHUNK_ALIGNMENT) if getChunkWriteSize(size) <= MAX_ATTRIBUTE_SIZE]
+    if len(sizes) == 0:
+        raise CrownstoneException(CrownstoneError.INVALID_SIZE, f"No chunk size fits in a maximum chunk size of {maxChunkSize}.")
+    if mtu is None:
+        return sizes[-1]
+    return max(sizes, key=lambda size: (size / (getWriteRoundTrips(getChunkWriteSize(size), mtu) + 1), size))
+
+
+def getChunkPacket(index: int, offset: int, chunk) -> list:
+    """
+    :returns: The serialized MICROAPP_UPLOAD control packet of a chunk.
+    """
+    packet = MicroappUploadPacket(MicroappHeaderPacket(appIndex=index), offset, chunk)
+    return ControlPacket(ControlType.MICROAPP_UPLOAD).loadByteArray(packet.serialize()).serialize()
+
+
+class MicroappBinary:
+    """
+    A microapp binary for an app index, padded, with the checksums of its header, and the MICROAPP_UPLOAD control packets of its chunks.
+    The packets are made once per chunk size and offset, so uploads of the same binary to many Crownstones share them.
+    They are made on first use, since the chunk size depends on the Crownstone and the MTU, which are only known once connected.
+    """
+
+    def __init__(self, data, index: int = 0):
+        self.data     = padBinary(data)
+        self.index    = index
+        self.checksum, self.checksumHeader = getMicroappChecksums(self.data)
+
+        # Tuple of chunk size and offset as key, serialized control packet as value.
+        self.packets = {}
+
+
+    def getChunkPacket(self, offset: int, chunkSize: int) -> list:
+        """
+        :returns: The serialized control packet of the chunk at the offset. The last chunk can be smaller than chunkSize.
+        """
+        key = (chunkSize, offset)
+        packet = self.packets.get(key, None)
+        if packet is None:
+            packet = getChunkPacket(self.index, offset, self.data[offset : offset + chunkSize])
+            self.packets[key] = packet
+        return packet
+
+
+"""
+Uploads a microapp binary to a Crownstone, via the connection of bluetoothCore, which is CrownstoneBle or a
+CrownstoneConnection, and must be connected.
+
+- The upload is skipped when the Crownstone reports a validated app at the index with the same checksum and header
+  checksum as the header of the binary. Otherwise, an app at the index is removed first. Since the header is in the
+  first chunk, an app that was not validated might be incomplete, so it's uploaded again.
+- The chunk size is picked by getBestChunkSize, from the maximum chunk size of the Crownstone and the negotiated MTU.
+  When a chunk fails while still connected, the chunk size is halved, down to MIN_CHUNK_SIZE, and the chunk is written again.
+- When the connection is lost, it reconnects, and resumes from the last acknowledged offset, up to resumeAttempts times
+  in a row without progress. When the connection is lost twice in a row while writing the chunk at the same offset, the
+  chunk might be what drops the link, so the chunk size is halved as well. acknowledgedOffset is kept, so calling upload again after a failure resumes as well. To resume
+  via a new connection, set core to that connection first.
+"""
+class MicroappUploader:
+
+    def __init__(self, bluetoothCore, data, index: int = 0, address: str = None, maxChunkSize: int = None, checksum: int = None,
+                 chunkTimeout: float = DEFAULT_CHUNK_TIMEOUT, resumeAttempts: int = DEFAULT_RESUME_ATTEMPTS, progressCallback=None):
+        """
+        :param data:              The binary, or a MicroappBinary, in which case index is taken from the MicroappBinary.
+        :param address:           Address of the Crownstone, defaults to the address of the current connection.
+        :param maxChunkSize:      Upper limit of the chunk size, on top of the limit of the Crownstone.
+        :param checksum:          Only compare this with the checksum the Crownstone reports, instead of the checksums in the header of the binary.
+        :param chunkTimeout:      Time in seconds to wait for the result of a chunk.
+        :param resumeAttempts:    Amount of reconnects without an acknowledged chunk in between, before giving up.
+        :param progressCallback:  Optional function that gets the address, the acknowledged offset and the size of the binary, after each chunk.
+        """
+        if not isinstance(data, MicroappBinary):
+            data = MicroappBinary(data, index)
+        self.core             = bluetoothCore
+        self.address          = address if address is not None else self._getClient().address
+        self.binary           = data
+        self.data             = data.data
+        self.index            = data.index
+        self.maxChunkSize     = maxChunkSize
+        self.checksum         = checksum
+        self.chunkTimeout     = chunkTimeout
+        self.resumeAttempts   = resumeAttempts
+        self.progressCallback = progressCallback
+
+        self.chunkSize = None
+        # Offset up to which the Crownstone acknowledged the binary.
+        self.acknowledgedOffset = 0
+
+
+    async def upload(self, force: bool = False) -> MicroappUploadResult:
+        """
+        :param force:  When True, the binary is uploaded, even when the Crownstone already has it.
+        :returns:      The result, with the statistics of the upload.
+        """
+        result = MicroappUploadResult(self.address, self.index, len(self.data))
+        startTime = time.perf_counter()
+
+        if self.acknowledgedOffset == 0:
+            info = await self.core._dev.getMicroappInfo()
+            if self.index >= info.maxApps:
+                raise CrownstoneException(CrownstoneError.INVALID_INPUT, f"The Crownstone has no app index {self.index}, it has {info.maxApps} apps.")
+            if len(self.data) > info.maxAppSize:
+                raise CrownstoneException(CrownstoneError.INVALID_SIZE, f"The binary of {len(self.data)} bytes is larger than the maximum of {info.maxAppSize} bytes.")
+
+            status = info.appsStatus[self.index]
+            if status.tests.hasData:
+                if self._isInstalled(status) and not force:
+                    _LOGGER.info(f"{self.address} already has this microapp at index {self.index}, skipping the upload.")
+                    result.skipped = True
+                    result.duration = time.perf_counter() - startTime
+                    return result
+                await self.core._dev.removeMicroapp(self.index)
+
+            maxChunkSize = info.maxChunkSize
+            if self.maxChunkSize is not None:
+                maxChunkSize = min(maxChunkSize, self.maxChunkSize)
+            self.chunkSize = getBestChunkSize(maxChunkSize, self._getMtu())
+        elif not await self._isConnected():
+            await self._resume(result)
+
+        failedResumes = 0
+        # Offset of the chunk that was being written when the connection was lost the last time.
+        lostAtOffset = None
+        while self.acknowledgedOffset < len(self.data):
+            try:
+                await self._uploadChunk(result)
+                failedResumes = 0
+                lostAtOffset = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                if await self._isConnected():
+                    if self.chunkSize <= MIN_CHUNK_SIZE:
+                        raise
+                    self._reduceChunkSize(result)
+                    _LOGGER.info(f"Chunk at offset {self.acknowledgedOffset} failed: {err}, continuing with chunk size {self.chunkSize}.")
+                    continue
+
+                if lostAtOffset == self.acknowledgedOffset and self.chunkSize > MIN_CHUNK_SIZE:
+                    # The connection was lost at this chunk before: the chunk itself might drop the link.
+                    self._reduceChunkSize(result)
+                    _LOGGER.info(f"Connection lost again at offset {self.acknowledgedOffset}, continuing with chunk size {self.chunkSize}.")
+                    failedResumes = 0
+                lostAtOffset = self.acknowledgedOffset
+
+                while True:
+                    failedResumes += 1
+                    if failedResumes > self.resumeAttempts:
+                        raise err
+                    try:
+                        await self._resume(result)
+                        break
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as resumeErr:
+                        _LOGGER.info(f"Failed to reconnect to {self.address}: {resumeErr}")
+
+        result.chunkSize = self.chunkSize
+        result.duration = time.perf_counter() - startTime
+        if result.bytesUploaded > 0:
+            result.bytesPerSecond = result.bytesUploaded / result.duration
+        return result
+
+
+    def _isInstalled(self, status) -> bool:
+        """
+        :returns: True when the status of the app on the Crownstone matches this binary.
+        """
+        if status.tests.checksum != MICROAPP_TEST_STATE_PASSED:
+            return False
+        if self.checksum is not None:
+            return status.checksum == self.checksum
+        return status.checksum == self.binary.checksum and status.checksumHeader == self.binary.checksumHeader
+
+
+    def _reduceChunkSize(self, result: MicroappUploadResult):
+        self.chunkSize = getBestChunkSize(max(MIN_CHUNK_SIZE, self.chunkSize // 2), self._getMtu())
+        result.chunkSizeReductions += 1
+
+
+    async def _uploadChunk(self, result: MicroappUploadResult):
+        offset = self.acknowledgedOffset
+        size = min(self.chunkSize, len(self.data) - offset)
+        _LOGGER.debug(f"Upload microapp chunk index={self.index} offset={offset} size={size}")
+        await self.core.control._writeControlAndWaitForSuccess(self.binary.getChunkPacket(offset, self.chunkSize), self.chunkTimeout)
+        self.acknowledgedOffset = offset + size
+        result.bytesUploaded += size
+        result.chunks += 1
+        if self.progressCallback is not None:
+            self.progressCallback(self.address, self.acknowledgedOffset, len(self.data))
+
+
+    async def _resume(self, result: MicroappUploadResult):
+        _LOGGER.info(f"Connection to {self.address} lost, resuming the upload from offset {self.acknowledgedOffset}.")
+        result.resumes += 1
+        result.resumedFrom.append(self.acknowledgedOffset)
+        await self.core.connect(self.address)
+
+
+    async def _isConnected(self) -> bool:
+        return self.core.ble is not None and await self.core.ble.is_connected()
+
+
+    def _getClient(self) -> ActiveClient or None:
+        if isinstance(self.core.ble, ActiveClient):
+            return self.core.ble
+        return self.core.ble.activeClient
+
+
+    def _getMtu(self) -> int or None:
+        client = self._getClient()
+        if client is None:
+            return None
+        return client.getMtu()
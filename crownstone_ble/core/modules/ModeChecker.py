@@ -12,6 +12,7 @@ class ModeChecker:
         self.result = None
         self.targetMode = targetMode
         self.waitUntilInTargetMode = waitUntilInTargetMode
+        self.finished = False
 
     def handleAdvertisement(self, scanData: ScanData):
         if scanData.address != self.address:
@@ -25,6 +26,7 @@ class ModeChecker:
             # if we're looking for a mode, we'll wait for the duration of the timeout in the hope it will be something other than unknown
             pass
         else:
+            self.finished = True
             BleEventBus.emit(SystemBleTopics.abortScanning, True)
 
     def getResult(self):
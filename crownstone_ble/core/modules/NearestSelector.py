@@ -17,6 +17,7 @@ class NearestSelector:
             self.addressesToExcludeSet = addressesToExcludeSet
         self.deviceList = []
         self.nearest = None
+        self.finished = False
         
         
     def handleAdvertisement(self, scanData: ScanData):
@@ -36,6 +37,7 @@ class NearestSelector:
         self.deviceList.append(scanData)
         
         if self.returnFirstAcceptable:
+            self.finished = True
             BleEventBus.emit(SystemBleTopics.abortScanning, True)
             
             
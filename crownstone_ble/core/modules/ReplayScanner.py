@@ -0,0 +1,82 @@
+import asyncio
+import logging
+
+from crownstone_ble.core.modules.AdvertisementRecording import readRecording
+
+_LOGGER = logging.getLogger(__name__)
+
+# At maximum speed, let other tasks run after this amount of callbacks.
+MAX_SPEED_YIELD_INTERVAL = 100
+
+
+"""
+Stands in for a BleakScanner, and feeds a recording of the AdvertisementRecorder to the detection callback.
+Use it with BleHandler.setScanner().
+
+With realTime, the callbacks are spaced like they were recorded, divided by speed. Without realTime, the callbacks
+are made as fast as possible, which can be used to measure the throughput of the scan pipeline.
+Each start() replays the recording from the beginning, stop() stops the replay.
+"""
+class ReplayScanner:
+
+    def __init__(self, path: str, realTime: bool = True, speed: float = 1.0, repeat: bool = False):
+        """
+        :param path:      Path of the recording.
+        :param realTime:  When False, replay as fast as possible.
+        :param speed:     Replay speed when realTime is True, 2.0 replays twice as fast as recorded.
+        :param repeat:    When True, start over at the end of the recording, until stopped.
+        """
+        self.records  = readRecording(path)
+        self.realTime = realTime
+        self.speed    = speed
+        self.repeat   = repeat
+
+        self.callback = None
+        self.replayedCount = 0
+        self._task = None
+        # Created in start(), so it is bound to the running event loop.
+        self._finished = None
+
+
+    def register_detection_callback(self, callback):
+        self.callback = callback
+
+
+    async def start(self):
+        await self.stop()
+        self._finished = asyncio.Event()
+        self._task = asyncio.ensure_future(self._replay())
+
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+    async def waitUntilFinished(self):
+        """
+        Wait until the whole recording has been replayed. Never finishes with repeat.
+        """
+        if self._finished is not None:
+            await self._finished.wait()
+
+
+    async def _replay(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            startTime = loop.time()
+            for i, record in enumerate(self.records):
+                if self.realTime:
+                    delay = startTime + record.timestamp / self.speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif i % MAX_SPEED_YIELD_INTERVAL == 0:
+                    await asyncio.sleep(0)
+
+                if self.callback is not None:
+                    self.callback(record.device, record.advertisementData)
+                self.replayedCount += 1
+            if not self.repeat:
+                break
+        self._finished.set()
@@ -5,6 +5,8 @@ class RssiChecker:
     def __init__(self, address):
         self.address = address.lower()
         self.result = []
+        # Averages over the whole scan, so it is never finished early.
+        self.finished = False
 
 
     def handleAdvertisement(self, scanData: ScanData):
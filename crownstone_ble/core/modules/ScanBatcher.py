@@ -0,0 +1,62 @@
+import asyncio
+import logging
+
+from crownstone_ble.core.BleEventBus import BleEventBus
+from crownstone_ble.core.container.ScanData import ScanData
+
+_LOGGER = logging.getLogger(__name__)
+
+# Time in seconds between the first scan of a batch and the moment the batch is emitted.
+DEFAULT_BATCH_WINDOW = 0.05
+# A batch is emitted right away once it has this amount of scans.
+DEFAULT_BATCH_SIZE = 100
+
+
+"""
+Class that groups the scans the Validator emits, and emits them as a list per batch topic.
+
+A batch is emitted when it has maxItems scans, or when 'window' seconds have passed since the first scan of the batch was added.
+The scans in a batch are in order of arrival, and each batch topic gets the same scans as its per scan topic.
+The window uses the event loop, so scans have to be added from within the event loop, like the scanner callbacks do.
+"""
+class ScanBatcher:
+
+    def __init__(self, window: float = DEFAULT_BATCH_WINDOW, maxItems: int = DEFAULT_BATCH_SIZE):
+        self.window   = window
+        self.maxItems = maxItems
+
+        # Batch topic as key, list of ScanData as value.
+        self.batches = {}
+        self.flushHandle = None
+
+
+    def add(self, topic: str, scanData: ScanData):
+        if topic not in self.batches:
+            self.batches[topic] = []
+        batch = self.batches[topic]
+        batch.append(scanData)
+
+        if len(batch) >= self.maxItems:
+            self._emit(topic)
+        elif self.flushHandle is None:
+            self.flushHandle = asyncio.get_event_loop().call_later(self.window, self.flush)
+
+
+    def flush(self):
+        """
+        Emit all batches that have scans.
+        """
+        if self.flushHandle is not None:
+            self.flushHandle.cancel()
+            self.flushHandle = None
+        for topic in list(self.batches.keys()):
+            self._emit(topic)
+
+
+    def _emit(self, topic: str):
+        batch = self.batches[topic]
+        if len(batch) == 0:
+            return
+        # Subscribers get their own list, so they can keep it.
+        self.batches[topic] = []
+        BleEventBus.emit(topic, batch)
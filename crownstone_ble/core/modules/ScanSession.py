@@ -0,0 +1,140 @@
+import asyncio
+import logging
+
+from crownstone_core.Enums import CrownstoneOperationMode
+
+from crownstone_ble.core.BleEventBus import BleEventBus
+from crownstone_ble.core.container.ScanData import ScanData
+from crownstone_ble.topics.BleTopics import BleTopics
+
+_LOGGER = logging.getLogger(__name__)
+
+# Amount of scans a stream buffers for a consumer that doesn't keep up. When full, the oldest scan is dropped.
+DEFAULT_STREAM_BUFFER_SIZE = 1000
+
+
+class ScanDataStream:
+    """
+    Buffers the scans that match the filters, for a single consumer.
+    A filter that is None matches everything.
+    """
+
+    def __init__(self, address: str = None, operationMode: CrownstoneOperationMode = None, validated: bool = None, bufferSize: int = DEFAULT_STREAM_BUFFER_SIZE):
+        self.address       = address.lower() if address is not None else None
+        self.operationMode = operationMode
+        self.validated     = validated
+        self.queue         = asyncio.Queue(bufferSize)
+        self.droppedCount  = 0
+
+    def matches(self, scanData: ScanData) -> bool:
+        if self.address is not None and scanData.address != self.address:
+            return False
+        if self.operationMode is not None and scanData.operationMode != self.operationMode:
+            return False
+        if self.validated is not None and scanData.validated != self.validated:
+            return False
+        return True
+
+    def put(self, scanData: ScanData or None):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.droppedCount += 1
+        self.queue.put_nowait(scanData)
+
+
+"""
+Class that keeps the scanner running, so multiple consumers can use the scans at the same time, without starting and
+stopping the scanner for each of them.
+
+Consumers can iterate over the scans with scanData(), filtered by address, operation mode and validated state, or wait
+until a checker (like the ModeChecker) is finished with waitUntilFinished().
+"""
+class ScanSession:
+
+    def __init__(self, bleHandler):
+        self.ble = bleHandler
+        self.streams = set()
+        self.subscriptionId = None
+
+
+    def isActive(self) -> bool:
+        return self.subscriptionId is not None
+
+
+    async def start(self):
+        if self.isActive():
+            return
+        self.subscriptionId = BleEventBus.subscribe(BleTopics.rawAdvertisement, self._handleScanData)
+        await self.ble.startScanSession()
+
+
+    async def stop(self):
+        if not self.isActive():
+            return
+        BleEventBus.unsubscribe(self.subscriptionId)
+        self.subscriptionId = None
+        # Let the iterators end.
+        for stream in self.streams:
+            stream.put(None)
+        await self.ble.stopScanSession()
+
+
+    async def scanData(self, address: str = None, operationMode: CrownstoneOperationMode = None, validated: bool = None, timeout: float = None):
+        """
+        Async iterator over the scans of the session, in order of arrival. Iteration stops when the session stops.
+        :param address:        Only get scans of this MAC address.
+        :param operationMode:  Only get scans of Crownstones in this operation mode.
+        :param validated:      Only get scans that are validated (True), or not validated (False).
+        :param timeout:        Stop iterating once timeout seconds have passed.
+        """
+        stream = ScanDataStream(address, operationMode, validated)
+        self.streams.add(stream)
+        loop = asyncio.get_event_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        try:
+            while self.isActive():
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    return
+                try:
+                    scanData = await asyncio.wait_for(stream.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    return
+                if scanData is None:
+                    return
+                yield scanData
+        finally:
+            self.streams.discard(stream)
+            if stream.droppedCount > 0:
+                _LOGGER.warning(f"Dropped {stream.droppedCount} scans, because the consumer did not keep up.")
+
+
+    async def waitUntilFinished(self, topic, checker, duration, address: str = None):
+        """
+        Pass the scans of the given topic to the checker, until checker.finished is True, or the duration has passed.
+        :param topic:     BleTopics.rawAdvertisement or BleTopics.advertisement.
+        :param checker:   Object with a handleAdvertisement(scanData) method, and a finished field.
+        :param duration:  Maximum time to wait, in seconds.
+        :param address:   When the checker only uses scans of a single address, the MAC address.
+        """
+        # Created here, so it is bound to the running event loop.
+        finishedEvent = asyncio.Event()
+
+        def handleScanData(scanData):
+            checker.handleAdvertisement(scanData)
+            if checker.finished:
+                finishedEvent.set()
+
+        subscriptionId = BleEventBus.subscribe(topic, handleScanData, address=address)
+        try:
+            await asyncio.wait_for(finishedEvent.wait(), timeout=max(duration, 0))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            BleEventBus.unsubscribe(subscriptionId)
+
+
+    def _handleScanData(self, scanData: ScanData):
+        for stream in self.streams:
+            if stream.matches(scanData):
+                stream.put(scanData)
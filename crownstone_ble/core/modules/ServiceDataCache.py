@@ -0,0 +1,45 @@
+import collections
+
+from crownstone_core.packets.ServiceData import ServiceData
+
+DEFAULT_SERVICE_DATA_CACHE_SIZE = 2048
+
+"""
+Bounded LRU cache of parsed service data, keyed on the service UUID and the raw service data bytes.
+
+Crownstones repeat the same encrypted service data many times between updates. With this cache, a repeated advertisement
+reuses the ServiceData that was decrypted and parsed before. The parsed ServiceData objects are shared, so don't modify them.
+The cache has to be invalidated when the service data key changes.
+"""
+class ServiceDataCache:
+
+    def __init__(self, maxSize: int = DEFAULT_SERVICE_DATA_CACHE_SIZE):
+        self.maxSize = maxSize
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def get(self, serviceUUID, rawServiceData: bytes) -> ServiceData or None:
+        key = (serviceUUID, rawServiceData)
+        serviceData = self.entries.get(key, None)
+        if serviceData is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return serviceData
+
+
+    def put(self, serviceUUID, rawServiceData: bytes, serviceData: ServiceData):
+        self.entries[(serviceUUID, rawServiceData)] = serviceData
+        if len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+
+    def invalidate(self):
+        self.entries.clear()
+
+
+    def getStatistics(self) -> dict:
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,307 @@
+import asyncio
+import logging
+import math
+import os
+import random
+
+import bleak
+from crownstone_core.Exceptions import CrownstoneBleException, CrownstoneError
+from crownstone_core.core.modules.EncryptionSettings import EncryptionSettings
+from crownstone_core.protocol.BlePackets import SUPPORTED_PROTOCOL_VERSION
+from crownstone_core.protocol.BluenetTypes import ControlType, ResultValue
+from crownstone_core.protocol.Characteristics import CrownstoneCharacteristics
+from crownstone_core.protocol.Services import CSServices
+from crownstone_core.util.Conversion import Conversion
+from crownstone_core.util.EncryptionHandler import EncryptionHandler, CHECKSUM
+
+from crownstone_ble.core.bluetooth_delegates.NotificationDelegate import LAST_PACKET_INDEX
+
+_LOGGER = logging.getLogger(__name__)
+
+# The keys that CrownstoneBle uses when no keys are set.
+DEFAULT_KEYS = ["adminKeyForCrown", "memberKeyForHome", "basicKeyForOther", "MyServiceDataKey", "aLocalizationKey", "MyGoodMeshAppKey", "MyGoodMeshNetKey"]
+
+# ATT header of a notification: opcode and handle.
+NOTIFICATION_HEADER_SIZE = 3
+# ATT header of a write request, and of a prepare write request.
+WRITE_HEADER_SIZE = 3
+PREPARE_WRITE_HEADER_SIZE = 5
+
+# Microapp storage of the simulated firmware.
+MICROAPP_PROTOCOL = 1
+MICROAPP_MAX_APPS = 1
+MICROAPP_MAX_APP_SIZE = 40960
+MICROAPP_MAX_CHUNK_SIZE = 256
+MICROAPP_MAX_RAM_USAGE = 4096
+# Offset of the checksum and the header checksum in the header of a microapp binary.
+MICROAPP_HEADER_CHECKSUMS_OFFSET = 4
+MICROAPP_TEST_STATE_PASSED = 3
+
+
+class SimulatedGattItem:
+    def __init__(self, uuid, handle):
+        self.uuid   = uuid
+        self.handle = handle
+
+
+class SimulatedServiceCollection:
+    def __init__(self, services, characteristics):
+        self.services        = services
+        self.characteristics = characteristics
+
+
+"""
+Stands in for a BleakClient that is connected to a Crownstone in normal mode.
+
+It serves the session data, decrypts control commands, handles them one at a time, and answers with encrypted result
+notifications, split in parts like the firmware does. Each part carries the part index that the NotificationDelegate merges.
+- linkLatency:     one way latency of the link, in seconds. A read or write with response takes a round trip, a write
+                   that doesn't fit in the MTU takes a round trip per prepare write, and one for the execute write.
+- processingTime:  time the firmware needs for each command, in seconds.
+- mtu:             ATT MTU, determines the size of the notification parts.
+- packetLoss:      chance that a notification part is lost, between 0 and 1.
+- seed:            seed of the packet loss, so runs can be repeated.
+- discoveryTime:   time a service discovery takes, in seconds.
+
+Set inRange to False to let connects fail after their timeout, like for a Crownstone that is switched off.
+
+Control commands are answered with SUCCESS. GET_STATE gets a state value of 100. The microapp commands work on the
+uploaded apps in microapps: MICROAPP_GET_INFO reports the checksum and header checksum from the header of each app, like
+the firmware does, and MICROAPP_UPLOAD gets WAIT_FOR_SUCCESS first. MICROAPP_VALIDATE marks the checksum test of an app
+as passed, without checking the checksums.
+"""
+class SimulatedCrownstone:
+
+    def __init__(self, address, keys=None, linkLatency=0.015, processingTime=0.005, mtu=23, packetLoss=0.0, seed=None, discoveryTime=0.0):
+        self.address        = address
+        self.linkLatency    = linkLatency
+        self.processingTime = processingTime
+        self.mtu            = mtu
+        self.packetLoss     = packetLoss
+        self.lossRandom     = random.Random(seed)
+        self.discoveryTime  = discoveryTime
+
+        self.settings = EncryptionSettings()
+        self.settings.loadKeys(*(keys or DEFAULT_KEYS))
+        self.settings.setSessionNonce(list(os.urandom(5)))
+        self.settings.setValidationKey(list(os.urandom(4)))
+
+        self.connected = False
+        self.inRange = True
+        self.disconnectedCallback = None
+        self.notificationCallback = None
+        self.busyUntil = 0
+        # App index as key, bytearray with the uploaded binary as value.
+        self.microapps = {}
+        # App indices of which the checksum test passed.
+        self.validatedMicroapps = set()
+
+        self.connectCount      = 0
+        self.discoveryCount    = 0
+        self.commandsHandled   = 0
+        self.notificationsSent = 0
+        self.notificationsLost = 0
+
+        uuids = [CSServices.CrownstoneService, CrownstoneCharacteristics.SessionData, CrownstoneCharacteristics.Control, CrownstoneCharacteristics.Result]
+        self.handles = {uuid: handle for handle, uuid in enumerate(uuids, start=10)}
+
+
+    def set_disconnected_callback(self, callback):
+        self.disconnectedCallback = callback
+
+
+    async def connect(self, timeout=None):
+        if not self.inRange:
+            await asyncio.sleep(timeout or 0)
+            raise bleak.BleakError(f"Device with address {self.address} was not found.")
+        await asyncio.sleep(2 * self.linkLatency)
+        self.connected = True
+        self.connectCount += 1
+        return True
+
+
+    async def disconnect(self):
+        self.connected = False
+        self.notificationCallback = None
+        return True
+
+
+    def simulateDisconnect(self):
+        """
+        Disconnect from the Crownstone side, like when it goes out of range.
+        """
+        self.connected = False
+        self.notificationCallback = None
+        if self.disconnectedCallback is not None:
+            self.disconnectedCallback(self)
+
+
+    async def is_connected(self):
+        return self.connected
+
+
+    @property
+    def mtu_size(self):
+        return self.mtu
+
+
+    async def get_services(self):
+        await asyncio.sleep(self.discoveryTime)
+        self.discoveryCount += 1
+        services = {self.handles[CSServices.CrownstoneService]: SimulatedGattItem(CSServices.CrownstoneService, self.handles[CSServices.CrownstoneService])}
+        characteristics = {}
+        for uuid in [CrownstoneCharacteristics.SessionData, CrownstoneCharacteristics.Control, CrownstoneCharacteristics.Result]:
+            characteristics[self.handles[uuid]] = SimulatedGattItem(uuid, self.handles[uuid])
+        return SimulatedServiceCollection(services, characteristics)
+
+
+    async def read_gatt_char(self, uuid):
+        await asyncio.sleep(2 * self.linkLatency)
+        if uuid == CrownstoneCharacteristics.SessionData:
+            packet = Conversion.uint32_to_uint8_array(CHECKSUM) + [SUPPORTED_PROTOCOL_VERSION]
+            packet += self.settings.sessionNonce + self.settings.validationKey + [0, 0]
+            return bytearray(EncryptionHandler.encryptECB(packet, self.settings.basicKey))
+        raise ValueError(f"Characteristic {uuid} can't be read")
+
+
+    async def write_gatt_char(self, uuid, data, response=True):
+        if not self.connected:
+            raise bleak.BleakError(f"Not connected to {self.address}.")
+        roundTrips = 1
+        if len(data) > self.mtu - WRITE_HEADER_SIZE:
+            roundTrips = math.ceil(len(data) / (self.mtu - PREPARE_WRITE_HEADER_SIZE)) + 1
+        loop = asyncio.get_event_loop()
+        arrival = loop.time() + (2 * roundTrips - 1) * self.linkLatency
+        if uuid == CrownstoneCharacteristics.Control:
+            self.busyUntil = max(arrival, self.busyUntil) + self.processingTime
+            loop.call_at(self.busyUntil, self._handleControl, bytes(data))
+        if response:
+            await asyncio.sleep(2 * roundTrips * self.linkLatency)
+
+
+    async def start_notify(self, uuid, callback):
+        if uuid not in self.handles:
+            raise bleak.BleakError(f"Characteristic {uuid} not found.")
+        await asyncio.sleep(2 * self.linkLatency)
+        self.notificationCallback = callback
+
+
+    async def stop_notify(self, uuid):
+        self.notificationCallback = None
+
+
+    def _handleControl(self, data):
+        if not self.connected:
+            return
+        self.commandsHandled += 1
+        packet = EncryptionHandler.decrypt(data, self.settings)
+        commandType = Conversion.uint8_array_to_uint16(packet[1:3])
+        if commandType == ControlType.GET_STATE:
+            # State type, id and persistence mode are repeated, followed by the state value.
+            payload = packet[5:11] + [100]
+            self._notify(commandType, ResultValue.SUCCESS, payload)
+        elif commandType == ControlType.MICROAPP_GET_INFO:
+            self._notify(commandType, ResultValue.SUCCESS, self._getMicroappInfo())
+        elif commandType == ControlType.MICROAPP_UPLOAD:
+            # Payload: app header (protocol and index), offset, and the chunk.
+            index = packet[6]
+            offset = Conversion.uint8_array_to_uint16(packet[7:9])
+            chunk = bytes(packet[9 : 5 + Conversion.uint8_array_to_uint16(packet[3:5])])
+            if index >= MICROAPP_MAX_APPS or len(chunk) > MICROAPP_MAX_CHUNK_SIZE or offset + len(chunk) > MICROAPP_MAX_APP_SIZE:
+                self._notify(commandType, ResultValue.WRONG_PAYLOAD_LENGTH, [])
+                return
+            self.validatedMicroapps.discard(index)
+            app = self.microapps.setdefault(index, bytearray())
+            if len(app) < offset + len(chunk):
+                app.extend([0xFF] * (offset + len(chunk) - len(app)))
+            app[offset : offset + len(chunk)] = chunk
+            self._notify(commandType, ResultValue.WAIT_FOR_SUCCESS, [])
+            self._notify(commandType, ResultValue.SUCCESS, [])
+        elif commandType == ControlType.MICROAPP_REMOVE:
+            self.microapps.pop(packet[6], None)
+            self.validatedMicroapps.discard(packet[6])
+            self._notify(commandType, ResultValue.SUCCESS, [])
+        elif commandType == ControlType.DISCONNECT:
+            # Like the firmware, drop the link instead of sending a result.
+            self.simulateDisconnect()
+        elif commandType == ControlType.MICROAPP_VALIDATE:
+            if packet[6] in self.microapps:
+                self.validatedMicroapps.add(packet[6])
+            self._notify(commandType, ResultValue.SUCCESS, [])
+        else:
+            self._notify(commandType, ResultValue.SUCCESS, [])
+
+
+    def _getMicroappInfo(self):
+        info = [MICROAPP_PROTOCOL, MICROAPP_MAX_APPS]
+        info += Conversion.uint16_to_uint8_array(MICROAPP_MAX_APP_SIZE)
+        info += Conversion.uint16_to_uint8_array(MICROAPP_MAX_CHUNK_SIZE)
+        info += Conversion.uint16_to_uint8_array(MICROAPP_MAX_RAM_USAGE)
+        # SDK version: major, minor.
+        info += [0, 1]
+        for index in range(0, MICROAPP_MAX_APPS):
+            app = self.microapps.get(index, None)
+            # Checksum and header checksum, as uint16 from the header of the binary.
+            checksums = [0, 0, 0, 0]
+            if app is not None and len(app) >= MICROAPP_HEADER_CHECKSUMS_OFFSET + len(checksums):
+                checksums = list(app[MICROAPP_HEADER_CHECKSUMS_OFFSET : MICROAPP_HEADER_CHECKSUMS_OFFSET + len(checksums)])
+            # Build version, SDK version, checksum, header checksum.
+            info += [0, 0, 0, 0] + [0, 1] + checksums
+            # Tests (hasData bit, and 2 bits with the checksum test state), function trying, function failed, functions passed.
+            tests = 0
+            if app is not None:
+                tests |= 1
+            if index in self.validatedMicroapps:
+                tests |= MICROAPP_TEST_STATE_PASSED << 1
+            info += [tests, 0] + [0, 0] + [0, 0, 0, 0]
+        return info
+
+
+    def _notify(self, commandType, resultValue, payload):
+        result = [SUPPORTED_PROTOCOL_VERSION]
+        result += Conversion.uint16_to_uint8_array(commandType)
+        result += Conversion.uint16_to_uint8_array(resultValue)
+        result += Conversion.uint16_to_uint8_array(len(payload))
+        result += payload
+        encrypted = list(EncryptionHandler.encrypt(result, self.settings))
+
+        # Each part starts with the part index.
+        partSize = self.mtu - NOTIFICATION_HEADER_SIZE - 1
+        parts = [encrypted[i : i + partSize] for i in range(0, len(encrypted), partSize)]
+        loop = asyncio.get_event_loop()
+        for index, part in enumerate(parts):
+            self.notificationsSent += 1
+            if self.packetLoss > 0 and self.lossRandom.random() < self.packetLoss:
+                self.notificationsLost += 1
+                continue
+            partIndex = LAST_PACKET_INDEX if index == len(parts) - 1 else index
+            loop.call_later(self.linkLatency, self._deliver, bytearray([partIndex] + part))
+
+
+    def _deliver(self, data):
+        if self.notificationCallback is not None:
+            self.notificationCallback(self.handles[CrownstoneCharacteristics.Result], data)
+
+
+class SimulatedBackend:
+    """
+    Client backend for CrownstoneBle and BleHandler that connects to simulated Crownstones instead of real devices.
+    Connecting to an address that has no simulated Crownstone fails.
+    """
+
+    def __init__(self, crownstones: list = None):
+        # Lower case address as key, SimulatedCrownstone as value.
+        self.crownstones = {}
+        for crownstone in crownstones or []:
+            self.add(crownstone)
+
+
+    def add(self, crownstone: SimulatedCrownstone):
+        self.crownstones[crownstone.address.lower()] = crownstone
+
+
+    def __call__(self, address, **kwargs):
+        crownstone = self.crownstones.get(address.lower(), None)
+        if crownstone is None:
+            raise CrownstoneBleException(CrownstoneError.CONNECTION_FAILED, f"No simulated Crownstone with address {address}.")
+        return crownstone
@@ -15,8 +15,12 @@ Class that validates advertisements from a single MAC address.
 
 Each 'update()':
 - Checks if the advertisement can be validated, and sets .verified = True if so.
+- Moves the timeoutTime forward, which is on the time.monotonic() clock.
 """
 class StoneAdvertisementTracker:
+    # There is a tracker for every Crownstone in range, slots make them smaller.
+    __slots__ = ("address", "uniqueIdentifier", "crownstoneId", "cleanupCallback", "verified", "duplicate",
+                 "timeoutDuration", "consecutiveMatches", "timeoutTime")
 
     def __init__(self, cleanupCallback):
         self.address           = None
@@ -30,13 +34,13 @@ class StoneAdvertisementTracker:
         self.timeoutDuration = 10  # seconds
         self.consecutiveMatches = 0
         
-        self.timeoutTime = time.time() + self.timeoutDuration
+        self.timeoutTime = time.monotonic() + self.timeoutDuration
 
         self.cleanupCallback = cleanupCallback
 
 
     def checkForCleanup(self):
-        now = time.time()
+        now = time.monotonic()
         # check time in self.timeoutTime with current time
         if self.timeoutTime <= now:
             _LOGGER.debug(f"Timeout {self.address}")
@@ -60,7 +64,7 @@ class StoneAdvertisementTracker:
         else:
             self.verify(advertisement.serviceData)
 
-        self.timeoutTime = time.time() + self.timeoutDuration
+        self.timeoutTime = time.monotonic() + self.timeoutDuration
 
         if hasattr(advertisement.serviceData.payload, "uniqueIdentifier"):
             self.uniqueIdentifier = advertisement.serviceData.payload.uniqueIdentifier
@@ -1,5 +1,13 @@
+import functools
+import heapq
+import itertools
+import time
+
+from crownstone_core.Enums import CrownstoneOperationMode
+
 from crownstone_ble.core.container.ScanDataUtil import fillScanDataFromAdvertisement
 from crownstone_ble.core.BleEventBus import BleEventBus
+from crownstone_ble.core.modules.DeviceRegistry import DeviceRegistry
 from crownstone_ble.core.modules.StoneAdvertisementTracker import StoneAdvertisementTracker
 from crownstone_ble.topics.BleTopics import BleTopics
 from crownstone_ble.topics.SystemBleTopics import SystemBleTopics
@@ -11,46 +19,98 @@ Each MAC address will have its own 'StoneAdvertisementTracker'.
 
 On each 'SystemBleTopics.rawAdvertisementClass', this class will:
 - Call 'update()' on the StoneAdvertisementTracker of that MAC address.
+- Update the DeviceRegistry with the scan.
 - Emit 'BleTopics.advertisement', if the address is validated.
 - Emit 'BleTopics.newDataAvailable' if the address is validated, and the rawAdvertisement has service data.
 - Emit 'BleTopics.rawAdvertisement' for all incoming Crownstone messages.
-
-The threading part is removed. This adds a little overhead since the cleanup is called every checkAdvertisement. On the other hand, not threading is usually no issues.
+- When batched delivery is enabled, add the scan to the batches of the topics it was emitted on.
+- When coalescing is enabled, 'BleTopics.advertisement' is emitted via the AdvertisementCoalescer, at most once per interval per address.
+- When scanning on multiple adapters, fill in the RSSI per adapter.
+
+The threading part is removed, the cleanup is done on every checkAdvertisement instead.
+To avoid checking every tracker each time, the trackers are kept in a min-heap on their timeoutTime. A tracker that got
+new advertisements since it was pushed is pushed again with its new timeoutTime when it reaches the top, so each
+advertisement costs amortized O(log n).
 """
 class Validator:
 
     def __init__(self):
-        BleEventBus.subscribe(SystemBleTopics.rawAdvertisementClass, self.checkAdvertisement)
+        self.subscriptionId = BleEventBus.subscribe(SystemBleTopics.rawAdvertisementClass, self.checkAdvertisement)
         self.trackedCrownstones = {}
+        self.registry = DeviceRegistry()
+        # ScanBatcher, when batched delivery is enabled.
+        self.batcher = None
+        # AdvertisementCoalescer, when coalescing is enabled.
+        self.coalescer = None
+        # AdapterRouter, when scanning on multiple adapters.
+        self.adapterRouter = None
+
+        # Min-heap of (timeoutTime, sequence number, address, tracker). Holds a single entry per tracker.
+        self.expiryHeap = []
+        self.expirySequence = itertools.count()
 
 
     def cleanupExpiredTrackers(self):
-        allKeys = []
-        # we first collect keys because we might delete items from this list during ticks
-        for key, trackedStone in self.trackedCrownstones.items():
-            allKeys.append(key)
+        now = time.monotonic()
+        while len(self.expiryHeap) > 0 and self.expiryHeap[0][0] <= now:
+            timeoutTime, sequence, address, tracker = heapq.heappop(self.expiryHeap)
+            if self.trackedCrownstones.get(address, None) is not tracker:
+                # This tracker has already been removed.
+                continue
+            if tracker.timeoutTime <= now:
+                tracker.checkForCleanup()
+            else:
+                self._pushExpiry(address, tracker)
+
 
-        for key in allKeys:
-            self.trackedCrownstones[key].checkForCleanup()
+    def _pushExpiry(self, address, tracker: StoneAdvertisementTracker):
+        heapq.heappush(self.expiryHeap, (tracker.timeoutTime, next(self.expirySequence), address, tracker))
 
 
     def removeStone(self, address):
         del self.trackedCrownstones[address]
+        self.registry.remove(address)
+        if self.coalescer is not None:
+            self.coalescer.remove(address.lower())
 
 
     def checkAdvertisement(self, advertisement):
         self.cleanupExpiredTrackers()
 
         if advertisement.address not in self.trackedCrownstones:
-            self.trackedCrownstones[advertisement.address] = StoneAdvertisementTracker(lambda: self.removeStone(advertisement.address))
+            # A partial instead of a lambda, so the tracker doesn't keep the first advertisement alive.
+            self.trackedCrownstones[advertisement.address] = StoneAdvertisementTracker(functools.partial(self.removeStone, advertisement.address))
+            self._pushExpiry(advertisement.address, self.trackedCrownstones[advertisement.address])
 
         self.trackedCrownstones[advertisement.address].update(advertisement)
 
+        tracker = self.trackedCrownstones[advertisement.address]
+        data = fillScanDataFromAdvertisement(advertisement, tracker.verified)
+        if self.adapterRouter is not None:
+            data.adapterRssi = self.adapterRouter.getRssiByAdapter(data.address)
+
+        crownstoneId = None
+        if tracker.verified and advertisement.operationMode == CrownstoneOperationMode.NORMAL:
+            crownstoneId = tracker.crownstoneId
+        self.registry.update(data, crownstoneId)
+
         # forward all scans over this topic. It is located here instead of the delegates so it would be easier to convert the json to classes.
-        data = fillScanDataFromAdvertisement(advertisement, self.trackedCrownstones[advertisement.address].verified)
         BleEventBus.emit(BleTopics.rawAdvertisement, data)
+        if self.batcher is not None:
+            self.batcher.add(BleTopics.rawAdvertisementBatch, data)
         if self.trackedCrownstones[advertisement.address].verified:
-            BleEventBus.emit(BleTopics.advertisement, data)
+            if self.coalescer is not None:
+                self.coalescer.add(data)
+            else:
+                self.emitAdvertisement(data)
 
             if not self.trackedCrownstones[advertisement.address].duplicate:
                 BleEventBus.emit(BleTopics.newDataAvailable, data)
+                if self.batcher is not None:
+                    self.batcher.add(BleTopics.newDataAvailableBatch, data)
+
+
+    def emitAdvertisement(self, data):
+        BleEventBus.emit(BleTopics.advertisement, data)
+        if self.batcher is not None:
+            self.batcher.add(BleTopics.advertisementBatch, data)
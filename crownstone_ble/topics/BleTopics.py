@@ -3,3 +3,8 @@ class BleTopics:
      rawAdvertisement  = "rawAdvertisement"
      advertisement     = "advertisement"
      newDataAvailable  = "newDataAvailable"
+
+     # Lists of the ScanData of the topics above, emitted when batched delivery is enabled.
+     rawAdvertisementBatch = "rawAdvertisementBatch"
+     advertisementBatch    = "advertisementBatch"
+     newDataAvailableBatch = "newDataAvailableBatch"
@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+
+from crownstone_ble import CrownstoneBle, BleTopics
+from crownstone_ble.core.BleEventBus import BleEventBus
+from crownstone_ble.core.container.ScanData import ScanData
+from crownstone_ble.core.modules.AdvertisementCoalescer import AdvertisementCoalescer
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedBackend
+
+INTERVAL = 0.05
+
+
+def getScanData(i, rssi=-60):
+    scanData = ScanData()
+    scanData.address = f"aa:bb:cc:dd:ee:{i:02x}"
+    scanData.rssi = rssi
+    return scanData
+
+
+class TestAdvertisementCoalescer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.emitted = []
+        self.coalescer = AdvertisementCoalescer(self.emitted.append, INTERVAL)
+
+    async def test_first_scan_right_away(self):
+        scans = [getScanData(0), getScanData(1)]
+        for scan in scans:
+            self.coalescer.add(scan)
+        self.assertEqual(self.emitted, scans)
+
+    async def test_newest_scan_after_interval(self):
+        first, second, third = getScanData(0, -60), getScanData(0, -61), getScanData(0, -62)
+        self.coalescer.add(first)
+        self.coalescer.add(second)
+        self.coalescer.add(third)
+        self.assertEqual(self.emitted, [first])
+
+        await asyncio.sleep(2 * INTERVAL)
+        self.assertEqual(self.emitted, [first, third])
+        self.assertEqual(self.coalescer.getStatistics(), {"received": 3, "emitted": 2})
+        self.assertEqual(self.coalescer.timerHandles, {})
+
+    async def test_right_away_after_quiet_interval(self):
+        first, second = getScanData(0, -60), getScanData(0, -61)
+        self.coalescer.add(first)
+        await asyncio.sleep(2 * INTERVAL)
+        self.coalescer.add(second)
+        self.assertEqual(self.emitted, [first, second])
+
+    async def test_flush(self):
+        first, second = getScanData(0, -60), getScanData(0, -61)
+        self.coalescer.add(first)
+        self.coalescer.add(second)
+        self.coalescer.flush()
+        self.assertEqual(self.emitted, [first, second])
+        # The timer was cancelled, so the scan isn't emitted twice.
+        await asyncio.sleep(2 * INTERVAL)
+        self.assertEqual(self.emitted, [first, second])
+
+    async def test_remove_drops_pending(self):
+        first, second, other = getScanData(0, -60), getScanData(0, -61), getScanData(1)
+        self.coalescer.add(first)
+        self.coalescer.add(second)
+        self.coalescer.add(other)
+        self.coalescer.remove(first.address)
+        await asyncio.sleep(2 * INTERVAL)
+        self.assertEqual(self.emitted, [first, other])
+
+        # A removed address is emitted right away when it's seen again.
+        self.coalescer.add(second)
+        self.assertEqual(self.emitted, [first, other, second])
+
+    async def test_disable_flushes(self):
+        core = CrownstoneBle(clientBackend=SimulatedBackend())
+        advertisements = []
+        subscriptionId = BleEventBus.subscribe(BleTopics.advertisement, advertisements.append)
+        try:
+            core.enableCoalescing(10)
+            first, second = getScanData(0, -60), getScanData(0, -61)
+            core.ble.validator.coalescer.add(first)
+            core.ble.validator.coalescer.add(second)
+            self.assertEqual(advertisements, [first])
+            core.disableCoalescing()
+            self.assertIsNone(core.ble.validator.coalescer)
+            self.assertEqual(advertisements, [first, second])
+        finally:
+            BleEventBus.unsubscribe(subscriptionId)
+            await core.shutDown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,190 @@
+import asyncio
+import unittest
+
+from crownstone_core.Enums import CrownstoneOperationMode
+from crownstone_core.Exceptions import CrownstoneBleException
+
+from crownstone_ble.Exceptions import BleError
+from crownstone_ble.core.modules.AsyncEventBus import AsyncEventBus, QueuePolicy
+
+TOPIC = "test"
+
+
+class Payload:
+    def __init__(self, crownstoneId):
+        self.crownstoneId = crownstoneId
+
+
+class Scan:
+    def __init__(self, address, value=0, crownstoneId=None, operationMode=None):
+        self.address       = address
+        self.value         = value
+        self.payload       = Payload(crownstoneId) if crownstoneId is not None else None
+        self.operationMode = operationMode
+
+
+class TestQueuePolicies(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.bus = AsyncEventBus()
+        self.received = []
+
+    async def asyncTearDown(self):
+        for subscriptionId in list(self.bus.asyncSubscribers.keys()):
+            self.bus.unsubscribe(subscriptionId)
+
+    def receive(self, scan):
+        self.received.append(scan.value)
+
+    async def receiveAsync(self, scan):
+        self.received.append(scan.value)
+
+    async def waitUntilHandled(self, subscriptionId):
+        while self.bus.getAsyncMetrics()[subscriptionId]["queueDepth"] > 0:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    async def test_delivered_from_task(self):
+        subscriptionId = self.bus.subscribeAsync(TOPIC, self.receiveAsync)
+        self.bus.emit(TOPIC, Scan("a", 1))
+        self.bus.emit(TOPIC, Scan("a", 2))
+        # Not delivered during emit.
+        self.assertEqual(self.received, [])
+        await self.waitUntilHandled(subscriptionId)
+        self.assertEqual(self.received, [1, 2])
+
+    async def test_drop_oldest(self):
+        subscriptionId = self.bus.subscribeAsync(TOPIC, self.receiveAsync, maxQueueSize=3, policy=QueuePolicy.DROP_OLDEST)
+        for i in range(0, 5):
+            self.bus.emit(TOPIC, Scan("a", i))
+        await self.waitUntilHandled(subscriptionId)
+        self.assertEqual(self.received, [2, 3, 4])
+        metrics = self.bus.getAsyncMetrics()[subscriptionId]
+        self.assertEqual(metrics["dropped"], 2)
+        self.assertEqual(metrics["maxQueueDepth"], 3)
+        self.assertEqual(metrics["handled"], 3)
+
+    async def test_inline(self):
+        subscriptionId = self.bus.subscribeAsync(TOPIC, self.receive, maxQueueSize=3, policy=QueuePolicy.INLINE)
+        for i in range(0, 5):
+            self.bus.emit(TOPIC, Scan("a", i))
+        # The oldest items were handled by the emitter, when the queue was full.
+        self.assertEqual(self.received, [0, 1])
+        await self.waitUntilHandled(subscriptionId)
+        self.assertEqual(self.received, [0, 1, 2, 3, 4])
+        self.assertEqual(self.bus.getAsyncMetrics()[subscriptionId]["dropped"], 0)
+
+    async def test_inline_rejects_async_callback(self):
+        with self.assertRaises(CrownstoneBleException) as context:
+            self.bus.subscribeAsync(TOPIC, self.receiveAsync, policy=QueuePolicy.INLINE)
+        self.assertEqual(context.exception.type, BleError.UNSUPPORTED_QUEUE_POLICY)
+
+    async def test_latest_per_address(self):
+        subscriptionId = self.bus.subscribeAsync(TOPIC, self.receiveAsync, maxQueueSize=2, policy=QueuePolicy.LATEST_PER_ADDRESS)
+        self.bus.emit(TOPIC, Scan("a", 1))
+        self.bus.emit(TOPIC, Scan("b", 2))
+        self.bus.emit(TOPIC, Scan("a", 3))
+        # The queue is full with other addresses: the oldest is dropped.
+        self.bus.emit(TOPIC, Scan("c", 4))
+        await self.waitUntilHandled(subscriptionId)
+        self.assertEqual(self.received, [2, 4])
+        self.assertEqual(self.bus.getAsyncMetrics()[subscriptionId]["dropped"], 2)
+
+    async def test_callback_error_does_not_stop_subscriber(self):
+        def receive(scan):
+            if scan.value == 1:
+                raise ValueError("test")
+            self.received.append(scan.value)
+        subscriptionId = self.bus.subscribeAsync(TOPIC, receive)
+        for i in range(0, 3):
+            self.bus.emit(TOPIC, Scan("a", i))
+        await self.waitUntilHandled(subscriptionId)
+        self.assertEqual(self.received, [0, 2])
+
+    async def test_unsubscribe_stops_task(self):
+        subscriptionId = self.bus.subscribeAsync(TOPIC, self.receiveAsync)
+        subscriber = self.bus.asyncSubscribers[subscriptionId]
+        self.bus.unsubscribe(subscriptionId)
+        self.bus.emit(TOPIC, Scan("a", 1))
+        await asyncio.sleep(0)
+        self.assertTrue(subscriber.task.done())
+        self.assertEqual(self.received, [])
+
+
+class TestFilters(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.bus = AsyncEventBus()
+
+    def subscribe(self, **filters):
+        received = []
+        subscriptionId = self.bus.subscribe(TOPIC, lambda scan: received.append(scan.value), **filters)
+        return subscriptionId, received
+
+    def emitAll(self):
+        self.bus.emit(TOPIC, Scan("aa:00", 1, 1, CrownstoneOperationMode.NORMAL))
+        self.bus.emit(TOPIC, Scan("aa:01", 2, 2, CrownstoneOperationMode.NORMAL))
+        self.bus.emit(TOPIC, Scan("aa:02", 3, None, CrownstoneOperationMode.SETUP))
+        self.bus.emit(TOPIC, Scan("aa:03", 4, 1, CrownstoneOperationMode.NORMAL))
+
+    async def test_address(self):
+        # The address filter is not case sensitive.
+        subscriptionId, received = self.subscribe(address="AA:01")
+        self.emitAll()
+        self.assertEqual(received, [2])
+
+    async def test_crownstone_id(self):
+        subscriptionId, received = self.subscribe(crownstoneId=1)
+        self.emitAll()
+        self.assertEqual(received, [1, 4])
+
+    async def test_operation_mode(self):
+        subscriptionId, received = self.subscribe(operationMode=CrownstoneOperationMode.SETUP)
+        self.emitAll()
+        self.assertEqual(received, [3])
+
+    async def test_combined(self):
+        subscriptionId, received = self.subscribe(crownstoneId=1, address="aa:03")
+        otherId, otherReceived = self.subscribe(crownstoneId=2, operationMode=CrownstoneOperationMode.SETUP)
+        self.emitAll()
+        self.assertEqual(received, [4])
+        self.assertEqual(otherReceived, [])
+
+    async def test_without_filter(self):
+        subscriptionId, received = self.subscribe()
+        self.emitAll()
+        self.bus.emit(TOPIC, Scan("aa:04", 5))
+        self.assertEqual(received, [1, 2, 3, 4, 5])
+
+    async def test_unsubscribe(self):
+        subscriptionId, received = self.subscribe(address="aa:00")
+        otherId, otherReceived = self.subscribe(address="aa:00")
+        self.bus.unsubscribe(subscriptionId)
+        self.emitAll()
+        self.assertEqual(received, [])
+        self.assertEqual(otherReceived, [1])
+        self.bus.unsubscribe(otherId)
+        self.assertEqual(self.bus.indexedTopics[TOPIC]["address"], {})
+        self.assertEqual(self.bus.indexedSubscriptions, {})
+
+    async def test_callback_error_does_not_stop_others(self):
+        def fail(scan):
+            raise ValueError("test")
+        self.bus.subscribe(TOPIC, fail, crownstoneId=1)
+        subscriptionId, received = self.subscribe(crownstoneId=1)
+        self.emitAll()
+        self.assertEqual(received, [1, 4])
+
+    async def test_async_with_filter(self):
+        received = []
+        subscriptionId = self.bus.subscribeAsync(TOPIC, lambda scan: received.append(scan.value), crownstoneId=2)
+        self.emitAll()
+        while self.bus.getAsyncMetrics()[subscriptionId]["queueDepth"] > 0:
+            await asyncio.sleep(0)
+        self.assertEqual(received, [2])
+        self.assertEqual(self.bus.getAsyncMetrics()[subscriptionId]["emitted"], 1)
+        self.bus.unsubscribe(subscriptionId)
+
+
+if __name__ == "__main__":
+    unittest.main()
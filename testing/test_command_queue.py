@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+
+from crownstone_core.Exceptions import CrownstoneBleException, CrownstoneError
+from crownstone_core.core.modules.EncryptionSettings import EncryptionSettings
+from crownstone_core.protocol.BluenetTypes import ControlType, ResultValue
+from crownstone_core.util.Conversion import Conversion
+
+from crownstone_ble.Exceptions import BleError
+from crownstone_ble.core.bluetooth_delegates.NotificationDelegate import NotificationDelegate
+from crownstone_ble.core.modules.CommandQueue import CommandQueue
+
+
+def getControlPacket(commandType):
+    # Protocol, command type, payload size.
+    return [5] + Conversion.uint16_to_uint8_array(commandType) + [0, 0]
+
+
+def getResult(commandType, resultValue=ResultValue.SUCCESS):
+    # Protocol, command type, result value, payload size.
+    return [5] + Conversion.uint16_to_uint8_array(commandType) + Conversion.uint16_to_uint8_array(resultValue) + [0, 0]
+
+
+class TestCommandQueue(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.delegate = NotificationDelegate(None, EncryptionSettings())
+        self.queue = CommandQueue(self.delegate, maxInFlight=4)
+        self.written = []
+
+    def execute(self, commandType, timeout=1.0, resultHandler=None):
+        async def write():
+            self.written.append(commandType)
+        return asyncio.ensure_future(self.queue.execute(getControlPacket(commandType), write, resultHandler, timeout))
+
+    async def waitForWrites(self, count):
+        while len(self.written) < count:
+            await asyncio.sleep(0)
+
+    async def test_result_matched_by_command_type(self):
+        switch = self.execute(ControlType.SWITCH)
+        getState = self.execute(ControlType.GET_STATE)
+        await self.waitForWrites(2)
+
+        # Results come in out of order.
+        self.queue.handleResult(getResult(ControlType.GET_STATE))
+        self.queue.handleResult(getResult(ControlType.SWITCH, ResultValue.WAIT_FOR_SUCCESS))
+        self.assertEqual((await getState).commandType, ControlType.GET_STATE)
+        self.assertEqual((await switch).resultCode, ResultValue.WAIT_FOR_SUCCESS)
+
+    async def test_same_command_type_in_order_of_writing(self):
+        first = self.execute(ControlType.SWITCH)
+        second = self.execute(ControlType.SWITCH)
+        await self.waitForWrites(2)
+
+        self.queue.handleResult(getResult(ControlType.SWITCH, ResultValue.SUCCESS))
+        self.queue.handleResult(getResult(ControlType.SWITCH, ResultValue.BUSY))
+        self.assertEqual((await first).resultCode, ResultValue.SUCCESS)
+        self.assertEqual((await second).resultCode, ResultValue.BUSY)
+
+    async def test_leftover_result_on_result_queue(self):
+        self.queue.handleResult(getResult(ControlType.SWITCH))
+        self.assertEqual(await self.delegate.getResult(0.1), getResult(ControlType.SWITCH))
+
+    async def test_unexpected_result_fails_only_pending_command(self):
+        switch = self.execute(ControlType.SWITCH, timeout=10)
+        await self.waitForWrites(1)
+
+        self.queue.handleResult(getResult(ControlType.GET_STATE))
+        with self.assertRaises(CrownstoneBleException) as context:
+            await asyncio.wait_for(switch, 0.1)
+        self.assertEqual(context.exception.type, BleError.UNEXPECTED_RESULT)
+        # The result is still available to the notification delegate.
+        self.assertEqual(await self.delegate.getResult(0.1), getResult(ControlType.GET_STATE))
+
+    async def test_late_result_does_not_fail_next_command(self):
+        getState = self.execute(ControlType.GET_STATE, timeout=0.01)
+        with self.assertRaises(CrownstoneBleException) as context:
+            await getState
+        self.assertEqual(context.exception.type, BleError.NO_NOTIFICATION_DATA_RECEIVED)
+
+        switch = self.execute(ControlType.SWITCH)
+        await self.waitForWrites(2)
+        self.queue.handleResult(getResult(ControlType.GET_STATE))
+        self.queue.handleResult(getResult(ControlType.SWITCH))
+        self.assertEqual((await switch).commandType, ControlType.SWITCH)
+
+    async def test_invalid_result_goes_to_only_pending_command(self):
+        switch = self.execute(ControlType.SWITCH)
+        await self.waitForWrites(1)
+
+        self.queue.handleResult([5, 0xFF, 0xFF])
+        self.assertFalse((await switch).valid)
+
+    async def test_fail_all(self):
+        commands = [self.execute(ControlType.SWITCH), self.execute(ControlType.GET_STATE)]
+        await self.waitForWrites(2)
+
+        self.queue.failAll(CrownstoneBleException(CrownstoneError.DISCONNECTED, "Disconnected."))
+        for command in commands:
+            with self.assertRaises(CrownstoneBleException) as context:
+                await command
+            self.assertEqual(context.exception.type, CrownstoneError.DISCONNECTED)
+        self.assertEqual(len(self.queue.inFlight), 0)
+
+    async def test_max_in_flight(self):
+        self.queue.maxInFlight = 1
+        switch = self.execute(ControlType.SWITCH)
+        getState = self.execute(ControlType.GET_STATE)
+        await self.waitForWrites(1)
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.written, [ControlType.SWITCH])
+
+        self.queue.handleResult(getResult(ControlType.SWITCH))
+        await switch
+        await self.waitForWrites(2)
+        self.queue.handleResult(getResult(ControlType.GET_STATE))
+        await getState
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import asyncio
+import unittest
+
+from crownstone_ble import CrownstoneBle
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedCrownstone, SimulatedBackend
+
+
+def getAddress(i):
+    return f"aa:bb:cc:dd:ee:{i:02x}"
+
+
+class TestConnect(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.crownstones = [SimulatedCrownstone(getAddress(i), linkLatency=0, processingTime=0) for i in range(0, 6)]
+        self.core = CrownstoneBle(maxConnections=4, clientBackend=SimulatedBackend(self.crownstones))
+
+    async def asyncTearDown(self):
+        await self.core.shutDown()
+
+    async def test_connect_without_disconnect_releases_previous_connection(self):
+        # More connects than maxConnections, without disconnect in between.
+        for crownstone in self.crownstones:
+            await asyncio.wait_for(self.core.connect(crownstone.address), 2)
+
+        self.assertEqual(self.core.ble.activeClient.address, self.crownstones[-1].address)
+        self.assertEqual(list(self.core.ble.activeClients.keys()), [self.crownstones[-1].address])
+        self.assertEqual(sum(self.core.ble.adapterConnections.values()), 1)
+        self.assertEqual([crownstone.connected for crownstone in self.crownstones], [False] * 5 + [True])
+
+    async def test_connect_to_same_address_again(self):
+        await self.core.connect(self.crownstones[0].address)
+        await self.core.connect(self.crownstones[0].address)
+        self.assertEqual(sum(self.core.ble.adapterConnections.values()), 1)
+
+    async def test_disconnect_command(self):
+        # The Crownstone drops the link in response to the disconnect command, which is the expected outcome.
+        await self.core.connect(self.crownstones[0].address)
+        await asyncio.wait_for(self.core.control.disconnect(), 2)
+        self.assertFalse(self.crownstones[0].connected)
+        self.assertEqual(self.core.ble.activeClients, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
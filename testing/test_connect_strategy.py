@@ -0,0 +1,155 @@
+import unittest
+from unittest import mock
+
+from crownstone_core.Enums import CrownstoneOperationMode
+from crownstone_core.Exceptions import CrownstoneBleException
+
+from crownstone_ble import CrownstoneBle
+from crownstone_ble.Exceptions import BleError
+from crownstone_ble.core.container.ScanData import ScanData
+from crownstone_ble.core.modules.ConnectStrategy import ConnectStrategy
+from crownstone_ble.core.modules.DeviceRegistry import DeviceRegistry
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedBackend
+
+ADDRESS = "aa:bb:cc:dd:ee:01"
+
+
+class TestConnectStrategy(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.registry = DeviceRegistry()
+        self.strategy = ConnectStrategy(self.registry, timeout=5.0, minTimeout=1.0, attempts=3, presenceWindow=10.0,
+                                        failureThreshold=3, openTime=30.0, maxOpenTime=100.0)
+
+    def scan(self, rssi=-60):
+        scanData = ScanData()
+        scanData.address = ADDRESS
+        scanData.rssi = rssi
+        scanData.operationMode = CrownstoneOperationMode.NORMAL
+        self.registry.update(scanData, None)
+
+    def assertRejected(self, errorType, scanningSince=None):
+        with self.assertRaises(CrownstoneBleException) as context:
+            self.strategy.checkConnect(ADDRESS, scanningSince)
+        self.assertEqual(context.exception.type, errorType)
+
+    def fail(self, times):
+        for i in range(0, times):
+            self.strategy.recordFailure(ADDRESS)
+
+    def test_closed_below_threshold(self):
+        self.fail(2)
+        self.strategy.checkConnect(ADDRESS, None)
+        self.assertEqual(self.strategy.getAttempts(ADDRESS), 3)
+
+    def test_opens_at_threshold(self):
+        self.fail(3)
+        self.assertRejected(BleError.CONNECTION_CIRCUIT_OPEN)
+        self.now += 29.9
+        self.assertRejected(BleError.CONNECTION_CIRCUIT_OPEN)
+        self.assertEqual(self.strategy.getStatistics(ADDRESS)["rejected"], 2)
+        self.assertTrue(self.strategy.getStatistics(ADDRESS)["circuitOpen"])
+
+    def test_half_open_after_open_time(self):
+        self.fail(3)
+        self.now += 30.1
+        # A single probe attempt is allowed.
+        self.strategy.checkConnect(ADDRESS, None)
+        self.assertEqual(self.strategy.getAttempts(ADDRESS), 1)
+
+    def test_failed_probe_doubles_open_time(self):
+        self.fail(3)
+        self.now += 30.1
+        self.fail(1)
+        self.now += 59.9
+        self.assertRejected(BleError.CONNECTION_CIRCUIT_OPEN)
+        self.now += 0.2
+        self.strategy.checkConnect(ADDRESS, None)
+
+        # Doubled again, up to the maximum open time.
+        self.fail(1)
+        self.now += 100.1
+        self.strategy.checkConnect(ADDRESS, None)
+
+    def test_success_closes(self):
+        self.fail(3)
+        self.now += 30.1
+        self.strategy.recordSuccess(ADDRESS, 0.5, 0.5)
+        self.strategy.checkConnect(ADDRESS, None)
+        self.assertEqual(self.strategy.getAttempts(ADDRESS), 3)
+
+        # The open time starts over.
+        self.fail(3)
+        self.now += 30.1
+        self.strategy.checkConnect(ADDRESS, None)
+
+    def test_advertisement_after_opening_closes(self):
+        self.fail(3)
+        self.now += 1
+        self.scan()
+        self.strategy.checkConnect(ADDRESS, None)
+        self.assertEqual(self.strategy.getStatistics(ADDRESS)["consecutiveFailures"], 0)
+
+    def test_advertisement_before_opening_does_not_close(self):
+        self.scan()
+        self.now += 1
+        self.fail(3)
+        self.now += 1
+        self.assertRejected(BleError.CONNECTION_CIRCUIT_OPEN)
+
+    def test_not_in_range(self):
+        scanningSince = self.now
+        self.now += 10.1
+        self.assertRejected(BleError.DEVICE_NOT_IN_RANGE, scanningSince)
+
+        self.scan()
+        self.strategy.checkConnect(ADDRESS, scanningSince)
+        self.now += 10.1
+        self.assertRejected(BleError.DEVICE_NOT_IN_RANGE, scanningSince)
+
+    def test_presence_not_checked_without_enough_scanning(self):
+        # Not scanning, or scanning for less than the presence window.
+        self.strategy.checkConnect(ADDRESS, None)
+        self.strategy.checkConnect(ADDRESS, self.now - 5)
+
+    def test_timeout_adapts_to_latency(self):
+        self.assertEqual(self.strategy.getTimeout(ADDRESS), 5.0)
+        for i in range(0, 3):
+            self.strategy.recordSuccess(ADDRESS, 0.2, 0.2)
+        self.assertEqual(self.strategy.getTimeout(ADDRESS), 1.0)
+        self.strategy.recordSuccess(ADDRESS, 0.5, 0.5)
+        self.assertAlmostEqual(self.strategy.getTimeout(ADDRESS), 1.5)
+
+    def test_weak_rssi(self):
+        for i in range(0, 3):
+            self.strategy.recordSuccess(ADDRESS, 0.2, 0.2)
+        self.scan(-90)
+        self.assertEqual(self.strategy.getTimeout(ADDRESS), 5.0)
+        self.assertEqual(self.strategy.getAttempts(ADDRESS), 4)
+
+
+class TestConnectStrategyOptIn(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.core = CrownstoneBle(clientBackend=SimulatedBackend())
+
+    async def asyncTearDown(self):
+        await self.core.shutDown()
+
+    async def test_disabled_by_default(self):
+        self.assertIsNone(self.core.ble.connectStrategy)
+
+    async def test_enable_and_disable(self):
+        self.core.enableConnectStrategy(failureThreshold=5)
+        self.assertEqual(self.core.ble.connectStrategy.failureThreshold, 5)
+        self.assertIs(self.core.ble.connectStrategy.registry, self.core.registry)
+        self.core.disableConnectStrategy()
+        self.assertIsNone(self.core.ble.connectStrategy)
+
+
+if __name__ == "__main__":
+    unittest.main()
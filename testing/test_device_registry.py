@@ -0,0 +1,125 @@
+import unittest
+from unittest import mock
+
+from crownstone_core.Enums import CrownstoneOperationMode
+from crownstone_core.packets.Advertisement import Advertisement
+from crownstone_core.protocol.BluenetTypes import DeviceType
+
+from crownstone_ble.core.BleEventBus import BleEventBus
+from crownstone_ble.core.container.ScanData import ScanData
+from crownstone_ble.core.modules.DeviceRegistry import DeviceRegistry
+from crownstone_ble.core.modules.Validator import Validator
+
+
+def getAddress(i):
+    return f"aa:bb:cc:dd:ee:{i:02x}"
+
+
+def getScanData(i, rssi=-60, operationMode=CrownstoneOperationMode.NORMAL, validated=True):
+    scanData = ScanData()
+    scanData.address = getAddress(i)
+    scanData.rssi = rssi
+    scanData.operationMode = operationMode
+    scanData.validated = validated
+    return scanData
+
+
+def getAddresses(devices):
+    return sorted(device.address for device in devices)
+
+
+class TestDeviceRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = DeviceRegistry()
+
+    def test_update(self):
+        scanData = getScanData(0)
+        self.registry.update(scanData, 5)
+        device = self.registry.getDevice(getAddress(0).upper())
+        self.assertIs(device.scanData, scanData)
+        self.assertEqual(device.crownstoneId, 5)
+        self.assertEqual(device.operationMode, CrownstoneOperationMode.NORMAL)
+        self.assertTrue(device.validated)
+        self.assertIsNotNone(device.lastSeen)
+
+    def test_rssi_smoothing(self):
+        self.registry.update(getScanData(0, -60), None)
+        self.registry.update(getScanData(0, -70), None)
+        self.assertAlmostEqual(self.registry.getDevice(getAddress(0)).rssi, -61)
+        # Invalid measurements are ignored.
+        self.registry.update(getScanData(0, 0), None)
+        self.registry.update(getScanData(0, -127), None)
+        self.assertAlmostEqual(self.registry.getDevice(getAddress(0)).rssi, -61)
+
+    def test_indexes_follow_updates(self):
+        self.registry.update(getScanData(0), 1)
+        self.registry.update(getScanData(1), 1)
+        self.registry.update(getScanData(2, operationMode=CrownstoneOperationMode.SETUP, validated=False), None)
+        self.assertEqual(getAddresses(self.registry.getByCrownstoneId(1)), [getAddress(0), getAddress(1)])
+        self.assertEqual(getAddresses(self.registry.getByMode(CrownstoneOperationMode.SETUP)), [getAddress(2)])
+        self.assertEqual(getAddresses(self.registry.getValidated()), [getAddress(0), getAddress(1)])
+
+        # Device 1 goes to setup mode, and is no longer validated with an id.
+        self.registry.update(getScanData(1, operationMode=CrownstoneOperationMode.SETUP, validated=False), None)
+        self.assertEqual(getAddresses(self.registry.getByCrownstoneId(1)), [getAddress(0)])
+        self.assertEqual(getAddresses(self.registry.getByMode(CrownstoneOperationMode.SETUP)), [getAddress(1), getAddress(2)])
+        self.assertEqual(getAddresses(self.registry.getByMode(CrownstoneOperationMode.NORMAL)), [getAddress(0)])
+        self.assertEqual(getAddresses(self.registry.getValidated()), [getAddress(0)])
+
+    def test_remove(self):
+        self.registry.update(getScanData(0), 1)
+        self.registry.remove(getAddress(0).upper())
+        self.assertIsNone(self.registry.getDevice(getAddress(0)))
+        self.assertEqual(self.registry.getByCrownstoneId(1), [])
+        self.assertEqual(self.registry.getByMode(CrownstoneOperationMode.NORMAL), [])
+        self.assertEqual(self.registry.getValidated(), [])
+        self.assertEqual(self.registry.addressesByCrownstoneId, {})
+        self.assertEqual(self.registry.addressesByMode, {})
+        # Removing an unknown device is fine.
+        self.registry.remove(getAddress(0))
+
+    def test_nearest(self):
+        self.registry.update(getScanData(0, -70), 1)
+        self.registry.update(getScanData(1, -50, validated=False), None)
+        self.registry.update(getScanData(2, -40, operationMode=CrownstoneOperationMode.SETUP, validated=False), None)
+        self.assertEqual(self.registry.getNearest().address, getAddress(1))
+        self.assertEqual(self.registry.getNearest(validated=True).address, getAddress(0))
+        self.assertEqual(self.registry.getNearest(setupModeOnly=True).address, getAddress(2))
+        self.assertEqual(self.registry.getNearest(addressesToExcludeSet={getAddress(1)}).address, getAddress(0))
+        self.assertIsNone(self.registry.getNearest(rssiAtLeast=-45))
+
+
+class TestDeviceRegistryExpiry(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.validator = Validator()
+
+    def tearDown(self):
+        BleEventBus.unsubscribe(self.validator.subscriptionId)
+
+    def test_expires_with_tracker(self):
+        # Setup mode advertisements are validated right away, so no keys are needed.
+        serviceData = [6, DeviceType.PLUG, 0, 0, 0, 20, 127, 0, 0, 0, 0, 0, 0, 0]
+        advertisement = Advertisement(getAddress(0), -60, "CS", serviceData, 0xC001)
+        advertisement.parse()
+        self.validator.checkAdvertisement(advertisement)
+        device = self.validator.registry.getDevice(getAddress(0))
+        self.assertEqual(device.operationMode, CrownstoneOperationMode.SETUP)
+        self.assertEqual(device.lastSeen, 1000.0)
+
+        self.now = 1009.5
+        self.validator.cleanupExpiredTrackers()
+        self.assertIsNotNone(self.validator.registry.getDevice(getAddress(0)))
+        self.now = 1010.5
+        self.validator.cleanupExpiredTrackers()
+        self.assertIsNone(self.validator.registry.getDevice(getAddress(0)))
+        self.assertEqual(self.validator.registry.getByMode(CrownstoneOperationMode.SETUP), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from crownstone_core.Enums import CrownstoneOperationMode
+from crownstone_core.protocol.Characteristics import CrownstoneCharacteristics, SetupCharacteristics
+
+from crownstone_ble import CrownstoneBle
+from crownstone_ble.core.container.ScanData import ScanData
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedCrownstone, SimulatedBackend
+
+ADDRESS = "aa:bb:cc:dd:ee:01"
+
+
+class TestGattCache(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.crownstone = SimulatedCrownstone(ADDRESS, linkLatency=0, processingTime=0)
+        self.core = CrownstoneBle(clientBackend=SimulatedBackend([self.crownstone]))
+
+    async def asyncTearDown(self):
+        await self.core.shutDown()
+
+    def scan(self, operationMode):
+        scanData = ScanData()
+        scanData.address = ADDRESS
+        scanData.rssi = -60
+        scanData.operationMode = operationMode
+        scanData.validated = True
+        self.core.registry.update(scanData, 1)
+
+    async def connectAndDisconnect(self):
+        await self.core.connect(ADDRESS)
+        await self.core.state.getSwitchState()
+        await self.core.disconnect()
+
+    async def test_not_used_when_mode_unknown(self):
+        await self.connectAndDisconnect()
+        await self.connectAndDisconnect()
+        self.assertEqual(self.crownstone.discoveryCount, 2)
+        self.assertEqual(self.core.ble.gattCache.entries, {})
+
+    async def test_used_when_mode_known(self):
+        self.scan(CrownstoneOperationMode.NORMAL)
+        await self.connectAndDisconnect()
+        await self.connectAndDisconnect()
+        self.assertEqual(self.crownstone.discoveryCount, 1)
+
+    async def test_stale_table_without_characteristic(self):
+        # A cached table that lacks the result characteristic: the services are discovered again, instead of a KeyError.
+        self.scan(CrownstoneOperationMode.NORMAL)
+        await self.connectAndDisconnect()
+        services, characteristics = self.core.ble.gattCache.get(ADDRESS, CrownstoneOperationMode.NORMAL)
+        del characteristics[CrownstoneCharacteristics.Result]
+        self.core.ble.gattCache.put(ADDRESS, CrownstoneOperationMode.NORMAL, services, characteristics)
+
+        await self.connectAndDisconnect()
+        self.assertEqual(self.crownstone.discoveryCount, 2)
+
+    async def test_stale_table_with_missing_characteristic(self):
+        # A cached table with a characteristic the Crownstone doesn't have, like the table of another mode.
+        self.scan(CrownstoneOperationMode.NORMAL)
+        await self.connectAndDisconnect()
+        services, characteristics = self.core.ble.gattCache.get(ADDRESS, CrownstoneOperationMode.NORMAL)
+        characteristics[SetupCharacteristics.Result] = 100
+        self.core.ble.gattCache.put(ADDRESS, CrownstoneOperationMode.NORMAL, services, characteristics)
+
+        await self.connectAndDisconnect()
+        self.assertEqual(self.crownstone.discoveryCount, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
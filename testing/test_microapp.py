@@ -0,0 +1,158 @@
+import os
+import unittest
+
+from crownstone_core.protocol.BluenetTypes import ControlType
+from crownstone_core.util.Conversion import Conversion
+from crownstone_core.util.EncryptionHandler import EncryptionHandler
+
+from crownstone_ble import CrownstoneBle
+from crownstone_ble.core.modules.ConnectStrategy import ConnectStrategy
+from crownstone_ble.core.modules.MicroappUploader import MicroappUploader, getMicroappChecksums
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedCrownstone, SimulatedBackend
+
+ADDRESS = "aa:bb:cc:dd:ee:01"
+
+
+def getBinary(checksum, checksumHeader, size=2048):
+    data = bytearray(os.urandom(size))
+    data[4:6] = checksum.to_bytes(2, "little")
+    data[6:8] = checksumHeader.to_bytes(2, "little")
+    return bytes(data)
+
+
+class LinkDroppingCrownstone(SimulatedCrownstone):
+    """
+    Drops the link on microapp chunks larger than maxChunkSize, instead of answering with an error.
+    """
+
+    def __init__(self, address, maxChunkSize, **kwargs):
+        super().__init__(address, **kwargs)
+        self.maxChunkSize = maxChunkSize
+
+    def _handleControl(self, data):
+        if self.connected:
+            packet = EncryptionHandler.decrypt(data, self.settings)
+            if Conversion.uint8_array_to_uint16(packet[1:3]) == ControlType.MICROAPP_UPLOAD:
+                # Size of the payload, without the app header and offset.
+                if Conversion.uint8_array_to_uint16(packet[3:5]) - 4 > self.maxChunkSize:
+                    self.simulateDisconnect()
+                    return
+        super()._handleControl(data)
+
+
+class TestMicroappUpload(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.crownstone = SimulatedCrownstone(ADDRESS, linkLatency=0, processingTime=0)
+        self.core = CrownstoneBle(clientBackend=SimulatedBackend([self.crownstone]))
+        await self.core.connect(ADDRESS)
+
+    async def asyncTearDown(self):
+        await self.core.shutDown()
+
+    def test_checksums_from_header(self):
+        self.assertEqual(getMicroappChecksums(getBinary(0x1234, 0xABCD)), (0x1234, 0xABCD))
+
+    async def test_skipped_when_validated_with_same_checksums(self):
+        data = getBinary(0x1234, 0xABCD)
+        self.assertFalse((await self.core._dev.uploadMicroapp(data)).skipped)
+        await self.core._dev.validateMicroapp(0)
+        self.assertTrue((await self.core._dev.uploadMicroapp(data)).skipped)
+
+    async def test_not_skipped_when_not_validated(self):
+        # The header is in the first chunk, so an app that isn't validated may be incomplete.
+        data = getBinary(0x1234, 0xABCD)
+        await self.core._dev.uploadMicroapp(data)
+        self.assertFalse((await self.core._dev.uploadMicroapp(data)).skipped)
+
+    async def test_not_skipped_when_header_checksum_differs(self):
+        await self.core._dev.uploadMicroapp(getBinary(0x1234, 0xABCD))
+        await self.core._dev.validateMicroapp(0)
+        self.assertFalse((await self.core._dev.uploadMicroapp(getBinary(0x1234, 0x0001))).skipped)
+
+    async def test_skipped_has_no_rate(self):
+        data = getBinary(0x1234, 0xABCD)
+        await self.core._dev.uploadMicroapp(data)
+        await self.core._dev.validateMicroapp(0)
+        result = await self.core._dev.uploadMicroapp(data)
+        self.assertEqual(result.bytesUploaded, 0)
+        self.assertIsNone(result.bytesPerSecond)
+
+    async def test_rate_of_resumed_upload(self):
+        # The connection is lost halfway, and the Crownstone stays out of range, so the first call fails.
+        self.core.ble.connectStrategy = ConnectStrategy(self.core.registry, timeout=0.05, attempts=1, failureThreshold=10)
+        data = getBinary(0x1234, 0xABCD, 4096)
+        dropped = False
+        def onProgress(address, offset, size):
+            nonlocal dropped
+            if offset >= size // 2 and not dropped:
+                dropped = True
+                self.crownstone.inRange = False
+                self.crownstone.simulateDisconnect()
+        uploader = MicroappUploader(self.core, data, maxChunkSize=128, resumeAttempts=1, progressCallback=onProgress)
+        with self.assertRaises(Exception):
+            await uploader.upload()
+
+        self.crownstone.inRange = True
+        acknowledged = uploader.acknowledgedOffset
+        result = await uploader.upload()
+        self.assertEqual(result.bytesUploaded, len(data) - acknowledged)
+        self.assertAlmostEqual(result.bytesPerSecond, result.bytesUploaded / result.duration)
+        self.assertEqual(bytes(self.crownstone.microapps[0][:len(data)]), data)
+
+    async def test_not_skipped_when_forced(self):
+        data = getBinary(0x1234, 0xABCD)
+        await self.core._dev.uploadMicroapp(data)
+        await self.core._dev.validateMicroapp(0)
+        self.assertFalse((await self.core._dev.uploadMicroapp(data, force=True)).skipped)
+
+
+class TestMicroappChunkDropsLink(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.crownstone = LinkDroppingCrownstone(ADDRESS, 64, linkLatency=0, processingTime=0, mtu=247)
+        self.core = CrownstoneBle(clientBackend=SimulatedBackend([self.crownstone]))
+        await self.core.connect(ADDRESS)
+
+    async def asyncTearDown(self):
+        await self.core.shutDown()
+
+    async def test_chunk_size_halved_when_chunk_drops_link(self):
+        data = getBinary(0x1234, 0xABCD)
+        result = await self.core._dev.uploadMicroapp(data)
+        self.assertLessEqual(result.chunkSize, 64)
+        self.assertGreater(result.chunkSizeReductions, 0)
+        self.assertEqual(bytes(self.crownstone.microapps[0][:len(data)]), data)
+
+
+class TestMicroappRollout(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.crownstones = [SimulatedCrownstone(f"aa:bb:cc:dd:ee:{i:02x}", linkLatency=0, processingTime=0) for i in range(0, 3)]
+        self.core = CrownstoneBle(clientBackend=SimulatedBackend(self.crownstones))
+        self.addresses = [crownstone.address for crownstone in self.crownstones]
+
+    async def asyncTearDown(self):
+        await self.core.shutDown()
+
+    async def test_installed(self):
+        data = getBinary(0x1234, 0xABCD)
+        rollout = await self.core.rolloutMicroapp(self.addresses, data)
+        self.assertEqual(rollout.getFailed(), [])
+        for crownstone in self.crownstones:
+            self.assertEqual(bytes(crownstone.microapps[0][:len(data)]), data)
+            self.assertIn(0, crownstone.validatedMicroapps)
+
+    async def test_skipped_is_not_validated_again(self):
+        data = getBinary(0x1234, 0xABCD)
+        await self.core.rolloutMicroapp(self.addresses, data)
+        commandsHandled = [crownstone.commandsHandled for crownstone in self.crownstones]
+        rollout = await self.core.rolloutMicroapp(self.addresses, data)
+        for address, result in rollout.results.items():
+            self.assertTrue(result.result.skipped)
+        # Only the microapp info is requested.
+        self.assertEqual([crownstone.commandsHandled for crownstone in self.crownstones], [count + 1 for count in commandsHandled])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+
+from crownstone_ble import CrownstoneBle, BleTopics
+from crownstone_ble.core.BleEventBus import BleEventBus
+from crownstone_ble.core.container.ScanData import ScanData
+from crownstone_ble.core.modules.ScanBatcher import ScanBatcher
+from crownstone_ble.core.modules.SimulatedCrownstone import SimulatedBackend
+
+
+def getScanData(i):
+    scanData = ScanData()
+    scanData.address = f"aa:bb:cc:dd:ee:{i:02x}"
+    scanData.rssi = -60
+    return scanData
+
+
+class TestScanBatcher(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.batches = {BleTopics.rawAdvertisementBatch: [], BleTopics.advertisementBatch: []}
+        self.subscriptionIds = [BleEventBus.subscribe(topic, batches.append) for topic, batches in self.batches.items()]
+
+    async def asyncTearDown(self):
+        for subscriptionId in self.subscriptionIds:
+            BleEventBus.unsubscribe(subscriptionId)
+
+    async def test_emitted_when_full(self):
+        batcher = ScanBatcher(window=10, maxItems=3)
+        scans = [getScanData(i) for i in range(0, 7)]
+        for scan in scans:
+            batcher.add(BleTopics.rawAdvertisementBatch, scan)
+        self.assertEqual(self.batches[BleTopics.rawAdvertisementBatch], [scans[0:3], scans[3:6]])
+        batcher.flush()
+        self.assertEqual(self.batches[BleTopics.rawAdvertisementBatch], [scans[0:3], scans[3:6], scans[6:7]])
+
+    async def test_emitted_after_window(self):
+        batcher = ScanBatcher(window=0.01, maxItems=100)
+        scans = [getScanData(i) for i in range(0, 3)]
+        for scan in scans:
+            batcher.add(BleTopics.rawAdvertisementBatch, scan)
+        self.assertEqual(self.batches[BleTopics.rawAdvertisementBatch], [])
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.batches[BleTopics.rawAdvertisementBatch], [scans])
+        self.assertIsNone(batcher.flushHandle)
+
+        # The window starts again with the next scan.
+        batcher.add(BleTopics.rawAdvertisementBatch, scans[0])
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.batches[BleTopics.rawAdvertisementBatch], [scans, [scans[0]]])
+
+    async def test_flush_emits_all_topics(self):
+        batcher = ScanBatcher(window=10, maxItems=100)
+        scans = [getScanData(i) for i in range(0, 2)]
+        batcher.add(BleTopics.rawAdvertisementBatch, scans[0])
+        batcher.add(BleTopics.advertisementBatch, scans[1])
+        batcher.add(BleTopics.rawAdvertisementBatch, scans[1])
+        batcher.flush()
+        self.assertEqual(self.batches[BleTopics.rawAdvertisementBatch], [scans])
+        self.assertEqual(self.batches[BleTopics.advertisementBatch], [[scans[1]]])
+        self.assertIsNone(batcher.flushHandle)
+
+        # Nothing left to emit.
+        batcher.flush()
+        self.assertEqual(len(self.batches[BleTopics.rawAdvertisementBatch]), 1)
+
+    async def test_subscribers_keep_their_list(self):
+        batcher = ScanBatcher(window=10, maxItems=1)
+        batcher.add(BleTopics.rawAdvertisementBatch, getScanData(0))
+        batcher.add(BleTopics.rawAdvertisementBatch, getScanData(1))
+        first, second = self.batches[BleTopics.rawAdvertisementBatch]
+        self.assertIsNot(first, second)
+        self.assertEqual(len(first), 1)
+
+    async def test_disable_flushes(self):
+        core = CrownstoneBle(clientBackend=SimulatedBackend())
+        try:
+            core.enableBatchedDelivery(window=10, maxItems=100)
+            scan = getScanData(0)
+            core.ble.validator.batcher.add(BleTopics.advertisementBatch, scan)
+            core.disableBatchedDelivery()
+            self.assertIsNone(core.ble.validator.batcher)
+            self.assertEqual(self.batches[BleTopics.advertisementBatch], [[scan]])
+        finally:
+            await core.shutDown()
+
+
+if __name__ == "__main__":
+    unittest.main()
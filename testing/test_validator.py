@@ -0,0 +1,103 @@
+import unittest
+from unittest import mock
+
+from crownstone_core.packets.Advertisement import Advertisement
+from crownstone_core.protocol.BluenetTypes import DeviceType
+
+from crownstone_ble.core.BleEventBus import BleEventBus
+from crownstone_ble.core.modules.Validator import Validator
+
+
+def getAddress(i):
+    return f"aa:bb:cc:dd:ee:{i:02x}"
+
+
+def getSetupAdvertisement(address, uniqueIdentifier=0):
+    # Setup mode advertisements are validated right away, so no keys are needed.
+    serviceData = [6, DeviceType.PLUG, 0, 0, 0, 20, 127, 0, 0, 0, 0, 0, 0, uniqueIdentifier % 256]
+    advertisement = Advertisement(address, -60, "CS", serviceData, 0xC001)
+    advertisement.parse()
+    return advertisement
+
+
+class TestValidatorExpiry(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.validator = Validator()
+
+    def tearDown(self):
+        BleEventBus.unsubscribe(self.validator.subscriptionId)
+
+    def see(self, i, at):
+        self.now = at
+        self.validator.checkAdvertisement(getSetupAdvertisement(getAddress(i), int(at)))
+
+    def cleanupAt(self, at):
+        self.now = at
+        self.validator.cleanupExpiredTrackers()
+
+    def getTracked(self):
+        return sorted(self.validator.trackedCrownstones.keys())
+
+    def test_expiry_order(self):
+        self.see(0, 1000)
+        self.see(1, 1001)
+        self.see(2, 1002)
+
+        self.cleanupAt(1009.5)
+        self.assertEqual(self.getTracked(), [getAddress(0), getAddress(1), getAddress(2)])
+        self.cleanupAt(1010.5)
+        self.assertEqual(self.getTracked(), [getAddress(1), getAddress(2)])
+        self.cleanupAt(1011.5)
+        self.assertEqual(self.getTracked(), [getAddress(2)])
+        self.cleanupAt(1012.5)
+        self.assertEqual(self.getTracked(), [])
+        self.assertEqual(self.validator.expiryHeap, [])
+        self.assertEqual(self.validator.registry.getDevices(), [])
+
+    def test_seen_again_after_push(self):
+        self.see(0, 1000)
+        self.see(1, 1001)
+        # Address 0 is seen again, after its heap entry with a timeout of 1010 was pushed.
+        self.see(0, 1008)
+
+        self.cleanupAt(1011.5)
+        self.assertEqual(self.getTracked(), [getAddress(0)])
+        self.assertIsNotNone(self.validator.registry.getDevice(getAddress(0)))
+        self.assertIsNone(self.validator.registry.getDevice(getAddress(1)))
+        # The entry of address 0 was pushed again with its new timeout, there is still one entry per tracker.
+        self.assertEqual([entry[0] for entry in self.validator.expiryHeap], [1018])
+
+        self.cleanupAt(1017.5)
+        self.assertEqual(self.getTracked(), [getAddress(0)])
+        self.cleanupAt(1018.5)
+        self.assertEqual(self.getTracked(), [])
+
+    def test_cleanup_on_advertisement(self):
+        self.see(0, 1000)
+        self.see(1, 1010.5)
+        self.assertEqual(self.getTracked(), [getAddress(1)])
+
+    def test_removed_and_seen_again(self):
+        self.see(0, 1000)
+        self.validator.removeStone(getAddress(0))
+        self.assertIsNone(self.validator.registry.getDevice(getAddress(0)))
+
+        # A new tracker, while the heap still has the entry of the removed tracker.
+        self.see(0, 1005)
+        self.assertEqual(len(self.validator.expiryHeap), 2)
+
+        # The entry of the removed tracker doesn't remove the new tracker.
+        self.cleanupAt(1010.5)
+        self.assertEqual(self.getTracked(), [getAddress(0)])
+        self.assertEqual(len(self.validator.expiryHeap), 1)
+        self.cleanupAt(1015.5)
+        self.assertEqual(self.getTracked(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
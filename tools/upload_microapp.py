@@ -53,33 +53,16 @@ async def main():
     print(list(appData[0:32]))
 
     await core.connect(args.bleAddress)
-    info = await core._dev.getMicroappInfo()
-    print(info)
-
-    # Perform some checks with the info we received.
-    if appIndex >= info.maxApps:
-        print(f"This crownstone doesn't have room for index {appIndex}")
-        await core.disconnect()
-        await core.shutDown()
-        return
-
-    if len(appData) > info.maxAppSize:
-        print(f"This crownstone doesn't have room for a binary size of {len(appData)}")
-        await core.disconnect()
-        await core.shutDown()
-        return
-
-    # If there is already some data at this index, it has to be removed first.
-    if info.appsStatus[appIndex].tests.hasData:
-        print(f"Remove data at index {appIndex}")
-        await core._dev.removeMicroapp(appIndex)
-
-    # Determine the chunk size by taking the minimum of our max, and the crownstones max.
-    chunkSize = min(maxChunkSize, info.maxChunkSize)
-
-    print(f"{datetime.datetime.now()} Start upload with chunkSize={chunkSize}")
-    await core._dev.uploadMicroapp(appData, appIndex, chunkSize)
-    print(f"{datetime.datetime.now()} Upload done")
+
+    # Checks whether the binary fits, removes an old app at the index, and picks the chunk size, up to maxChunkSize.
+    # When the Crownstone already has this binary, the upload is skipped.
+    print(f"{datetime.datetime.now()} Start upload")
+    result = await core._dev.uploadMicroapp(appData, appIndex, maxChunkSize)
+    if result.skipped:
+        print(f"{datetime.datetime.now()} The Crownstone already has this microapp")
+    else:
+        print(f"{datetime.datetime.now()} Upload done with chunkSize={result.chunkSize} in {result.duration:.1f} s, "
+              f"{result.bytesPerSecond or 0:.0f} bytes/s, resumed {result.resumes} times")
 
     print("Validate..")
     await core._dev.validateMicroapp(appIndex)